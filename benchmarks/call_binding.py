@@ -0,0 +1,72 @@
+"""Benchmark of the per-call cost of binding the arguments and hashing them,
+with large array arguments and a structured path.
+
+It compares the old approach, which normalized the arguments again and
+recomputed the hash for each use (each element of the structured path, and
+the parameters saved in the metadata of each file), against the context
+bound once per call.
+
+Run it from the root of the repository with:
+    python -m benchmarks.call_binding
+"""
+import json
+from timeit import repeat
+
+import numpy as np
+from dict_hash import sha256
+
+from cache_decorator import Cache
+from cache_decorator.utils import get_params
+
+CACHE_PATH = {
+    "train":"{cache_dir}/train_{_hash}.pkl",
+    "test":"{cache_dir}/test_{_hash}.pkl",
+    "model":"{cache_dir}/model_{_hash}.pkl",
+    "report":"{cache_dir}/report_{_hash}.json",
+}
+
+@Cache(cache_path=CACHE_PATH, cache_dir="./bench_cache")
+def cached_function(x, y, seed=42):
+    return {}
+
+cacher = getattr(cached_function, "__cacher_instance")
+
+def legacy_call(args, kwargs):
+    """The binding and hashing done for each use before the call contexts."""
+    paths = {}
+    for key, formatter in CACHE_PATH.items():
+        params = get_params(cacher.function_info, args, kwargs)
+        params["_hash"] = sha256({"params": params, "function_info": cacher.function_info})
+        paths[key] = formatter.format(cache_dir=cacher.cache_dir, **params)
+
+    # The parameters saved in the metadata of each file
+    for _ in paths:
+        metadata = {}
+        for name, value in get_params(cacher.function_info, args, kwargs).items():
+            try:
+                json.dumps(value)
+                metadata[name] = value
+            except TypeError:
+                pass
+    return paths
+
+def context_call(args, kwargs):
+    context = cacher._get_call_context(args, kwargs)
+    paths = cacher._get_formatted_path(args, kwargs, context=context)
+    for _ in paths:
+        context.serializable_params
+    return paths
+
+def bench(name, function, number=1):
+    best = min(repeat(function, number=number, repeat=3)) / number
+    print("{:<10} {:>8.2f} ms/call".format(name, best * 1e3))
+    return best
+
+if __name__ == "__main__":
+    random_state = np.random.RandomState(42)
+    args, kwargs = (random_state.rand(5_000), random_state.rand(5_000)), {"seed":7}
+    assert legacy_call(args, kwargs) == context_call(args, kwargs)
+
+    before = bench("before", lambda: legacy_call(args, kwargs))
+    after = bench("after", lambda: context_call(args, kwargs))
+    print("speedup    {:>8.2f}x".format(before / after))
@@ -0,0 +1,73 @@
+"""Microbenchmark of the per-call cost of building the cache path.
+
+It compares the old approach, which re-parsed the format string at every
+call with `get_format_groups` and `get_next_format_group`, against the
+templates compiled once at decoration time.
+
+Run it from the root of the repository with:
+    python -m benchmarks.path_formatting
+"""
+import inspect
+from timeit import repeat
+
+from cache_decorator import Cache
+from cache_decorator.utils import get_params, get_format_groups, get_next_format_group
+
+CACHE_PATH = "{cache_dir}/{function_name}/{a}_{b.name}_{b.get_name()}/{c:03d}.pkl"
+
+class Arg:
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name.upper()
+
+@Cache(cache_path=CACHE_PATH, cache_dir="./bench_cache/{a}")
+def cached_function(a, b, c=1):
+    return a
+
+cacher = getattr(cached_function, "__cacher_instance")
+
+def legacy_format(args, kwargs, formatter):
+    """The per-call parsing done before the templates were compiled."""
+    params = get_params(cacher.function_info, args, kwargs)
+    groups = get_format_groups(formatter)
+    cache_dir = cacher.cache_dir
+    if formatter != cacher.cache_dir:
+        cache_dir = legacy_format(args, kwargs, cacher.cache_dir)
+
+    format_args = {**params, **cacher.function_info, "cache_dir":cache_dir}
+    new_formatter = ""
+    old_formatter = formatter
+    while len(old_formatter) != 0:
+        new_match, formatter_remainder = get_next_format_group(old_formatter)
+        if new_match is None:
+            new_formatter += formatter_remainder
+            break
+        if new_match.str_match.endswith("()"):
+            root, *attrs = new_match.str_match[:-2].split(".")
+            root = format_args[root]
+            for attr in attrs:
+                root = getattr(root, attr)
+            if inspect.isfunction(root) or inspect.ismethod(root) or inspect.isbuiltin(root):
+                root = root()
+            sub = str(root)
+        else:
+            sub = "{" + new_match.str_match + "}"
+        new_formatter += old_formatter[:new_match.start]
+        new_formatter += sub
+        old_formatter = formatter_remainder
+    return new_formatter.format(**format_args)
+
+def bench(name, function, number=20000):
+    best = min(repeat(function, number=number, repeat=5)) / number
+    print("{:<10} {:>8.2f} us/call".format(name, best * 1e6))
+    return best
+
+if __name__ == "__main__":
+    args, kwargs = (1, Arg("x")), {"c":7}
+    assert legacy_format(args, kwargs, CACHE_PATH) == cacher._get_formatted_path(args, kwargs)
+
+    before = bench("before", lambda: legacy_format(args, kwargs, CACHE_PATH))
+    after = bench("after", lambda: cacher._get_formatted_path(args, kwargs))
+    print("speedup    {:>8.2f}x".format(before / after))
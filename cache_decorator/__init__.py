@@ -1,6 +1,7 @@
 """Package that automatically caches and dispatch serialization and deserialization to the correct functions depending on the extension."""
 from .cache import Cache, cache
-from .backends import SerializationException, DeserializationException
+from .backends import SerializationException, DeserializationException, BackendTemplate, register_backend, declare_backend
+from .utils import CachedException, Checkpoint
 
 import logging
 logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -10,4 +11,9 @@ __all__ = [
     "cache", 
     "SerializationException",
     "DeserializationException",
+    "BackendTemplate",
+    "register_backend",
+    "declare_backend",
+    "CachedException",
+    "Checkpoint",
 ]
\ No newline at end of file
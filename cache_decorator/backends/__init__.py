@@ -1,6 +1,8 @@
 """Package with all the serialization and deserializzation functions for each extension."""
 
 from .backend import Backend
+from .backend_template import BackendTemplate
+from .registry import register_backend, declare_backend
 from .exceptions import SerializationException, DeserializationException
 
-__all__ = ["Backend"]
\ No newline at end of file
+__all__ = ["Backend", "BackendTemplate", "register_backend", "declare_backend"]
\ No newline at end of file
@@ -1,61 +1,135 @@
-from typing import Set
+import threading
+from typing import Iterator, Set
 
-from .txt_backend import TxtBackend
+from .registry import declare_backend
 
-from .json_backend import JsonBackend
-from .compress_json_backend import CompressJsonBackend
+# The backends are imported only when a path with one of their extensions is
+# first used, so their extensions are declared here. The declaration order is
+# their priority.
+declare_backend("cache_decorator.backends.txt_backend", "TxtBackend", [".txt"])
 
-from .pickle_backend import PickleBackend
-from .compress_pickle_backend import CompressPickleBackend
+declare_backend("cache_decorator.backends.json_backend", "JsonBackend", [".json"])
+declare_backend(
+    "cache_decorator.backends.compress_json_backend", "CompressJsonBackend",
+    [".json", ".json.gz", ".json.bz", ".json.lzma"],
+    requires=["compress_json"]
+)
+
+declare_backend("cache_decorator.backends.pickle_backend", "PickleBackend", [".pkl"])
+declare_backend(
+    "cache_decorator.backends.compress_pickle_backend", "CompressPickleBackend",
+    [".pkl", ".pkl.gz", ".pkl.bz", ".pkl.lzma", ".pkl.zip"],
+    requires=["compress_pickle"]
+)
 
 # Failable backends
-from .pandas_csv_backend import PandasCsvBackend
-from .pandas_embedding_backend import PandasEmbeddingBackend
-from .numpy_backend import NumpyBackend
-from .keras_model_backend import KerasModelBackend
+CSV_EXTENSIONS = [
+    "{}{}".format(extension, compression)
+    for extension in (".csv", ".tsv", ".ssv")
+    for compression in ("", ".gz", ".bz2", ".xz", ".zip")
+]
+declare_backend(
+    "cache_decorator.backends.pandas_csv_backend", "PandasCsvBackend",
+    CSV_EXTENSIONS,
+    requires=["pandas"]
+)
+declare_backend(
+    "cache_decorator.backends.pandas_embedding_backend", "PandasEmbeddingBackend",
+    [".embedding", ".embedding.gz", ".embedding.bz2", ".embedding.xz"],
+    requires=["numpy", "pandas"]
+)
+declare_backend(
+    "cache_decorator.backends.numpy_backend", "NumpyBackend",
+    [".npy", ".npz"] + CSV_EXTENSIONS,
+    requires=["numpy"]
+)
+declare_backend(
+    "cache_decorator.backends.keras_model_backend", "KerasModelBackend",
+    [".keras.tar", ".keras.tar.gz", ".keras.tar.bz2", ".keras.tar.xz"]
+)
 
+from .backend_template import BackendTemplate
+from .registry import (
+    find_backend_classes, get_registry_version, get_supported_extensions,
+    is_path_supported, is_suffix_resolved, resolve_backend,
+)
 from .exceptions import SerializationException, DeserializationException
 
 class Backend:
     def __init__(self, load_kwargs, dump_kwargs):
-        self.backends = [
-            backend(load_kwargs, dump_kwargs)
-            for backend in [
-                JsonBackend,
-                CompressJsonBackend,
-                PickleBackend,
-                CompressPickleBackend,
-                NumpyBackend,
-                PandasCsvBackend,
-                PandasEmbeddingBackend,
-                KerasModelBackend,
-                TxtBackend,
-            ]
-            if backend is not None
-        ]
+        self._load_kwargs = load_kwargs
+        self._dump_kwargs = dump_kwargs
+        # The backends are instantiated on first use and then reused
+        self._instances = {}
+        self._lock = threading.Lock()
+        # The backends resolved for the constant suffixes of the cache paths
+        self._suffixes = {}
+        self._registry_version = get_registry_version()
+
+    def add_suffix(self, suffix: str) -> None:
+        """Resolve once the backends for all the paths ending with the given
+        suffix (e.g. the part of a `cache_path` after the last field),
+        if it fully determines them. They are resolved, and so imported,
+        on first use."""
+        if suffix and is_suffix_resolved(suffix):
+            self._suffixes[suffix] = None
+
+    def _get_backends(self, path:str) -> Iterator[BackendTemplate]:
+        """Yield the instances of the backends that support the given path.
+        The declared backends are imported only when they are reached, so
+        e.g. saving a pickle doesn't import the fallback compress_pickle."""
+        # If new backends were registered the resolutions are stale
+        if self._registry_version != get_registry_version():
+            self._registry_version = get_registry_version()
+            # A longer extension might have been registered. The dictionary is
+            # replaced, not changed, as other threads might be iterating it
+            self._suffixes = {
+                suffix:None
+                for suffix in self._suffixes
+                if is_suffix_resolved(suffix)
+            }
+
+        suffixes = self._suffixes
+        for suffix, backend_classes in suffixes.items():
+            if path.endswith(suffix):
+                if backend_classes is None:
+                    backend_classes = find_backend_classes(suffix)
+                    suffixes[suffix] = backend_classes
+                break
+        else:
+            backend_classes = find_backend_classes(path)
+
+        for backend_class in backend_classes:
+            backend_class = resolve_backend(backend_class)
+            if backend_class is not None:
+                yield self._get_instance(backend_class)
+
+    def _get_instance(self, backend_class) -> BackendTemplate:
+        instance = self._instances.get(backend_class)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(backend_class)
+                if instance is None:
+                    instance = backend_class(self._load_kwargs, self._dump_kwargs)
+                    self._instances[backend_class] = instance
+        return instance
 
     def support_path(self, path:str) -> bool:
-        """If exists at least one backend that can handle the current path."""
-        return any(
-            backend.support_path(path)
-            for backend in self.backends
-        )
+        """If exists at least one backend that can handle the current path.
+        This does not import the backends."""
+        return is_path_supported(path)
 
     def get_supported_extensions(self) -> Set[str]:
         """Get the supported extensions."""
-        return {
-            ext
-            for backend in self.backends
-            for ext in backend.SUPPORTED_EXTENSIONS
-        }
+        return get_supported_extensions()
 
     def dump(self, obj_to_serialize: object, path:str) -> dict:
         """Serialize and save the object at the given path.
-        If this backend needs extra informations to de-serialize data, it can 
+        If this backend needs extra informations to de-serialize data, it can
         return them as a dictionary which will be serialized as a json."
         If the function returns None or does not return, an empty dictionary
-        will be used as metadata."""     
-        for backend in self.backends:
+        will be used as metadata."""
+        for backend in self._get_backends(path):
             if backend.can_serialize(obj_to_serialize, path):
                 result = backend.dump(obj_to_serialize, path)
                 if result is None:
@@ -70,10 +144,10 @@ class Backend:
     def load(self, metadata:dict, path:str) -> object:
         """Load the method at the given path. If the medod need extra
         informations it can """
-        for backend in self.backends:
+        for backend in self._get_backends(path):
             if backend.can_deserialize(metadata, path):
                 return backend.load(metadata, path)
         raise DeserializationException(
             "There is no backend to deserialize the given object at the given path {}".format(path),
             path
-            )
\ No newline at end of file
+            )
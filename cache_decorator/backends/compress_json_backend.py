@@ -1,6 +1,8 @@
 import compress_json
 from .backend_template import BackendTemplate
+from .registry import register_backend
 
+@register_backend
 class CompressJsonBackend(BackendTemplate):
     SUPPORTED_EXTENSIONS = [
         ".json",
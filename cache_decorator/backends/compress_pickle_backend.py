@@ -1,6 +1,8 @@
 from compress_pickle import dump as pickle_dump, load as pickle_load
 from .backend_template import BackendTemplate
+from .registry import register_backend
 
+@register_backend
 class CompressPickleBackend(BackendTemplate):
     SUPPORTED_EXTENSIONS = [
         ".pkl",
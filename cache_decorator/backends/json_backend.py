@@ -1,6 +1,8 @@
 import json
 from .backend_template import BackendTemplate
+from .registry import register_backend
 
+@register_backend
 class JsonBackend(BackendTemplate):
     SUPPORTED_EXTENSIONS = [".json"]
 
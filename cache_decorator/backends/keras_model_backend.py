@@ -3,6 +3,7 @@ import os
 import tarfile
 import tempfile
 from .backend_template import BackendTemplate
+from .registry import register_backend
 
 
 try:
@@ -25,6 +26,7 @@ try:
             return "xz"
         raise ValueError("Cannot find the right extension")
 
+    @register_backend
     class KerasModelBackend(BackendTemplate):
         """Backend for Keras models."""
 
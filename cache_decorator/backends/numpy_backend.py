@@ -1,10 +1,12 @@
 
 from .backend_template import BackendTemplate
+from .registry import register_backend
 from .pandas_csv_backend import PandasCsvBackend
 
 try:
     import numpy as np
 
+    @register_backend
     class NumpyBackend(BackendTemplate):
         """Load and dump numpy types.
 
@@ -1,5 +1,6 @@
 
 from .backend_template import BackendTemplate
+from .registry import register_backend
 import warnings
 
 try:
@@ -49,6 +50,7 @@ try:
         " in a consistent manner."
     )
 
+    @register_backend
     class PandasCsvBackend(BackendTemplate):
         SUPPORTED_EXTENSIONS = {
             ".csv": ",",
@@ -1,5 +1,6 @@
 
 from .backend_template import BackendTemplate
+from .registry import register_backend
 import warnings
 
 try:
@@ -16,6 +17,7 @@ try:
             for dtype in df.dtypes
         )
 
+    @register_backend
     class PandasEmbeddingBackend(BackendTemplate):
         """This format is optimzied to compress datafarmes that contains ONLY numerical values.
         For .gz and .bz2 you can use the load_kwarg `compresslevel` to set the 
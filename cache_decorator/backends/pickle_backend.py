@@ -1,7 +1,9 @@
 import pickle
 from pickle import dump as pickle_dump, load as pickle_load
 from .backend_template import BackendTemplate
+from .registry import register_backend
 
+@register_backend
 class PickleBackend(BackendTemplate):
     SUPPORTED_EXTENSIONS = [".pkl"]
 
@@ -0,0 +1,205 @@
+"""Registry of the backends, indexed by the extensions they support."""
+import logging
+import threading
+import importlib
+import importlib.util
+from typing import Iterable, Optional, Set, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# The registered backends, in order of priority
+_backends = []
+
+# Trie of the reversed extensions, so that walking it from the end of a path
+# finds all the extensions the path ends with. The key None of a node holds
+# the backends that support the extension ending at that node.
+_trie = {}
+
+# Incremented at each registration so that who caches resolutions knows
+# when they are stale
+_version = 0
+
+# Reentrant because importing a declared backend registers it
+_lock = threading.RLock()
+
+class DeclaredBackend:
+    """Placeholder of a backend which is imported only when a path with one of
+    its extensions is first used. Its module replaces it, keeping its priority,
+    when it registers the backend class with the same name."""
+
+    def __init__(self, module: str, name: str, extensions: Iterable[str], requires: Iterable[str] = ()):
+        self.module = module
+        self.name = name
+        self.SUPPORTED_EXTENSIONS = list(extensions)
+        self.requires = tuple(requires)
+        self._available = None
+
+    def is_available(self) -> bool:
+        """Returns if the packages the backend needs are installed, without importing them."""
+        if self._available is None:
+            self._available = all(
+                importlib.util.find_spec(package) is not None
+                for package in self.requires
+            )
+        return self._available
+
+    def __repr__(self) -> str:
+        return "DeclaredBackend({}.{})".format(self.module, self.name)
+
+def _add_to_trie(backend) -> None:
+    for extension in backend.SUPPORTED_EXTENSIONS:
+        node = _trie
+        for c in reversed(extension):
+            node = node.setdefault(c, {})
+        node.setdefault(None, []).append(backend)
+
+def _remove_from_trie(backend) -> None:
+    for extension in backend.SUPPORTED_EXTENSIONS:
+        node = _trie
+        for c in reversed(extension):
+            node = node[c]
+        node[None].remove(backend)
+
+def register_backend(backend: Type) -> Type:
+    """Register a backend class, this can be used as a class decorator.
+
+    When more than one backend can handle the same path, the ones supporting
+    the longest extension have the priority, then the ones registered first."""
+    global _version
+    with _lock:
+        if backend is None or backend in _backends:
+            return backend
+
+        declared = next((
+            other
+            for other in _backends
+            if isinstance(other, DeclaredBackend)
+            and other.module == getattr(backend, "__module__", None)
+            and other.name == getattr(backend, "__name__", None)
+        ), None)
+
+        if declared is None:
+            _backends.append(backend)
+        else:
+            _remove_from_trie(declared)
+            _backends[_backends.index(declared)] = backend
+        _add_to_trie(backend)
+
+        _version += 1
+    return backend
+
+def declare_backend(module: str, name: str, extensions: Iterable[str], requires: Iterable[str] = ()) -> None:
+    """Register the backend class `name` of the given module without importing
+    it, the module is imported the first time a path with one of the given
+    extensions is used. The packages in `requires` must be installed for the
+    backend to be available."""
+    register_backend(DeclaredBackend(module, name, extensions, requires))
+
+def _import_backend(declared: DeclaredBackend) -> None:
+    """Import the module of a declared backend, which replaces it in the registry.
+    If the module does not register it, e.g. because an optional dependency
+    is missing, the declaration is dropped."""
+    global _version
+    if declared.is_available():
+        try:
+            importlib.import_module(declared.module)
+        except ImportError:
+            logger.debug("Could not import the backend %s", declared, exc_info=True)
+
+    with _lock:
+        if declared in _backends:
+            _remove_from_trie(declared)
+            _backends.remove(declared)
+            _version += 1
+
+def get_registry_version() -> int:
+    return _version
+
+def _find_backends(path: str) -> dict:
+    found = {}
+    node = _trie
+    for depth, c in enumerate(reversed(path)):
+        node = node.get(c)
+        if node is None:
+            break
+        for backend in node.get(None, ()):
+            found[backend] = depth
+    return found
+
+def find_backend_classes(path: str) -> Tuple:
+    """Get the backends that support the extension of the given path, in the
+    order of `get_backend_classes`, without importing the declared ones,
+    which can be imported with `resolve_backend` only if they are needed."""
+    with _lock:
+        found = _find_backends(path)
+        return tuple(sorted(
+            found,
+            key=lambda backend: (-found[backend], _backends.index(backend))
+        ))
+
+def resolve_backend(backend) -> Optional[Type]:
+    """Get the class of the backend, importing it if it's declared.
+    Returns None if the declared backend is not available."""
+    if not isinstance(backend, DeclaredBackend):
+        return backend
+    # The import runs outside the lock as it takes the import lock
+    _import_backend(backend)
+    with _lock:
+        return next((
+            other
+            for other in _backends
+            if getattr(other, "__module__", None) == backend.module
+            and getattr(other, "__name__", None) == backend.name
+        ), None)
+
+def get_backend_classes(path: str) -> Tuple[Type]:
+    """Get the backends that support the extension of the given path.
+    The backends matching the longest extension come first, and between
+    the ones with the same extension the first registered wins.
+    The declared backends that match are imported."""
+    while True:
+        with _lock:
+            found = _find_backends(path)
+            declared = [
+                backend
+                for backend in found
+                if isinstance(backend, DeclaredBackend)
+            ]
+            if not declared:
+                return tuple(sorted(
+                    found,
+                    key=lambda backend: (-found[backend], _backends.index(backend))
+                ))
+        # The imports run outside the lock as they take the import lock
+        for backend in declared:
+            _import_backend(backend)
+
+def is_path_supported(path: str) -> bool:
+    """Returns if at least one backend can handle the given path, without
+    importing the declared ones."""
+    with _lock:
+        return any(
+            not isinstance(backend, DeclaredBackend) or backend.is_available()
+            for backend in _find_backends(path)
+        )
+
+def is_suffix_resolved(suffix: str) -> bool:
+    """Returns if the backends of every path ending with the given suffix are
+    the same, i.e. no registered extension is longer than the suffix's match."""
+    node = _trie
+    for c in reversed(suffix):
+        node = node.get(c)
+        if node is None:
+            return True
+    # A longer extension would continue past the end of the suffix
+    return all(key is None for key in node)
+
+def get_supported_extensions() -> Set[str]:
+    """Get the extensions supported by at least one registered backend."""
+    with _lock:
+        return {
+            extension
+            for backend in _backends
+            if not isinstance(backend, DeclaredBackend) or backend.is_available()
+            for extension in backend.SUPPORTED_EXTENSIONS
+        }
@@ -1,5 +1,7 @@
 from .backend_template import BackendTemplate
+from .registry import register_backend
 
+@register_backend
 class TxtBackend(BackendTemplate):
     SUPPORTED_EXTENSIONS = [".txt"]
 
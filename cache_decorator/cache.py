@@ -1,25 +1,40 @@
 
-from multiprocessing.sharedctypes import Value
 import re
 import os
 import sys
 import json
+import zlib
 import uuid
 import pickle
 
-import humanize
 import datetime
 import inspect
 import logging
-from time import time
+import threading
+import contextvars
+from time import time, time_ns, sleep
 from functools import wraps
+from collections import deque
 from datetime import datetime
-from typing import Tuple, Callable, Union, Dict, List, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed, wait
+from typing import Tuple, Callable, Union, Dict, List, Optional, Type
 from .utils import (
-    get_params, parse_time, random_string, get_format_groups, 
-    get_next_format_group, get_function_name,
+    ParamsBinder, CallContext, parse_time, random_string, get_function_name,
+    global_memory_cache, PathTemplate, CompiledPath, compile_path,
+    iter_templates, format_compiled_path, global_single_flight, get_path_key,
+    FileLock, FSYNC_POLICIES, get_temporary_path, remove_temporary_path, fsync_file, fsync_directory,
+    sweep_temporary_files, sweep_temporary_files_once,
+    global_async_single_flight, get_shared_executor, global_write_behind,
+    KEYS_SUFFIX, get_element_keys, take, assemble, global_element_index,
+    get_stream_opener, write_chunk, iter_stream, LazyValue, LazyMapping, LazySequence,
+    MISSING, dump_exception, load_exception, BypassPolicy, global_refresher, Checkpoint,
+    RANGE_SUFFIX, dump_range, load_ranges, plan_range, concatenate,
+    get_chunks, get_shared_size, encode_delta, apply_delta, get_digest,
+    declare_function_version, set_function_version, get_function_version,
+    get_entry_hash, record_dependencies, is_recording, record_dependency,
+    MissLimiter, global_metadata_cache, global_negative_lookups,
 )
-from .backends import Backend
+from .backends import Backend, SerializationException
 
 # Dictionary are not hashable and the python hash is not consistent
 # between runs so we have to use an external dictionary hashing package
@@ -36,6 +51,9 @@ log_levels = {
     "crit":logging.CRITICAL,
 }
 
+# Used by the static methods which have no load and dump kwargs
+default_backend = Backend({}, {})
+
 def cache(function):
     """Cache with default parameters"""
     return Cache()(function)
@@ -59,6 +77,36 @@ class Cache:
         load_kwargs:dict = {},
         enable_cache_arg_name: Optional[str] = None,
         capture_enable_cache_arg_name: bool = True,
+        use_memory_cache: bool = False,
+        use_file_locks: bool = False,
+        file_lock_mode: str = "auto",
+        file_lock_timeout: Union[int, str] = -1,
+        file_lock_lease_duration: Union[int, str] = "30s",
+        fsync_policy: str = "none",
+        io_executor: Optional[Executor] = None,
+        write_behind: bool = False,
+        structured_path_workers: int = 8,
+        elementwise: Optional[str] = None,
+        generator_chunk_size: int = 1000,
+        lazy: bool = False,
+        cache_exceptions: Tuple[Type[BaseException]] = (),
+        exception_validity_duration: Union[int, str] = None,
+        min_compute_time: Union[float, str] = None,
+        max_dump_size: Optional[int] = None,
+        adaptive_bypass: bool = False,
+        stale_while_revalidate: bool = False,
+        refresh_ahead: float = 0,
+        validity_jitter: float = 0,
+        checkpoint_arg_name: Optional[str] = None,
+        range_args: Optional[Tuple[str, str]] = None,
+        delta_storage: bool = False,
+        max_delta_chain: int = 8,
+        max_concurrent_misses: Optional[int] = None,
+        max_shared_concurrent_misses: Optional[int] = None,
+        miss_queue_timeout: Union[int, str] = -1,
+        miss_queue_fallback: str = "raise",
+        negative_lookup_ttl: float = 0,
+        metadata_level: str = "full",
     ):
         """
         Cache the results of a function (or method).
@@ -177,6 +225,172 @@ class Cache:
         capture_enable_cache_arg_name: bool = True,
             If this parameter is set, the cache will capture the enable cache arg
             and NOT pass it to the decorated function.
+        use_memory_cache: bool = False,
+            If the loaded and computed results should also be kept in an in-process
+            LRU cache, so that repeated hits do not have to read and deserialize
+            the files again. The memory cache is shared by all the decorated functions
+            and its limits can be set with `Cache.set_memory_cache_limits`.
+            The results are shared between the callers, so they must not be modified.
+            To enforce this, numpy arrays are returned as read-only.
+        use_file_locks: bool = False,
+            If the processes (also on different hosts sharing the `cache_dir`) should
+            coordinate so that a missing cache is computed only once. The process
+            computing the result holds a lock file next to the cache (`path + ".lock"`),
+            while the others poll for the finished cache instead of recomputing it.
+        file_lock_mode: str = "auto",
+            The protocol of the lock files. `fcntl` uses `flock`, `lease` creates the
+            lock file atomically and keeps it alive with an heartbeat, so it works also
+            on network filesystems without locks. `auto` uses `fcntl` where available
+            and `lease` otherwise.
+        file_lock_timeout: Union[int, str] = -1,
+            How long to wait for the lock before raising a `TimeoutError`, in the same
+            format of `validity_duration`. By default it waits forever.
+        file_lock_lease_duration: Union[int, str] = "30s",
+            With the `lease` mode, after how long without heartbeats a lock is
+            considered stale and is taken over.
+        fsync_policy: str = "none",
+            The caches are written to temporary files which are then atomically
+            renamed, the metadata before the cache, so that a crash or a concurrent
+            reader never see a partially written cache. This policy sets how much
+            to wait for the data to actually reach the disk. `none` leaves it to the OS,
+            `entry` flushes the files before renaming them, and `directory` also
+            flushes the directory after the renames so that they survive a power loss.
+        io_executor: Optional[Executor] = None,
+            The executor where the coroutine functions run the blocking lookups and
+            writes. By default a shared bounded thread pool is used.
+        write_behind: bool = False,
+            If the results should be saved in background threads, so that the callers
+            don't wait for the serialization. The pending results can be found by the
+            lookups of the same process, and their total size is bounded by
+            `Cache.set_write_behind_limits`. Use `Cache.flush_writes` to wait for them.
+        structured_path_workers: int = 8,
+            With a structured (list, tuple or dict) cache_path, how many of its
+            files are loaded and dumped in parallel. The caches with the same value
+            share the same thread pool. Use 1 to load and dump them sequentially.
+        elementwise: Optional[str] = None,
+            The name of an argument holding a batch of elements (a numpy array, a
+            pandas DataFrame or Series, a list, or a tuple) for which the function
+            returns one output per element, in the same order. Each element is
+            cached separately, so the function is called only with the elements
+            that were never seen, and the outputs are reassembled in the input order.
+            The cache_path is then the store of the elements computed with the same
+            other arguments: a directory (the path without its extension) holding
+            a segment file, in the format of the extension, for each call.
+        generator_chunk_size: int = 1000,
+            The cached generator functions save their items while they are yielded,
+            pickling them in chunks of this many items, so only a chunk is kept in
+            memory. The cache is saved only if the generator is exhausted, and the
+            hits replay the items lazily. Their cache_path must end with
+            `.pkl`, `.pkl.gz`, `.pkl.bz` or `.pkl.lzma`.
+        lazy: bool = False,
+            This argument can be used only if the cache_path is structured. If set,
+            a hit returns a read-only Mapping (for dicts) or Sequence (for lists and
+            tuples) whose values are loaded when first accessed and then kept.
+            The existence and validity of all the files are still checked up front,
+            so a miss is detected before loading anything. A single value can also
+            be loaded with `cached_function.load_key(key, *args, **kwargs)`.
+        cache_exceptions: Tuple[Type[BaseException]] = (),
+            The exceptions that, if raised by the function, are cached and raised
+            again by the next calls with the same arguments instead of calling the
+            function. Their type, message, and traceback are saved next to the cache
+            (in the `.exception` file of its first path), and the original traceback
+            is added as a note of the raised exception. If an exception can't be
+            pickled, a `CachedException` with its type and message is raised instead.
+        exception_validity_duration: Union[int, str] = None,
+            How long the cached exceptions are valid, in the same format of
+            `validity_duration`. If None, the `validity_duration` is used.
+        min_compute_time: Union[float, str] = None,
+            If set, the results that took less than this (in seconds, or in the same
+            format of `validity_duration`) to compute are not saved, since loading
+            them would not be faster.
+        max_dump_size: Optional[int] = None,
+            If set, the results whose serialized size is bigger than this many bytes
+            are not saved.
+        adaptive_bypass: bool = False,
+            If the load time of the hits should be compared with the time it took
+            to compute them. The keys which are slower to load than to compute are
+            recomputed by the next calls of the process, and if this happens for most
+            of the hits, the cache of the whole function is bypassed.
+            Every bypass is logged and counted in `cached_function.bypass_counts`.
+        stale_while_revalidate: bool = False,
+            If the expired caches should still be returned, while they are
+            recomputed and replaced in a background thread, instead of making
+            the caller wait for the computation. It's supported only for functions,
+            not for coroutines, generators, or the elementwise mode. The number of
+            concurrent background refreshes is capped by `Cache.set_background_refresh_limit`.
+        refresh_ahead: float = 0,
+            The fraction of the `validity_duration` at the end of the lifetime of
+            a cache in which an access triggers its background recomputation, so
+            that the frequently used caches never expire. E.g. 0.1 refreshes the
+            caches accessed in the last 10% of their lifetime.
+        validity_jitter: float = 0,
+            The fraction of the `validity_duration` by which the lifetime of each
+            cache is randomly shortened, so that the caches created together do
+            not expire all at the same time.
+        checkpoint_arg_name: Optional[str] = None,
+            The name of a keyword argument of the function in which the cache passes
+            a `Checkpoint`. With `checkpoint.save(state)` the function can save its
+            intermediate state, which is returned by `checkpoint.load()` in the next
+            calls with the same arguments, so a long computation can resume after a
+            crash. The checkpoint is saved atomically next to the cache
+            (`path + ".checkpoint.pkl"`), and it's removed once the result is saved.
+            This argument is automatically added to the `args_to_ignore`.
+        range_args: Optional[Tuple[str, str]] = None,
+            The names of the two arguments which are the start and the end of the
+            half-open interval [start, end) computed by the function, which returns
+            a pandas object, a numpy array, a list or a tuple, like
+            `load_events(start, end)`. The results of the calls are saved as segments
+            of the interval, so a call computes only the parts of its interval not
+            covered by the segments fully inside it, and concatenates the results.
+            The segments used by a call are then merged in background.
+            Like in the elementwise mode, the cache_path is the store of the segments
+            computed with the same other arguments: a directory (the path without its
+            extension) holding a segment file, in the format of the extension, for each
+            computed range. The two arguments are automatically added to the `args_to_ignore`.
+        delta_storage: bool = False,
+            If the serialized results should be saved as the difference from the most
+            similar result of the same function in the same directory, when at least
+            half of their content is shared. The serialized bytes are split in content
+            defined chunks, whose hashes are saved next to each cache (`path + ".chunks"`),
+            and the new chunks are saved together with references to the ones of the base,
+            which lists its deltas in `path + ".dependents"`.
+            The results are rebuilt when loaded, and if a base was removed or overwritten
+            the cache is considered missing.
+        max_delta_chain: int = 8,
+            The maximum number of deltas to apply to rebuild a result, after which
+            the result is saved in full.
+        max_concurrent_misses: Optional[int] = None,
+            How many missing results of the function can be computed at the same time
+            in this process, to protect the resources they use, like the memory or the
+            connections to a database. The other calls wait in a queue. The time spent
+            waiting is logged and saved in the metadata as `queue_time`, separately
+            from the time to compute the result. It also limits the coroutines, the
+            elementwise and range misses and the background refreshes, but not the
+            generators, which would hold a slot while their consumer is running.
+        max_shared_concurrent_misses: Optional[int] = None,
+            Like `max_concurrent_misses` but across all the processes, also on different
+            hosts, sharing the `cache_dir`. The slots are lock files in `{cache_dir}/.slots`
+            with the protocol set by `file_lock_mode`.
+        miss_queue_timeout: Union[int, str] = -1,
+            How long a call waits for a slot to compute the result, in the same format
+            of `validity_duration`. By default it waits forever.
+        miss_queue_fallback: str = "raise",
+            What to do when the `miss_queue_timeout` expires. `raise` raises a
+            `TimeoutError`, while `compute` computes the result anyway.
+        negative_lookup_ttl: float = 0,
+            For how many seconds a path found missing is considered missing without
+            checking the filesystem again, e.g. for the missing optional keys of a
+            structured path. The results saved by this process are seen immediately,
+            while the ones saved by other processes can be seen up to this delay later.
+        metadata_level: str = "full",
+            How much metadata is saved next to each cache (`path + ".metadata"`), as
+            minified json. `full` saves also the human readable times and sizes, the
+            informations about the function and the parameters which are small enough.
+            The source of the function is saved once per version in the `.sources`
+            directory of the `cache_dir`. `minimal` saves only what is needed to load
+            the cache and check its validity. `none` saves no metadata unless the result
+            needs it to be loaded, so it can't be used with `validity_duration`, and the
+            results are not recorded as dependencies of the other cached functions.
         """
         self.log_level = log_level
         self.log_format = log_format
@@ -191,8 +405,116 @@ class Cache:
         self.cache_dir = cache_dir or os.environ.get("CACHE_DIR", "./cache")
 
         self.load_kwargs, self.dump_kwargs = load_kwargs, dump_kwargs
+        # The backends live as long as the cache so they are not re-created at each call
+        self._backend = Backend(self.load_kwargs, self.dump_kwargs)
         self.enable_cache_arg_name = enable_cache_arg_name
         self. capture_enable_cache_arg_name = capture_enable_cache_arg_name
+        self.use_memory_cache = use_memory_cache
+        self.use_file_locks = use_file_locks
+        self.file_lock_mode = file_lock_mode
+        self.file_lock_timeout = parse_time(file_lock_timeout)
+        self.file_lock_lease_duration = parse_time(file_lock_lease_duration)
+
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError("The fsync policy {} is not supported, the available ones are {}".format(
+                fsync_policy, FSYNC_POLICIES
+            ))
+        self.fsync_policy = fsync_policy
+        self.io_executor = io_executor
+        self.write_behind = write_behind
+
+        if structured_path_workers < 1:
+            raise ValueError("The argument `structured_path_workers` must be at least 1, got {}".format(
+                structured_path_workers
+            ))
+        self.structured_path_workers = structured_path_workers
+
+        self.elementwise = elementwise
+        if self.elementwise is not None:
+            if not isinstance(cache_path, str):
+                raise ValueError((
+                    "The argument `elementwise` can only be used with a string "
+                    "`cache_path`, got '{}'"
+                ).format(cache_path))
+            # The elements are hashed separately
+            self.args_to_ignore.append(self.elementwise)
+
+        self.generator_chunk_size = generator_chunk_size
+
+        self.cache_exceptions = tuple(cache_exceptions)
+        self.exception_validity_duration = parse_time(exception_validity_duration)
+        if self.exception_validity_duration is None:
+            self.exception_validity_duration = self.validity_duration
+
+        self.min_compute_time = parse_time(min_compute_time)
+        self.max_dump_size = max_dump_size
+        self.adaptive_bypass = adaptive_bypass
+        self._bypass_policy = BypassPolicy()
+
+        for name, fraction in (("refresh_ahead", refresh_ahead), ("validity_jitter", validity_jitter)):
+            if not 0 <= fraction < 1:
+                raise ValueError("The argument `{}` must be between 0 and 1, got {}".format(name, fraction))
+        self.stale_while_revalidate = stale_while_revalidate
+        self.refresh_ahead = refresh_ahead
+        self.validity_jitter = validity_jitter
+
+        self.checkpoint_arg_name = checkpoint_arg_name
+        if self.checkpoint_arg_name is not None:
+            if self.elementwise is not None:
+                raise ValueError("The checkpoints are not supported in the elementwise mode.")
+            self.args_to_ignore.append(self.checkpoint_arg_name)
+
+        self.range_args = range_args
+        if self.range_args is not None:
+            if not isinstance(cache_path, str):
+                raise ValueError((
+                    "The argument `range_args` can only be used with a string "
+                    "`cache_path`, got '{}'"
+                ).format(cache_path))
+            if self.elementwise is not None or self.checkpoint_arg_name is not None:
+                raise ValueError("The argument `range_args` can't be used with `elementwise` or `checkpoint_arg_name`.")
+            if len(self.range_args) != 2:
+                raise ValueError("The argument `range_args` must be the names of the start and the end arguments.")
+            # The ranges are looked up in the segments
+            self.args_to_ignore.extend(self.range_args)
+
+        self.delta_storage = delta_storage
+        self.max_delta_chain = max_delta_chain
+
+        if miss_queue_fallback not in ("raise", "compute"):
+            raise ValueError(
+                "The miss queue fallback {} is not supported, the available ones are raise and compute.".format(
+                    miss_queue_fallback
+                )
+            )
+        self.miss_queue_timeout = parse_time(miss_queue_timeout)
+        self.miss_queue_fallback = miss_queue_fallback
+        self.negative_lookup_ttl = negative_lookup_ttl
+
+        if metadata_level not in ("none", "minimal", "full"):
+            raise ValueError(
+                "The metadata level {} is not supported, the available ones are none, minimal, and full.".format(
+                    metadata_level
+                )
+            )
+        if metadata_level == "none" and self.validity_duration is not None:
+            raise ValueError("The `validity_duration` needs the creation time saved in the metadata, so the `metadata_level` can't be none.")
+        self.metadata_level = metadata_level
+        self._written_sources = set()
+
+        self._miss_limiter = MissLimiter(
+            max_concurrent_misses,
+            max_shared_concurrent_misses,
+            lock_mode=file_lock_mode,
+            lease_duration=self.file_lock_lease_duration,
+        )
+
+        self.lazy = lazy
+        if self.lazy and isinstance(cache_path, str):
+            raise ValueError((
+                "The argument `lazy` has no meaning if the `cache_path` isn't "
+                "structured. `cache_path`='{}'"
+            ).format(cache_path))
 
         self.optional_path_keys = optional_path_keys
 
@@ -211,13 +533,12 @@ class Cache:
         """Check that at least one backend exists that can handle the given path.
         This is just a quality of life check to raise an exception early and not
         after the computation is done."""
-        test_bk = Backend({}, {})
         if isinstance(path, str):
-            if not test_bk.support_path(path):
+            if not self._backend.support_path(path):
                 raise ValueError((
                     "There is not backend that can support the path '{}'. "
                     "The available extensions are '{}'."
-                ).format(path, test_bk.get_supported_extensions()))
+                ).format(path, self._backend.get_supported_extensions()))
         elif isinstance(path, list) or isinstance(path, tuple):
             for sub_path in path:
                 self._check_path_sanity(sub_path)
@@ -252,7 +573,12 @@ class Cache:
         dirname = os.path.dirname(os.path.abspath(path))
         if dirname != "":
             os.makedirs(dirname, exist_ok=True)
-        Backend({}, {}).dump(obj, path)
+        tmp_path = get_temporary_path(path)
+        try:
+            default_backend.dump(obj, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            remove_temporary_path(tmp_path)
 
     @staticmethod
     def load(path: str):
@@ -268,7 +594,107 @@ class Cache:
         -------
         The loaded object.
         """
-        return Backend({}, {}).load({}, path)
+        return default_backend.load({}, path)
+
+    @staticmethod
+    def set_memory_cache_limits(max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        """Set the limits of the in-process memory cache shared by all the 
+        functions decorated with `use_memory_cache=True`.
+
+        Arguments
+        ---------
+            max_entries: Optional[int] = None,
+                The maximum number of results to keep in memory.
+            max_bytes: Optional[int] = None,
+                The maximum estimated size in bytes of the results to keep in memory.
+        """
+        global_memory_cache.set_limits(max_entries=max_entries, max_bytes=max_bytes)
+
+    @staticmethod
+    def clear_memory_cache() -> None:
+        """Drop all the results kept in the in-process memory cache, together
+        with the parsed metadata and the paths recently found missing."""
+        global_memory_cache.clear()
+        global_metadata_cache.clear()
+        global_negative_lookups.clear()
+
+    @staticmethod
+    def set_write_behind_limits(max_pending_bytes: Optional[int] = None) -> None:
+        """Set the limits of the background writes of the functions decorated
+        with `write_behind=True`.
+
+        Arguments
+        ---------
+            max_pending_bytes: Optional[int] = None,
+                The maximum estimated size of the results waiting to be saved,
+                after which the calls wait for the pending writes.
+        """
+        if max_pending_bytes is not None:
+            global_write_behind.max_pending_bytes = max_pending_bytes
+
+    @staticmethod
+    def flush_writes(timeout: Optional[float] = None) -> bool:
+        """Wait for the background writes of the functions decorated with
+        `write_behind=True` to finish.
+
+        Arguments
+        ---------
+            timeout: Optional[float] = None,
+                The maximum number of seconds to wait, by default wait until they are done.
+
+        Returns
+        -------
+        If all the writes are done.
+        """
+        return global_write_behind.flush(timeout)
+
+    @staticmethod
+    def set_background_refresh_limit(max_refreshes: int) -> None:
+        """Set how many stale caches can be recomputed in background at the
+        same time, by the functions with `stale_while_revalidate` or `refresh_ahead`.
+        The refreshes requested when the limit is reached are skipped.
+
+        Arguments
+        ---------
+            max_refreshes: int,
+                The maximum number of concurrent background refreshes.
+        """
+        global_refresher.set_limit(max_refreshes)
+
+    @staticmethod
+    def wait_for_refreshes(timeout: Optional[float] = None) -> bool:
+        """Wait for the background refreshes of the stale caches to finish.
+
+        Arguments
+        ---------
+            timeout: Optional[float] = None,
+                The maximum number of seconds to wait, by default wait until they are done.
+
+        Returns
+        -------
+        If all the refreshes are done.
+        """
+        return global_refresher.wait(timeout)
+
+    @staticmethod
+    def sweep_temporary_files(directory: str, max_age: Union[int, str] = "1h") -> int:
+        """Remove from the directory the temporary files left by writes that
+        crashed. The caches automatically sweep each directory the first time
+        they write in it.
+
+        Arguments
+        ---------
+            directory: str,
+                The directory to clean.
+            max_age: Union[int, str] = "1h",
+                Only the temporary files older than this are removed, so that we don't
+                remove the ones still being written. The format is the same of `validity_duration`.
+
+        Returns
+        -------
+        How many files were removed.
+        """
+        return sweep_temporary_files(directory, parse_time(max_age))
 
     @staticmethod
     def compute_path(function: Callable, *args, **kwargs) -> str:
@@ -309,15 +735,52 @@ class Cache:
 
         return function_info
 
-    def _backup(self, result, path, exception, args, kwargs):
+    def _get_function_details(self) -> Tuple[dict, ParamsBinder, Optional[str]]:
+        """Get the informations on the decorated function, how to bind its
+        parameters, and the version of its source. They are computed on the
+        first call so that decorating a function is cheap."""
+        details = self._function_details
+        if details is None:
+            details = self._make_function_details(self._compute_function_info(self.decorated_function))
+            self._function_details = details
+            set_function_version(self._function_key, details[2])
+        return details
+
+    @staticmethod
+    def _make_function_details(function_info: dict) -> Tuple[dict, ParamsBinder, Optional[str]]:
+        version = None
+        if "source" in function_info:
+            version = sha256({"source":function_info["source"]})
+        return function_info, ParamsBinder(function_info), version
+
+    @property
+    def function_info(self) -> dict:
+        return self._get_function_details()[0]
+
+    @function_info.setter
+    def function_info(self, function_info: dict):
+        self._function_details = self._make_function_details(function_info)
+
+    @property
+    def _params_binder(self) -> ParamsBinder:
+        return self._get_function_details()[1]
+
+    @property
+    def _function_version(self) -> Optional[str]:
+        return self._get_function_details()[2]
+
+    def _backup(self, result, path, exception, args, kwargs, context=None):
         """This function handle the backupping of the data when an the serialization fails."""
 
         # Check if it's a structured path
         if isinstance(path, list) or isinstance(path, tuple):
-            return self._backup(result, path[0], exception, args, kwargs)
+            return self._backup(result, path[0], exception, args, kwargs, context)
                 
         elif isinstance(path, dict):
-            return self._backup(result, next(path.values()), exception, args, kwargs)
+            return self._backup(result, next(iter(path.values())), exception, args, kwargs, context)
+
+        if context is None:
+            context = self._get_call_context(args, kwargs)
 
         date = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
         # Ensure that the we won't overwrite anything
@@ -330,8 +793,9 @@ class Cache:
                 extra_kwargs={
                     "_date":date, 
                     "_rnd":rnd,
-                    "cache_path":self._get_formatted_path(args, kwargs),
-                }
+                    "cache_path":self._get_formatted_path(args, kwargs, context=context),
+                },
+                context=context,
             )
             # Check for the existance
             if os.path.exists(backup_path):
@@ -365,7 +829,79 @@ class Cache:
     def _get_metadata_path(self, path):
         return path + ".metadata"
 
-    def _is_cache_enabled(self, args, kwargs, inner_self = None):
+    def _get_lock_path(self, path):
+        # Structured paths are locked through their first path
+        if isinstance(path, list) or isinstance(path, tuple):
+            return self._get_lock_path(path[0])
+        elif isinstance(path, dict):
+            return self._get_lock_path(next(iter(path.values())))
+        return path + ".lock"
+
+    def _get_exception_path(self, path):
+        # The exceptions of structured paths are saved next to their first path
+        if isinstance(path, list) or isinstance(path, tuple):
+            return self._get_exception_path(path[0])
+        elif isinstance(path, dict):
+            return self._get_exception_path(next(iter(path.values())))
+        return path + ".exception"
+
+    def _get_checkpoint_path(self, path):
+        # The checkpoints of structured paths are saved next to their first path
+        if isinstance(path, list) or isinstance(path, tuple):
+            return self._get_checkpoint_path(path[0])
+        elif isinstance(path, dict):
+            return self._get_checkpoint_path(next(iter(path.values())))
+        return path + ".checkpoint.pkl"
+
+    def _add_checkpoint(self, args, kwargs, path=None):
+        """Pass the checkpoint to the function, if enabled. Without a path,
+        i.e. when the cache is disabled, the checkpoint saves nothing."""
+        if self.checkpoint_arg_name is None:
+            return kwargs
+        if path is None:
+            return {**kwargs, self.checkpoint_arg_name:Checkpoint()}
+
+        checkpoint_path = self._get_checkpoint_path(path)
+        start_time = time()
+
+        # The state is still used by the function, so it's not kept in the
+        # memory cache, which makes the arrays read-only
+        def save(state):
+            self.logger.info("Saving the checkpoint at %s", checkpoint_path)
+            if not self._dump(args, kwargs, state, checkpoint_path, start_time, time(), use_memory_cache=False):
+                self.logger.warning(
+                    "The checkpoint at %s was not saved, as it's bigger than the `max_dump_size` of %s bytes",
+                    checkpoint_path, self.max_dump_size
+                )
+
+        return {
+            **kwargs,
+            self.checkpoint_arg_name:Checkpoint(lambda: self._load(checkpoint_path, use_memory_cache=False), save),
+        }
+
+    def _remove_checkpoint(self, path):
+        """Remove the checkpoint, if any, once the final result is saved."""
+        if self.checkpoint_arg_name is None:
+            return
+        checkpoint_path = self._get_checkpoint_path(path)
+        self._remove_cache_file(checkpoint_path)
+        try:
+            os.remove(self._get_metadata_path(checkpoint_path))
+        except FileNotFoundError:
+            pass
+
+    def _dump_exception(self, path, exception: BaseException):
+        """Save the exception raised by the function if it has to be cached."""
+        if not isinstance(exception, self.cache_exceptions):
+            return
+        exception_path = self._get_exception_path(path)
+        self.logger.info("Saving the exception %r at %s", exception, exception_path)
+        try:
+            dump_exception(exception_path, exception)
+        except Exception:
+            self.logger.exception("Could not save the exception at %s", exception_path)
+
+    def _is_cache_enabled(self, args, kwargs, inner_self = None, context = None):
         # if enable_cache_arg_name is not defined, then forward
         if self.enable_cache_arg_name is None:
             return True, args, kwargs
@@ -379,7 +915,9 @@ class Cache:
             return cache_enabled, args, kwargs
 
         # Normalize args and kwargs
-        params = get_params(self.function_info, args, kwargs)
+        if context is None:
+            context = self._get_call_context(args, kwargs, inner_self)
+        params = dict(context.params)
 
         # TODO!: implement this
         # # if it was in the args, we need to remove it from there 
@@ -414,72 +952,255 @@ class Cache:
 
         return root, args, kwargs
 
-    def _load(self, path):
-
-        # Check if it's a structured path
-        if isinstance(path, list) or isinstance(path, tuple):
-            result = []
-            for p in path:
-                cache = self._load(p)
-
-                if cache is None:
-                    return None
-
-                result.append(cache)
+    def _get_structured_executor(self, paths) -> Optional[Executor]:
+        """Return the pool where to load or dump the elements of a structured
+        path, or None if they should be handled sequentially."""
+        if self.structured_path_workers <= 1 or len(paths) <= 1:
+            return None
+        # The elements run in the pool, so a nested structure is handled
+        # sequentially, otherwise its tasks could wait for themselves
+        if threading.current_thread().name.startswith("cache_decorator_structured"):
+            return None
+        return get_shared_executor(
+            "structured_{}".format(self.structured_path_workers),
+            self.structured_path_workers,
+        )
 
-            if isinstance(path, tuple):
-                result = tuple(result)
-            return result
+    def _load_structured(self, paths: Dict, refresh: Optional[list] = None) -> Union[Dict, object]:
+        """Load the elements of a structured path, returning MISSING as soon as
+        one of the required ones is missing."""
+        executor = self._get_structured_executor(paths)
+        result = {}
 
-        elif isinstance(path, dict):
-            result = {}
-            for key, p in path.items():
-                cache = self._load(p)
+        if executor is None:
+            for key, p in paths.items():
+                cache = self._load(p, refresh)
 
                 # if we couldn't load the cache
-                if cache is None:
+                if cache is MISSING:
                     # and it's optional it's fine, go on loading the other ones
                     if key in self.optional_path_keys:
                         continue
                     # else it's an error and we cannot load the required data
                     # therefore the cache is invalid
                     else:
-                        return None
+                        return MISSING
 
                 result[key] = cache
             return result
 
-        # Check if the cache exists and is readable
-        if not os.path.isfile(path):
+        futures = {
+            executor.submit(self._load, p, refresh): key
+            for key, p in paths.items()
+        }
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                cache = future.result()
+                if cache is MISSING:
+                    if key in self.optional_path_keys:
+                        continue
+                    return MISSING
+                result[key] = cache
+        finally:
+            # There is no point in loading the others if the cache is invalid
+            for future in futures:
+                future.cancel()
+
+        # Keep the order of the path
+        return {
+            key: result[key]
+            for key in paths
+            if key in result
+        }
+
+    def _load_lazy(self, path, refresh: Optional[list] = None):
+        """Check that all the files of the structured path are valid, and return
+        a lazy Mapping or Sequence that loads each value when first accessed."""
+        if isinstance(path, list) or isinstance(path, tuple):
+            members = [self._load_lazy(p, refresh) for p in path]
+            if any(member is MISSING for member in members):
+                return MISSING
+            return LazySequence(members)
+
+        if isinstance(path, dict):
+            members = {}
+            for key, p in path.items():
+                member = self._load_lazy(p, refresh)
+                if member is MISSING:
+                    if key in self.optional_path_keys:
+                        continue
+                    return MISSING
+                members[key] = member
+            return LazyMapping(members)
+
+        if self.use_memory_cache:
+            found, result = self._load_from_memory(path, refresh)
+            if found:
+                return result
+
+        if self._load_metadata(path, refresh) is None:
+            return MISSING
+        return LazyValue(lambda: self._load_member(path))
+
+    def _load_member(self, path: str):
+        """Load a value of a lazy result, which was valid when the result was created."""
+        result = self._load(path)
+        if result is MISSING:
+            raise FileNotFoundError(
+                "The cache at '{}' was removed or expired after it was checked.".format(path)
+            )
+        return result
+
+    def _load(self, path, refresh: Optional[list] = None, use_memory_cache: bool = True):
+        """Load the cache at the path, the memory cache is skipped if
+        `use_memory_cache` is False."""
+        use_memory_cache = use_memory_cache and self.use_memory_cache
+        if self.lazy and not isinstance(path, str):
+            return self._load_lazy(path, refresh)
+
+        # Check if it's a structured path
+        if isinstance(path, list) or isinstance(path, tuple):
+            result = self._load_structured(dict(enumerate(path)), refresh)
+            if result is MISSING:
+                return MISSING
+
+            result = list(result.values())
+            if isinstance(path, tuple):
+                result = tuple(result)
+            return result
+
+        elif isinstance(path, dict):
+            return self._load_structured(path, refresh)
+
+        if use_memory_cache:
+            found, result = self._load_from_memory(path, refresh)
+            if found:
+                return result
+
+        load_start_time = time()
+        metadata = self._load_metadata(path, refresh, check_exists=False)
+        if metadata is None:
+            return MISSING
+
+        # actually load the values, the cache might have been removed
+        # after its metadata was read
+        try:
+            if "delta" in metadata:
+                result = self._load_delta(path, metadata)
+                if result is MISSING:
+                    return MISSING
+            else:
+                result = self._backend.load(metadata.get("backend_metadata", {}), path)
+        except FileNotFoundError:
             self.logger.info("The cache at path '%s' does not exists.", path)
+            return MISSING
+
+        if self.adaptive_bypass:
+            load_time = time() - load_start_time
+            if self._bypass_policy.record_load(path, load_time, metadata.get("time_delta")):
+                self.logger.info(
+                    "Loading %s took %.3fs, more than the %.3fs to compute it",
+                    path, load_time, metadata["time_delta"]
+                )
+
+        if use_memory_cache:
+            global_memory_cache.put(path, result, metadata.get("creation_time"), metadata.get("dependencies"))
+
+        return result
+
+    def _load_from_memory(self, path: str, refresh: Optional[list] = None) -> Tuple[bool, object]:
+        """Return if the result is in the memory cache and still valid, with the
+        same checks of the results on disk, and the result."""
+        found, result, creation_time, dependencies = global_memory_cache.get_entry(path)
+        if not found:
+            return False, None
+
+        if (dependencies and not self._are_dependencies_valid(dependencies)) or not self._check_lifetime(path, creation_time, refresh):
+            global_memory_cache.pop(path)
+            return False, None
+
+        self.logger.info("Loading cache from memory for %s", path)
+        return True, result
+
+    def _load_metadata(self, path: str, refresh: Optional[list] = None, check_exists: bool = True) -> Optional[dict]:
+        """Return the metadata of the cache at the given path, or None if the
+        cache doesn't exist or is expired, in which case it's removed.
+        If a refresh list is given, the paths that should be recomputed in
+        background are appended to it, and the stale caches are kept.
+        Without `check_exists`, when the metadata exists the caller has to
+        handle the `FileNotFoundError` of the cache itself, which saves a
+        round trip to the filesystem."""
+        if self.negative_lookup_ttl and global_negative_lookups.contains(path, self.negative_lookup_ttl):
+            self.logger.info("The cache at path '%s' was recently found missing.", path)
             return None
 
-        self.logger.info("Loading cache from %s", path)
-
         metadata_path = self._get_metadata_path(path)
 
-        # Load the metadata if present
-        if os.path.isfile(metadata_path):
-            self.logger.info("Loading the metadata file at '%s'", metadata_path)
-            with open(metadata_path, "r") as f:
-                metadata = json.load(f)
-        else:
+        # Load the metadata if present, since the writes are atomic and the
+        # metadata is written first, if it's there it's complete.
+        # Only the fields needed to load the cache are parsed, and they are
+        # parsed again only if the file changed
+        try:
+            metadata = global_metadata_cache.get(metadata_path)
+        except FileNotFoundError:
             self.logger.info("The metadata file at '%s' do not exists.", metadata_path)
             # TODO: do we need to to more stuff?
             metadata = {}
+            check_exists = True
+
+        # Check if the cache exists and is readable
+        if check_exists and not os.path.isfile(path):
+            self.logger.info("The cache at path '%s' does not exists.", path)
+            if self.negative_lookup_ttl:
+                global_negative_lookups.add(path)
+            return None
+
+        self.logger.info("Loading cache from %s", path)
 
         # Check if the cache is still valid
-        if self.validity_duration is not None:
-            enlapsed_time = time() - metadata.get("creation_time", float("-inf"))
-            if  enlapsed_time > self.validity_duration:
-                try:
-                    os.remove(path)
-                except:
-                    pass
-                return None 
+        if not self._check_lifetime(path, metadata.get("creation_time"), refresh):
+            self._remove_cache_file(path)
+            return None
 
-        # actually load the values
-        return Backend(self.load_kwargs, self.dump_kwargs).load(metadata.get("backend_metadata", {}), path)
+        # Check if the cached results it used are still the same
+        dependencies = metadata.get("dependencies")
+        if dependencies:
+            if not self._are_dependencies_valid(dependencies):
+                self.logger.info("The cache at %s used results which changed", path)
+                self._remove_cache_file(path)
+                return None
+
+        return metadata
+
+    def _check_lifetime(self, path: str, creation_time: Optional[float], refresh: Optional[list] = None) -> bool:
+        """Return if the cache created at the given time can still be used.
+        If a refresh list is given, the path is appended to it when the cache
+        should be recomputed in background, and the stale caches can be used."""
+        if self.validity_duration is None:
+            return True
+
+        enlapsed_time = time() - (float("-inf") if creation_time is None else creation_time)
+        lifetime = self._get_lifetime(path, creation_time)
+        if enlapsed_time > lifetime:
+            if refresh is not None and self.stale_while_revalidate and creation_time is not None:
+                self.logger.info("The cache at %s is stale, it will be refreshed", path)
+                refresh.append(path)
+                return True
+            return False
+
+        if refresh is not None and self.refresh_ahead and enlapsed_time > lifetime * (1 - self.refresh_ahead):
+            self.logger.info("The cache at %s is about to expire, it will be refreshed", path)
+            refresh.append(path)
+        return True
+
+    def _get_lifetime(self, path: str, creation_time: Optional[float]) -> float:
+        """Return the validity duration of the cache, randomly shortened by the
+        jitter. The same cache always gets the same lifetime."""
+        if not self.validity_jitter:
+            return self.validity_duration
+        seed = zlib.crc32("{}:{}".format(path, creation_time).encode())
+        return self.validity_duration * (1 - self.validity_jitter * seed / 2**32)
 
     def _check_return_type_compatability(self, result, path):
         # Check if it's a structured path
@@ -505,15 +1226,38 @@ class Cache:
                 ).format(result.keys(), extra_keys))
             return 
 
-    def _dump(self, args, kwargs, result, path, start_time, end_time):
+    def _dump_structured(self, args, kwargs, elements, start_time, end_time, dependencies=None, queue_time=None, context=None):
+        """Dump the (result, path) elements of a structured path."""
+        executor = self._get_structured_executor(elements)
+        if executor is None:
+            for r, p in elements:
+                self._dump(args, kwargs, r, p, start_time, end_time, dependencies, queue_time, context)
+            return
+
+        futures = [
+            executor.submit(self._dump, args, kwargs, r, p, start_time, end_time, dependencies, queue_time, context)
+            for r, p in elements
+        ]
+        # Wait for all of them, so that no write is left running, and then
+        # raise the first error
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def _dump(self, args, kwargs, result, path, start_time, end_time, dependencies=None, queue_time=None, context=None, use_memory_cache=True):
+        # All the files of a structured path share the same parameters
+        if context is None:
+            context = self._get_call_context(args, kwargs)
+
         # Check if it's a structured path
         if isinstance(path, list) or isinstance(path, tuple):
-            for r, p in zip(result, path):
-                self._dump(args, kwargs, r, p, start_time, end_time)
+            self._dump_structured(args, kwargs, list(zip(result, path)), start_time, end_time, dependencies, queue_time, context)
             return 
         elif isinstance(path, dict):
-            for key in result.keys():
-                self._dump(args, kwargs, result[key], path[key], start_time, end_time)
+            self._dump_structured(args, kwargs, [
+                (result[key], path[key])
+                for key in result.keys()
+            ], start_time, end_time, dependencies, queue_time, context)
             return 
         
 
@@ -522,31 +1266,141 @@ class Cache:
         dirname = os.path.dirname(path)
         if dirname != "":
             os.makedirs(dirname, exist_ok=True)
-        dump_start_time = time()
-        backend_metadata = Backend(self.load_kwargs, self.dump_kwargs).dump(result, path) or {}
-        dump_end_time = time()
+        # Remove the temporary files of the writers that crashed
+        sweep_temporary_files_once(dirname, 60 * 60)
+
+        # Everything is written to temporary files and then atomically
+        # renamed, so no one can see a partially written cache
+        tmp_path = get_temporary_path(path)
+        try:
+            dump_start_time = time()
+            backend_metadata = self._backend.dump(result, tmp_path) or {}
+            delta_metadata, signature = None, None
+            if self.delta_storage and self._is_delta_candidate(path):
+                delta_metadata, signature = self._encode_delta(path, tmp_path)
+            dump_end_time = time()
+            committed = self._commit(
+                args, kwargs, path, tmp_path, backend_metadata,
+                start_time, end_time, dump_end_time - dump_start_time,
+                delta_metadata, dependencies, queue_time, context,
+            )
+            if committed and signature is not None:
+                self._dump_signature(path, signature)
+                if "base" in signature:
+                    self._add_delta_dependent(path, signature["base"])
+        except SerializationException as e:
+            # Report the real path and not the temporary one
+            e.path = path
+            raise e
+        finally:
+            remove_temporary_path(tmp_path)
+
+        if committed and use_memory_cache and self.use_memory_cache:
+            global_memory_cache.put(path, result, start_time, dependencies)
+        return committed
+
+    def _commit(self, args, kwargs, path, tmp_path, backend_metadata, start_time, end_time, dump_time, delta_metadata=None, dependencies=None, queue_time=None, context=None) -> bool:
+        """Write the metadata of the cache saved at the temporary path, and
+        atomically move both of them to their final paths. Returns False if
+        the cache is too big to be saved."""
+        dirname = os.path.dirname(path)
+        metadata_path = self._get_metadata_path(path)
+        tmp_metadata_path = self._get_metadata_path(tmp_path)
+        file_dump_size = os.path.getsize(tmp_path)
+
+        if self.max_dump_size is not None and file_dump_size > self.max_dump_size:
+            self._log_bypass("max_dump_size", path)
+            return False
+
+        metadata = self._get_metadata(
+            args, kwargs, path, backend_metadata, start_time, end_time, dump_time,
+            file_dump_size, delta_metadata, dependencies, queue_time, context
+        )
 
-        # Compute the metadata
+        if metadata is not None:
+            self.logger.info("Saving the cache meta-data at %s", metadata_path)
+            with open(tmp_metadata_path, "w") as f:
+                json.dump(metadata, f, separators=(",", ":"))
+
+        if self.fsync_policy != "none":
+            if metadata is not None:
+                fsync_file(tmp_metadata_path)
+            fsync_file(tmp_path)
+
+        # The deltas based on the previous cache must not be lost with it
+        if self.delta_storage:
+            self._release_delta_base(path)
+
+        # The metadata is published first, so whoever sees the cache also
+        # sees its metadata. Without metadata, the one of the previous
+        # cache must not be paired with the new one
+        if metadata is not None:
+            os.replace(tmp_metadata_path, metadata_path)
+        else:
+            try:
+                os.remove(metadata_path)
+            except FileNotFoundError:
+                pass
+        os.replace(tmp_path, path)
+
+        if self.fsync_policy == "directory":
+            fsync_directory(dirname)
+
+        global_negative_lookups.discard(path)
+
+        return True
+
+    def _get_metadata(
+        self, args, kwargs, path, backend_metadata, start_time, end_time, dump_time,
+        file_dump_size, delta_metadata, dependencies, queue_time, context
+    ) -> Optional[dict]:
+        """Compute the metadata of the cache for the metadata level, or None
+        if it doesn't need any."""
+        # What is needed to load the cache and check its validity
         metadata = {
-            # When the cache was created
             "creation_time": start_time,
+            "time_delta":end_time - start_time,
+            # The data reserved for the backend to corretly serialize and 
+            # de-serialize the values
+            "backend_metadata":backend_metadata,
+            # Identifies this version of the cache, for the results which use it
+            "entry_hash":get_entry_hash(path, start_time),
+        }
+
+        # How to rebuild the result from the base
+        if delta_metadata is not None:
+            metadata["delta"] = delta_metadata
+
+        # The cached results used to compute it
+        if dependencies:
+            metadata["dependencies"] = dependencies
+
+        if self.metadata_level == "none":
+            if backend_metadata or delta_metadata is not None or dependencies:
+                return metadata
+            return None
+
+        if self.metadata_level == "minimal":
+            return metadata
+
+        # Only the full metadata needs it, so it's imported on the first write
+        import humanize
+        metadata.update({
+            # When the cache was created
             "creation_time_human": datetime.fromtimestamp(
                 start_time
             ).strftime("%Y-%m-%d %H:%M:%S"),
 
             # How much the function took to compute the result
-            "time_delta":end_time - start_time,
             "time_delta_human":humanize.precisedelta(end_time - start_time),
 
             # How much time it took to serialize the result and save it to a file
-            "file_dump_time":dump_end_time - dump_start_time,
-            "file_dump_time_human":humanize.precisedelta(
-                dump_end_time - dump_start_time
-            ),
+            "file_dump_time":dump_time,
+            "file_dump_time_human":humanize.precisedelta(dump_time),
 
             # How big is the serialized result
-            "file_dump_size":os.path.getsize(path),
-            "file_dump_size_human":humanize.naturalsize(os.path.getsize(path)),
+            "file_dump_size":file_dump_size,
+            "file_dump_size_human":humanize.naturalsize(file_dump_size),
 
             # The arguments used to load and dump the file
             "load_kwargs":self.load_kwargs,
@@ -559,72 +1413,1095 @@ class Cache:
                 self.decorated_function.__code__.co_firstlineno
             ),
             "args_to_ignore":self.function_info["args_to_ignore"],
-            "source":self.function_info.get("source", None),
+        })
 
-            # The data reserved for the backend to corretly serialize and 
-            # de-serialize the values
-            "backend_metadata":backend_metadata,
-        }
+        if context is None:
+            context = self._get_call_context(args, kwargs)
+
+        # The source is saved once per version of the function
+        if "source" in self.function_info:
+            metadata["source_version"] = self._function_version
+            source_path = self._dump_source(args, kwargs, path, context)
+            if source_path is not None:
+                metadata["source_path"] = source_path
+            else:
+                metadata["source"] = self.function_info["source"]
+
+        # How much it waited for a slot to compute the result
+        if queue_time is not None:
+            metadata["queue_time"] = queue_time
+            metadata["queue_time_human"] = humanize.precisedelta(queue_time)
+
+        metadata["parameters"] = context.serializable_params
+        return metadata
+
+    def _dump_source(self, args, kwargs, path: str, context: CallContext) -> Optional[str]:
+        """Save the source of the function in the `.sources` directory of the
+        cache dir, if it's not already there. Returns the path of the source,
+        or None if the cache is not in the cache dir, since the directory of
+        the cache might be anywhere (e.g. the working directory), and then
+        the source is saved in the metadata."""
+        cache_dir = self._get_formatted_path(args, kwargs, formatter=self.cache_dir, context=context)
+        if os.path.commonpath([os.path.abspath(cache_dir), os.path.abspath(path)]) != os.path.abspath(cache_dir):
+            return None
+        source_path = os.path.join(cache_dir, ".sources", "{}.py".format(self._function_version))
+        if source_path in self._written_sources:
+            return source_path
+
+        if not os.path.exists(source_path):
+            os.makedirs(os.path.dirname(source_path), exist_ok=True)
+            tmp_source_path = get_temporary_path(source_path)
+            try:
+                with open(tmp_source_path, "w") as f:
+                    f.write(self.function_info["source"])
+                os.replace(tmp_source_path, source_path)
+            finally:
+                remove_temporary_path(tmp_source_path)
+
+        self._written_sources.add(source_path)
+        return source_path
+
+    def _get_signature_path(self, path: str) -> str:
+        return path + ".chunks"
+
+    def _get_dependents_path(self, path: str) -> str:
+        return path + ".dependents"
+
+    def _add_delta_dependent(self, path: str, base_name: str):
+        """Add the delta at the path to the index of the ones based on the base,
+        a file where the names are appended so that concurrent writers don't
+        overwrite each other. It might list deltas which were since replaced."""
+        dependents_path = self._get_dependents_path(os.path.join(os.path.dirname(path), base_name))
+        with open(dependents_path, "a") as f:
+            f.write(os.path.basename(path) + "\n")
+
+    def _dump_signature(self, path: str, signature: dict):
+        """Atomically save the chunks of the result, so it can be a base of the deltas."""
+        signature_path = self._get_signature_path(path)
+        tmp_signature_path = get_temporary_path(signature_path)
+        try:
+            with open(tmp_signature_path, "w") as f:
+                json.dump(signature, f)
+            os.replace(tmp_signature_path, signature_path)
+        finally:
+            remove_temporary_path(tmp_signature_path)
+
+    @staticmethod
+    def _is_delta_candidate(path: str) -> bool:
+        """Return if the file can be saved as a delta or be the base of one.
+        The checkpoints and the other files next to the caches are excluded,
+        as they are removed while the caches are still used."""
+        return not path.endswith((".checkpoint.pkl", ".exception", RANGE_SUFFIX, KEYS_SUFFIX))
+
+    def _release_delta_base(self, path: str):
+        """Rewrite in full the deltas based on the cache at the path, which is
+        about to be removed or replaced, and remove its chunks and its index."""
+        signature_path = self._get_signature_path(path)
+        dependents_path = self._get_dependents_path(path)
+        try:
+            with open(dependents_path, "r") as f:
+                names = set(f.read().split())
+        except FileNotFoundError:
+            names = set()
+            if not os.path.exists(signature_path):
+                return
 
-        params = {}
-        for key, val in get_params(self.function_info, args, kwargs).items():
-            if key in self.args_to_ignore:
+        dirname = os.path.dirname(path)
+        base_name = os.path.basename(path)
+        for name in sorted(names):
+            dependent_path = os.path.join(dirname, name)
+            try:
+                with open(self._get_signature_path(dependent_path), "r") as f:
+                    signature = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            # The delta might have been replaced since it was indexed
+            if signature.get("base") != base_name:
                 continue
 
+            data = self._read_serialized(dependent_path)
+            if data is None:
+                continue
+            self.logger.info("Rewriting in full the delta at %s, as its base %s is replaced", dependent_path, path)
+            self._materialize_delta(dependent_path, data, signature)
+
+        for file_path in (dependents_path, signature_path):
             try:
-                # Check if it's json serializable
-                json.dumps(val)
-                params[key] = val
-            except:
+                os.remove(file_path)
+            except FileNotFoundError:
                 pass
 
-
-        metadata["parameters"] = params
+    def _materialize_delta(self, path: str, data: bytes, signature: dict):
+        """Replace the delta at the path with its full serialized result.
+        The data is replaced before the metadata, and the loads recognize the
+        full data by its digest while the metadata still describes the delta."""
+        tmp_path = get_temporary_path(path)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            remove_temporary_path(tmp_path)
 
         metadata_path = self._get_metadata_path(path)
-        self.logger.info("Saving the cache meta-data at %s", metadata_path)
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f, indent=4)
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, ValueError):
+            metadata = None
+        if metadata is not None:
+            metadata.pop("delta", None)
+            tmp_metadata_path = get_temporary_path(metadata_path)
+            try:
+                with open(tmp_metadata_path, "w") as f:
+                    json.dump(metadata, f, separators=(",", ":"))
+                os.replace(tmp_metadata_path, metadata_path)
+            finally:
+                remove_temporary_path(tmp_metadata_path)
+
+        signature.pop("base", None)
+        signature["chain"] = 0
+        self._dump_signature(path, signature)
+
+    def _remove_cache_file(self, path: str):
+        """Remove the cache at the path, with its chunks, after rewriting in
+        full the deltas based on it."""
+        self._release_delta_base(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _find_delta_base(self, path: str, chunks: list) -> Optional[Tuple[str, dict]]:
+        """Find the result of the same function, in the same directory, that
+        shares the most content with the chunks, if it shares at least half of it."""
+        dirname = os.path.dirname(path)
+        try:
+            names = [
+                name
+                for name in os.listdir(dirname or ".")
+                if name.endswith(".chunks")
+            ]
+        except FileNotFoundError:
+            return None
+
+        # Only check the most recent ones, which are the most likely to be similar
+        signature_paths = sorted(
+            (os.path.join(dirname, name) for name in names),
+            key=lambda signature_path: os.path.getmtime(signature_path) if os.path.exists(signature_path) else 0,
+            reverse=True,
+        )[:32]
+
+        best, best_shared_size = None, 0
+        for signature_path in signature_paths:
+            base_path = signature_path[:-len(".chunks")]
+            if base_path == path or not self._is_delta_candidate(base_path) or not os.path.exists(base_path):
+                continue
+            try:
+                with open(signature_path, "r") as f:
+                    signature = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            if signature["function_name"] != self.function_info["function_name"]:
+                continue
+            if signature["chain"] >= self.max_delta_chain:
+                continue
+
+            shared_size = get_shared_size(chunks, {
+                chunk_hash:length
+                for chunk_hash, length in signature["chunks"]
+            })
+            if shared_size > best_shared_size:
+                best, best_shared_size = (base_path, signature), shared_size
+
+        total_size = sum(length for _, _, length in chunks)
+        if best is None or 2 * best_shared_size < total_size:
+            return None
+        return best
+
+    def _encode_delta(self, path: str, tmp_path: str) -> Tuple[Optional[dict], dict]:
+        """Replace the serialized result at the temporary path with its delta
+        from the most similar result, if any. Returns the metadata of the delta
+        and the chunks of the result."""
+        with open(tmp_path, "rb") as f:
+            data = f.read()
+        chunks = get_chunks(data)
+        signature = {
+            "function_name":self.function_info["function_name"],
+            "digest":get_digest(data),
+            "chain":0,
+            "chunks":[[chunk_hash, length] for chunk_hash, _, length in chunks],
+        }
+
+        base = self._find_delta_base(path, chunks)
+        if base is None:
+            return None, signature
+        base_path, base_signature = base
+        base_data = self._read_serialized(base_path)
+        if base_data is None:
+            return None, signature
+
+        base_chunks = []
+        offset = 0
+        for chunk_hash, length in base_signature["chunks"]:
+            base_chunks.append((chunk_hash, offset, length))
+            offset += length
+
+        operations = encode_delta(data, chunks, base_chunks)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(operations, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.logger.info("Saving %s as a delta from %s", path, base_path)
+        signature["chain"] = base_signature["chain"] + 1
+        signature["base"] = os.path.basename(base_path)
+        return {
+            "base":os.path.basename(base_path),
+            "base_digest":base_signature["digest"],
+            "digest":signature["digest"],
+            "chain":signature["chain"],
+        }, signature
+
+    def _read_serialized(self, path: str) -> Optional[bytes]:
+        """Return the serialized result at the path, rebuilding it if it's a
+        delta, or None if it or one of its bases is missing or changed."""
+        try:
+            with open(self._get_metadata_path(path), "r") as f:
+                metadata = json.load(f)
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        delta = metadata.get("delta")
+        # It might have just been rewritten in full, before its metadata
+        if delta is None or get_digest(data) == delta["digest"]:
+            return data
+
+        base_data = self._read_serialized(os.path.join(os.path.dirname(path), delta["base"]))
+        if base_data is None or get_digest(base_data) != delta["base_digest"]:
+            return None
+        data = apply_delta(base_data, pickle.loads(data))
+        if get_digest(data) != delta["digest"]:
+            return None
+        return data
+
+    def _load_delta(self, path: str, metadata: dict):
+        """Rebuild the serialized result and load it with the backend."""
+        data = self._read_serialized(path)
+        if data is None:
+            self.logger.warning("The base of the delta at %s was removed or changed", path)
+            self._remove_cache_file(path)
+            return MISSING
+
+        # The backends load from files, with the same name since some use it
+        tmp_path = get_temporary_path(path)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            return self._backend.load(metadata.get("backend_metadata", {}), tmp_path)
+        finally:
+            remove_temporary_path(tmp_path)
+
+    def _record_dependency(self, path, start_time: Optional[float] = None, end_time: Optional[float] = None):
+        """Record that the result at the path is used by the cached function
+        being computed, if any. If the result was just computed its start time
+        is given, and it's recorded only if it was saved, or if it's being saved
+        in background, in which case the dependent checks it before being saved.
+        Otherwise the version of the cache is read from its metadata."""
+        if not is_recording():
+            return
+        # Without metadata its version can't be checked
+        if self.metadata_level == "none":
+            return
+        # The results which are too fast to compute are not saved
+        if start_time is not None and self.min_compute_time is not None and end_time - start_time < self.min_compute_time:
+            return
+
+        pending = None
+        if start_time is not None and self.write_behind and global_write_behind.get(get_path_key(path))[0]:
+            pending = get_path_key(path)
+
+        for _, leaf_path in self._iter_leaf_paths(path):
+            if start_time is not None:
+                entry_hash = get_entry_hash(leaf_path, start_time)
+                # It might have been rejected, e.g. by `max_dump_size`
+                if pending is None and self._read_entry_hash(leaf_path) != entry_hash:
+                    continue
+            else:
+                entry_hash = self._read_entry_hash(leaf_path)
+                if entry_hash is None:
+                    continue
+
+            dependency = {
+                "path":leaf_path,
+                "function":self._function_key,
+                "version":self._function_version,
+                "entry_hash":entry_hash,
+            }
+            if pending is not None:
+                dependency["pending"] = pending
+            record_dependency(dependency)
+
+    def _read_entry_hash(self, path: str) -> Optional[str]:
+        """Return the hash of the version of the cache saved at the path, if any."""
+        try:
+            return global_metadata_cache.get(self._get_metadata_path(path)).get("entry_hash")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _get_saved_dependencies(self, dependencies: Optional[List[dict]]) -> Optional[List[dict]]:
+        """Wait for the dependencies which were being saved in background, and
+        drop the ones which in the end were not saved."""
+        if not dependencies or not any("pending" in dependency for dependency in dependencies):
+            return dependencies
+
+        saved = []
+        for dependency in dependencies:
+            if "pending" in dependency:
+                global_write_behind.wait(dependency["pending"])
+                dependency = {
+                    key:value
+                    for key, value in dependency.items()
+                    if key != "pending"
+                }
+                if self._read_entry_hash(dependency["path"]) != dependency["entry_hash"]:
+                    continue
+            saved.append(dependency)
+        return saved
+
+    def _are_dependencies_valid(self, dependencies: List[dict], checked: Optional[set] = None) -> bool:
+        """Check, recursively, that the cached results used to compute a result
+        were not recomputed, removed, or computed by an older version of their function."""
+        checked = set() if checked is None else checked
+        for dependency in dependencies:
+            path = dependency["path"]
+            if path in checked:
+                continue
+
+            current_version = get_function_version(dependency["function"])
+            if current_version is not None and current_version != dependency["version"]:
+                self.logger.info("The function %s which computed %s changed", dependency["function"], path)
+                return False
+
+            try:
+                metadata = global_metadata_cache.get(self._get_metadata_path(path))
+            except (FileNotFoundError, ValueError):
+                return False
+            if metadata.get("entry_hash") != dependency["entry_hash"] or not os.path.isfile(path):
+                return False
+
+            checked.add(path)
+            if not self._are_dependencies_valid(metadata.get("dependencies", []), checked):
+                return False
+        return True
+
+    def _forget_missing(self, path):
+        """Check again the files of the path, even if they were recently found missing."""
+        if self.negative_lookup_ttl:
+            for _, leaf_path in self._iter_leaf_paths(path):
+                global_negative_lookups.discard(leaf_path)
+
+    def _log_bypass(self, reason: str, path):
+        """Count and log a decision of not using the cache."""
+        self._bypass_policy.count(reason)
+        self.logger.info("Bypassing the cache for %s because of %s", path, reason)
+
+    def _get_bypass_reason(self, path) -> Optional[str]:
+        """Return why the cache should not be used for the path, if it shouldn't."""
+        if not self.adaptive_bypass:
+            return None
+        if self._bypass_policy.is_function_slow():
+            return "slow_load_function"
+        if any(
+            self._bypass_policy.is_key_slow(leaf)
+            for _, leaf in self._iter_leaf_paths(path)
+        ):
+            return "slow_load_key"
+        return None
 
 
     def _decorate_function(self, function: Callable) -> Callable:
         # wraps to support pickling
         @wraps(function)
         def wrapped(*args, **kwargs):
-            cache_enabled, args, kwargs = self._is_cache_enabled(args, kwargs)
+            # The arguments are bound once, and their hash is computed at
+            # most once, for everything that needs them in this call
+            context = self._get_call_context(args, kwargs)
+            cache_enabled, args, kwargs = self._is_cache_enabled(args, kwargs, context=context)
             
             # if the cache is not enabled just forward the call
             if not cache_enabled:
                 self.logger.info("The cache is disabled")
-                result = function(*args, **kwargs)
+                result = function(*args, **self._add_checkpoint(args, kwargs))
                 self._check_return_type_compatability(result, self.cache_path)
                 return result
 
             # Get the path
-            path = self._get_formatted_path(args, kwargs)
+            path = self._get_formatted_path(args, kwargs, context=context)
+            return self._call_with_path(function, args, kwargs, path, context)
+
+        def imap(iterable, executor: Optional[Executor] = None, prefetch: int = 8):
+            """Lazily call the cached function on each element of the iterable,
+            which is a tuple of positional arguments, a dict of keyword arguments,
+            or a single argument. The misses are computed in the executor while
+            the next `prefetch` hits are loaded in background."""
+            return self._imap(wrapped, function, iterable, executor, prefetch)
+
+        def map(iterable, executor: Optional[Executor] = None, prefetch: int = 8) -> list:
+            """Like `imap` but returns the list of the results."""
+            return list(imap(iterable, executor, prefetch))
+
+        def load_key(key, *args, **kwargs):
+            """Load only the value at the given key (or index) of the structured
+            cache_path, computing the whole result if it's not cached."""
+            return self._load_key(wrapped, key, args, kwargs)
+
+        wrapped.imap = imap
+        wrapped.map = map
+        wrapped.load_key = load_key
+        wrapped.bypass_counts = self._bypass_policy.counts
 
-            # Try to load the cache
+        # add a reference to the cached function so we can unpack
+        # The caching if needed
+        setattr(wrapped, "__cached_function", function)
+        setattr(wrapped, "__cacher_instance", self)
+        return wrapped
+
+    def _call_with_path(self, function: Callable, args, kwargs, path, context: CallContext):
+        """Load the result of the enabled call from the path, or compute it."""
+        kwargs = self._add_checkpoint(args, kwargs, path)
+
+        if self.elementwise is not None:
+            return self._elementwise_call(function, args, kwargs, path)
+
+        if self.range_args is not None:
+            return self._range_call(function, args, kwargs, path)
+
+        bypass_reason = self._get_bypass_reason(path)
+        if bypass_reason is not None:
+            self._log_bypass(bypass_reason, path)
+            return function(*args, **kwargs)
+
+        # Try to load the cache
+        refresh = []
+        result = self._lookup(path, refresh)
+        # if we got a result, reutrn it
+        if result is not MISSING:
+            self._on_hit(function, args, kwargs, path, context, refresh)
+            return result
+
+        # otherwise compute the result, if other threads are already
+        # computing the same path we wait for their result
+        return global_single_flight.do(
+            get_path_key(path),
+            lambda: self._locked_load_or_compute(function, args, kwargs, path, context)
+        )
+
+    def _on_hit(self, function: Callable, args, kwargs, path, context: CallContext, refresh: list):
+        """Refresh the result in background if it's stale, and record it as a
+        dependency of the cached call running in this thread, if any."""
+        if refresh:
+            self._schedule_refresh(function, args, kwargs, path, context)
+        self._record_dependency(path)
+
+    def _get_argument(self, name: str, args, kwargs) -> Tuple[object, Callable]:
+        """Return the value of the argument and a function to replace it in the call."""
+        if name in kwargs:
+            return kwargs[name], lambda value: (args, {**kwargs, name:value})
+
+        if name in self.function_info["args"]:
+            index = self.function_info["args"].index(name)
+            if index < len(args):
+                return args[index], lambda value: (args[:index] + (value,) + args[index + 1:], kwargs)
+
+        raise ValueError(
+            "The argument '{}' was not given to the function {}".format(
+                name, self.function_info["function_name"]
+            )
+        )
+
+    def _split_extension(self, path: str) -> Tuple[str, str]:
+        """Split the path in the part before the longest supported extension and the extension."""
+        extension = max(
+            (
+                extension
+                for extension in self._backend.get_supported_extensions()
+                if path.endswith(extension)
+            ),
+            key=len,
+            default="",
+        )
+        return path[:len(path) - len(extension)], extension
+
+    def _elementwise_call(self, function: Callable, args, kwargs, path: str):
+        """Load the outputs of the elements already in the store of the path,
+        and compute the others with a single call of the function."""
+        batch, replace_batch = self._get_argument(self.elementwise, args, kwargs)
+        if len(batch) == 0:
+            return function(*args, **kwargs)
+
+        directory, extension = self._split_extension(path)
+
+        keys = get_element_keys(batch, self.use_approximated_hash)
+        segments = {}
+        missing = []
+        for position, location in enumerate(global_element_index.lookup(directory, keys)):
+            if location is None:
+                missing.append(position)
+                continue
+            segment, row = location
+            positions, rows = segments.setdefault(segment, ([], []))
+            positions.append(position)
+            rows.append(row)
+
+        pieces = []
+        for segment, (positions, rows) in segments.items():
+            values = self._load(os.path.join(directory, segment + extension))
+            # The segment expired or was removed, so its elements are computed again
+            if values is MISSING:
+                try:
+                    os.remove(os.path.join(directory, segment + KEYS_SUFFIX))
+                except FileNotFoundError:
+                    pass
+                missing.extend(positions)
+                continue
+            pieces.append((positions, take(values, rows)))
+
+        self.logger.info(
+            "Found %d of the %d elements in %s", len(batch) - len(missing), len(batch), directory
+        )
+
+        if missing:
+            missing.sort()
+            # The repeated elements are computed once
+            first_positions = {}
+            for position in missing:
+                first_positions.setdefault(keys[position], position)
+            missing_keys = list(first_positions.keys())
+
+            call_args, call_kwargs = replace_batch(take(batch, list(first_positions.values())))
+            queue_time, slot = self._wait_miss_slot(call_args, call_kwargs)
+            start_time = time()
+            try:
+                result = function(*call_args, **call_kwargs)
+            finally:
+                self._miss_limiter.release(slot)
+            end_time = time()
+
+            if len(result) != len(missing_keys):
+                raise ValueError(
+                    "The function {} returned {} outputs for {} elements".format(
+                        self.function_info["function_name"], len(result), len(missing_keys)
+                    )
+                )
+
+            # The segment is visible to the lookups only once its keys are saved
+            segment = "{}_{}".format(time_ns(), random_string(4))
+            self._save(
+                call_args, call_kwargs, result, os.path.join(directory, segment + extension),
+                start_time, end_time, queue_time=queue_time
+            )
+            keys_path = os.path.join(directory, segment + KEYS_SUFFIX)
+            tmp_keys_path = get_temporary_path(keys_path)
+            try:
+                with open(tmp_keys_path, "w") as f:
+                    json.dump(missing_keys, f)
+                os.replace(tmp_keys_path, keys_path)
+            finally:
+                remove_temporary_path(tmp_keys_path)
+
+            rows = {key:row for row, key in enumerate(missing_keys)}
+            pieces.append((missing, take(result, [rows[keys[position]] for position in missing])))
+
+        return assemble(pieces, len(batch))
+
+    def _load_key(self, wrapped: Callable, key, args, kwargs):
+        if isinstance(self.cache_path, str):
+            raise ValueError("The method `load_key` can only be used if the `cache_path` is structured.")
+
+        # Copy the kwargs since the enable cache arg might be captured
+        cache_enabled, call_args, call_kwargs = self._is_cache_enabled(args, dict(kwargs))
+        if cache_enabled:
+            path = self._get_formatted_path(call_args, call_kwargs)[key]
             result = self._load(path)
-            # if we got a result, reutrn it
-            if result is not None:
+            if result is not MISSING:
                 return result
-            
+
+        return wrapped(*args, **kwargs)[key]
+
+    def _replace_range(self, args, kwargs, start, end):
+        """Return the args and kwargs of the call with the given range."""
+        start_name, end_name = self.range_args
+        _, replace_start = self._get_argument(start_name, args, kwargs)
+        args, kwargs = replace_start(start)
+        _, replace_end = self._get_argument(end_name, args, kwargs)
+        return replace_end(end)
+
+    def _range_call(self, function: Callable, args, kwargs, path: str):
+        """Load the segments of the store of the path inside the range of the
+        call, and compute only the gaps between them."""
+        start_name, end_name = self.range_args
+        start, _ = self._get_argument(start_name, args, kwargs)
+        end, _ = self._get_argument(end_name, args, kwargs)
+        if not start < end:
+            return function(*args, **kwargs)
+
+        directory, extension = self._split_extension(path)
+        plan = plan_range(start, end, load_ranges(directory))
+        self.logger.info(
+            "Computing %d of the %d pieces of [%s, %s) in %s",
+            sum(segment is None for _, _, segment in plan), len(plan), start, end, directory
+        )
+
+        parts = []
+        segments = []
+        creation_times = []
+        for piece_start, piece_end, segment in plan:
+            if segment is not None:
+                segment_path = os.path.join(directory, segment + extension)
+                result = self._load(segment_path)
+                # The segment expired or was compacted, so it's computed again
+                if result is not MISSING:
+                    parts.append(result)
+                    segments.append(segment)
+                    try:
+                        creation_times.append(
+                            global_metadata_cache.get(self._get_metadata_path(segment_path))["creation_time"]
+                        )
+                    except (FileNotFoundError, ValueError, KeyError):
+                        pass
+                    continue
+
+            call_args, call_kwargs = self._replace_range(args, kwargs, piece_start, piece_end)
+            queue_time, slot = self._wait_miss_slot(call_args, call_kwargs)
+            start_time = time()
+            try:
+                result = function(*call_args, **call_kwargs)
+            finally:
+                self._miss_limiter.release(slot)
+            end_time = time()
+            segments.append(self._save_range(
+                call_args, call_kwargs, result, directory, extension, piece_start, piece_end, start_time, end_time, queue_time
+            ))
+            parts.append(result)
+            creation_times.append(start_time)
+
+        if len(parts) == 1:
+            return parts[0]
+
+        result = concatenate(parts)
+        # The merged segment is as old as its oldest data
+        get_shared_executor("compaction", 1).submit(
+            self._compact_range, args, kwargs, result, directory, extension, start, end, segments,
+            min(creation_times, default=time())
+        )
+        return result
+
+    def _save_range(self, args, kwargs, result, directory, extension, start, end, start_time, end_time, queue_time=None) -> str:
+        """Save the result of the range as a new segment, and return its name."""
+        # The segment is visible to the lookups only once its range is saved
+        segment = "{}_{}".format(time_ns(), random_string(4))
+        self._save(
+            args, kwargs, result, os.path.join(directory, segment + extension), start_time, end_time,
+            queue_time=queue_time
+        )
+        dump_range(os.path.join(directory, segment + RANGE_SUFFIX), start, end)
+        return segment
+
+    def _compact_range(self, args, kwargs, result, directory, extension, start, end, segments, creation_time):
+        """Replace the consecutive segments with a single one with their concatenated
+        result, created at the given time so that it expires with the oldest of them."""
+        try:
+            self.logger.info("Compacting %d segments of [%s, %s) in %s", len(segments), start, end, directory)
+            call_args, call_kwargs = self._replace_range(args, kwargs, start, end)
+            segment_path = os.path.join(directory, "{}_{}".format(time_ns(), random_string(4)) + extension)
+            # Dump it directly, since the admission rules are about the computation
+            self._dump(call_args, call_kwargs, result, segment_path, creation_time, creation_time)
+            if not os.path.exists(segment_path):
+                return
+            dump_range(segment_path[:len(segment_path) - len(extension)] + RANGE_SUFFIX, start, end)
+
+            for segment in segments:
+                # Hide the segment before removing it
+                segment_path = os.path.join(directory, segment + extension)
+                try:
+                    os.remove(os.path.join(directory, segment + RANGE_SUFFIX))
+                except FileNotFoundError:
+                    pass
+                self._remove_cache_file(segment_path)
+                try:
+                    os.remove(self._get_metadata_path(segment_path))
+                except FileNotFoundError:
+                    pass
+        except Exception:
+            self.logger.exception("Could not compact the segments of [%s, %s) in %s", start, end, directory)
+
+    @staticmethod
+    def _get_call_arguments(element) -> Tuple[tuple, dict]:
+        """Convert an element given to `map` to the args and kwargs of the call."""
+        if isinstance(element, tuple):
+            return element, {}
+        if isinstance(element, dict):
+            return (), element
+        return (element,), {}
+
+    @staticmethod
+    def _iter_leaf_paths(path, key=None):
+        """Yield the (key, path) of the files of a (possibly structured) path,
+        where the key is the top level key of a dict path."""
+        if isinstance(path, (list, tuple)):
+            for p in path:
+                yield from Cache._iter_leaf_paths(p, key)
+        elif isinstance(path, dict):
+            for k, p in path.items():
+                yield from Cache._iter_leaf_paths(p, k if key is None else key)
+        else:
+            yield key, path
+
+    def _find_candidate_hits(self, paths: List) -> List[bool]:
+        """Return which of the paths have all their required files, listing
+        each directory once instead of checking each file."""
+        directories = {}
+        for path in paths:
+            if path is None:
+                continue
+            for _, leaf in self._iter_leaf_paths(path):
+                directories.setdefault(os.path.dirname(leaf), None)
+
+        for directory in directories:
+            try:
+                directories[directory] = set(os.listdir(directory or "."))
+            except (FileNotFoundError, NotADirectoryError):
+                directories[directory] = set()
+
+        return [
+            path is not None and all(
+                key in self.optional_path_keys
+                or os.path.basename(leaf) in directories[os.path.dirname(leaf)]
+                for key, leaf in self._iter_leaf_paths(path)
+            )
+            for path in paths
+        ]
+
+    def _imap(self, wrapped: Callable, function: Callable, iterable, executor: Optional[Executor], prefetch: int):
+        """Resolve all the paths up front, compute the misses in the executor,
+        and prefetch the hits, yielding the results in the input order."""
+        calls = [self._get_call_arguments(element) for element in iterable]
+
+        # The arguments of the enabled calls, with their context and path,
+        # so that the hash of each call is computed once
+        resolved = []
+        paths = []
+        for args, kwargs in calls:
+            context = self._get_call_context(args, kwargs)
+            # Copy the kwargs since the enable cache arg might be captured
+            cache_enabled, call_args, call_kwargs = self._is_cache_enabled(args, dict(kwargs), context=context)
+            if cache_enabled:
+                path = self._get_formatted_path(call_args, call_kwargs, context=context)
+                resolved.append((call_args, call_kwargs, path, context))
+                paths.append(path)
+            else:
+                resolved.append(None)
+                paths.append(None)
+
+        hits = self._find_candidate_hits(paths)
+        self.logger.info("Mapping %d calls, %d of them are cached", len(calls), sum(hits))
+
+        # A map called by a miss of another map runs its misses sequentially,
+        # otherwise the shared pool could be full of tasks waiting for their own
+        inline = executor is None and threading.current_thread().name.startswith("cache_decorator_map")
+        executor = executor or get_shared_executor("map")
+        io_executor = self.io_executor or get_shared_executor("io")
+
+        # The workers of a process pool can't share this instance, so they
+        # get the cached function, which saves the results as usual
+        in_process = isinstance(executor, ThreadPoolExecutor)
+
+        def call(i):
+            if resolved[i] is None:
+                return wrapped(*calls[i][0], **calls[i][1])
+            call_args, call_kwargs, path, context = resolved[i]
+            return self._call_with_path(function, call_args, call_kwargs, path, context)
+
+        # The misses go through the same steps of the cached function, so
+        # they are saved and deduplicated as usual, and in the context of the
+        # caller, so they are its dependencies
+        futures = [
+            None if hit or inline
+            else executor.submit(contextvars.copy_context().run, call, i) if in_process
+            else executor.submit(wrapped, *args, **kwargs)
+            for i, (hit, (args, kwargs)) in enumerate(zip(hits, calls))
+        ]
+        pending_hits = deque(i for i, hit in enumerate(hits) if hit)
+        refreshes = {}
+
+        try:
+            for i in range(len(calls)):
+                # Keep loading the next hits while the consumer is busy
+                while pending_hits and pending_hits[0] <= i + prefetch:
+                    j = pending_hits.popleft()
+                    refreshes[j] = []
+                    futures[j] = io_executor.submit(self._lookup, paths[j], refreshes[j])
+
+                if futures[i] is None:
+                    result = call(i)
+                else:
+                    result = futures[i].result()
+                    futures[i] = None
+                    if hits[i]:
+                        refresh = refreshes.pop(i)
+                        # The cache expired or was removed after the listing
+                        if result is MISSING:
+                            result = call(i)
+                        else:
+                            # The hits are recorded in the thread of the consumer,
+                            # which might be computing a cached call
+                            call_args, call_kwargs, path, context = resolved[i]
+                            call_kwargs = self._add_checkpoint(call_args, call_kwargs, path)
+                            self._on_hit(function, call_args, call_kwargs, path, context, refresh)
+                yield result
+        finally:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+
+    def _acquire_file_lock(self, path) -> Tuple[Optional[FileLock], object]:
+        """Acquire the lock file of the path, so that the other processes wait
+        for our result instead of computing it too. If while waiting someone
+        else saved the cache, it returns None and the loaded result."""
+        lock = FileLock(
+            self._get_lock_path(path),
+            mode=self.file_lock_mode,
+            lease_duration=self.file_lock_lease_duration,
+        )
+        start_time = time()
+        while not lock.try_acquire():
+            # Someone else is computing it, check if they finished
+            result = self._load(path)
+            if result is not MISSING:
+                return None, result
+
+            self._check_file_lock_timeout(lock, start_time)
+            sleep(0.1)
+
+        self.logger.info("Acquired the lock %s", lock.path)
+        return lock, None
+
+    def _check_file_lock_timeout(self, lock: FileLock, start_time: float):
+        if self.file_lock_timeout is not None and time() - start_time > self.file_lock_timeout:
+            raise TimeoutError(
+                "Could not acquire the lock '{}' in {} seconds.".format(lock.path, self.file_lock_timeout)
+            )
+
+    def _lookup(self, path, refresh: Optional[list] = None):
+        """Get the result if it's being written in background or it's saved."""
+        if self.write_behind:
+            found, result = global_write_behind.get(get_path_key(path))
+            if found:
+                self.logger.info("Found the result for %s in the pending writes", path)
+                return result
+
+        result = self._load(path, refresh)
+        if result is MISSING and self.cache_exceptions:
+            exception = load_exception(self._get_exception_path(path), self.exception_validity_duration)
+            if exception is not None:
+                self.logger.info("Raising the cached exception for %s", path)
+                raise exception
+        return result
+
+    def _schedule_refresh(self, function: Callable, args, kwargs, path, context=None):
+        """Recompute the result in background and replace the stale cache."""
+        def refresh():
+            lock = None
+            if self.use_file_locks:
+                lock = FileLock(
+                    self._get_lock_path(path),
+                    mode=self.file_lock_mode,
+                    lease_duration=self.file_lock_lease_duration,
+                )
+                # Someone else is already computing it
+                if not lock.try_acquire():
+                    return
+
+            try:
+                queue_time, slot = self._wait_miss_slot(args, kwargs, context)
+                try:
+                    self.logger.info("Refreshing the result for %s %s", args, kwargs)
+                    start_time = time()
+                    with record_dependencies() as dependencies:
+                        result = function(*args, **kwargs)
+                finally:
+                    self._miss_limiter.release(slot)
+                end_time = time()
+            except BaseException:
+                if lock is not None:
+                    lock.release()
+                raise
+
+            self._store(args, kwargs, result, path, start_time, end_time, lock, dependencies, queue_time, context)
+
+        if not global_refresher.submit(get_path_key(path), refresh):
+            self.logger.info("The refresh of %s was skipped", path)
+
+    def _locked_load_or_compute(self, function: Callable, args, kwargs, path, context=None):
+        """Compute the result and save it, unless someone else just saved it.
+        If enabled, it holds the lock file of the path until the result is saved."""
+        lock = None
+        if self.use_file_locks:
+            lock, result = self._acquire_file_lock(path)
+            if lock is None:
+                return result
+
+        try:
+            # The cache might have been written while we were waiting
+            self._forget_missing(path)
+            result = self._lookup(path)
+            if result is not MISSING:
+                if lock is not None:
+                    lock.release()
+                self._record_dependency(path)
+                return result
+
+            # A timeout in the queue is not an exception of the function, so it's not cached
+            queue_time, slot = self._wait_miss_slot(args, kwargs, context)
+        except BaseException:
+            if lock is not None:
+                lock.release()
+            raise
+
+        try:
             self.logger.info("Computing the result for %s %s", args, kwargs)
-            # otherwise compute the result
             start_time = time()
-            result = function(*args, **kwargs)
+            try:
+                with record_dependencies() as dependencies:
+                    result = function(*args, **kwargs)
+            finally:
+                self._miss_limiter.release(slot)
             end_time = time()
+        except BaseException as e:
+            self._dump_exception(path, e)
+            if lock is not None:
+                lock.release()
+            raise
+
+        self._store(args, kwargs, result, path, start_time, end_time, lock, dependencies, queue_time, context)
+        self._record_dependency(path, start_time, end_time)
+        return result
+
+    def _wait_miss_slot(self, args, kwargs, context=None) -> Tuple[Optional[float], list]:
+        """Wait until the result can be computed without exceeding the limits
+        on the concurrent misses. Returns the time waited and the slot to release."""
+        if not self._miss_limiter.is_enabled:
+            return None, []
+
+        slots_path = os.path.join(
+            self._get_formatted_path(args, kwargs, formatter=self.cache_dir, context=context),
+            ".slots",
+            self._function_key,
+        )
+        start_time = time()
+        slot = self._miss_limiter.acquire(slots_path, self.miss_queue_timeout)
+        queue_time = time() - start_time
+
+        if slot is None:
+            if self.miss_queue_fallback == "raise":
+                raise TimeoutError(
+                    "Could not start computing the result of {} in {} seconds.".format(
+                        self._function_key, self.miss_queue_timeout
+                    )
+                )
+            self.logger.warning(
+                "Waited %.3fs for a slot to compute the result, computing it anyway", queue_time
+            )
+            return queue_time, []
 
-            # Save the result
+        self.logger.info("Waited %.3fs for a slot to compute the result", queue_time)
+        return queue_time, slot
+
+    def _store(self, args, kwargs, result, path, start_time, end_time, lock=None, dependencies=None, queue_time=None, context=None):
+        """Save the result, or schedule it to be saved in background if
+        `write_behind` is enabled. The lock is released once it's saved."""
+        if not self.write_behind:
             try:
-                self._check_return_type_compatability(result, path)
-                self._dump(args, kwargs, result, path, start_time, end_time)
+                self._save(args, kwargs, result, path, start_time, end_time, dependencies, queue_time, context)
+            finally:
+                if lock is not None:
+                    lock.release()
+            return
+
+        # Check the result now, so the errors are raised to the caller
+        try:
+            self._check_return_type_compatability(result, path)
+        except Exception as e:
+            if lock is not None:
+                lock.release()
+            if self.is_backup_enabled:
+                raise self._backup(result, path, e, args, kwargs, context)
+            raise e
+
+        def write():
+            try:
+                self._save(args, kwargs, result, path, start_time, end_time, dependencies, queue_time, context)
             except Exception as e:
-                if self.is_backup_enabled:
-                    raise self._backup(result, path, e, args, kwargs)
-                raise e
+                self.logger.error("Couldn't save in background the result at %s: %s", path, e)
+            finally:
+                if lock is not None:
+                    lock.release()
+
+        global_write_behind.submit(get_path_key(path), result, write)
+
+    def _save(self, args, kwargs, result, path, start_time, end_time, dependencies=None, queue_time=None, context=None):
+        """Save the result, backupping it if the serialization fails."""
+        if self.min_compute_time is not None and end_time - start_time < self.min_compute_time:
+            self._log_bypass("min_compute_time", path)
+            return
+
+        dependencies = self._get_saved_dependencies(dependencies)
+
+        try:
+            self._check_return_type_compatability(result, path)
+            self._dump(args, kwargs, result, path, start_time, end_time, dependencies, queue_time, context)
+        except Exception as e:
+            if self.is_backup_enabled:
+                raise self._backup(result, path, e, args, kwargs, context)
+            raise e
+
+        # The result replaces the checkpoint
+        self._remove_checkpoint(path)
+
+    def _decorate_generator(self, function: Callable) -> Callable:
+        if not isinstance(self.cache_path, str):
+            raise ValueError("The generator functions can only be cached with a string cache_path")
+        if self.checkpoint_arg_name is not None:
+            raise ValueError("The checkpoints are not supported for generator functions.")
+        if self.range_args is not None:
+            raise ValueError("The argument `range_args` is not supported for generator functions.")
+        if self.elementwise is not None:
+            raise ValueError("The elementwise mode is not supported for generator functions.")
+        # The items yielded before the exception would have to be replayed too
+        if self.cache_exceptions:
+            raise ValueError("The argument `cache_exceptions` is not supported for generator functions.")
+        # Raise early if the extension cannot be streamed
+        get_stream_opener(self._compiled_cache_path.suffix)
 
-            return result
+        # wraps to support pickling
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+            cache_enabled, args, kwargs = self._is_cache_enabled(args, kwargs)
+
+            # if the cache is not enabled just forward the call
+            if not cache_enabled:
+                self.logger.info("The cache is disabled")
+                yield from function(*args, **kwargs)
+                return
+
+            path = self._get_formatted_path(args, kwargs)
+            if self._load_metadata(path) is not None:
+                self.logger.info("Replaying the cached items from %s", path)
+                yield from iter_stream(path)
+                return
+
+            yield from self._record_generator(function, args, kwargs, path)
 
         # add a reference to the cached function so we can unpack
         # The caching if needed
@@ -632,6 +2509,171 @@ class Cache:
         setattr(wrapped, "__cacher_instance", self)
         return wrapped
 
+    def _record_generator(self, function: Callable, args, kwargs, path: str):
+        """Yield the items of the generator while saving them in chunks to a
+        temporary file, which is committed only if the generator is exhausted."""
+        self.logger.info("Saving the items of the generator at %s", path)
+        dirname = os.path.dirname(path)
+        if dirname != "":
+            os.makedirs(dirname, exist_ok=True)
+        # Remove the temporary files of the writers that crashed
+        sweep_temporary_files_once(dirname, 60 * 60)
+
+        tmp_path = get_temporary_path(path)
+        try:
+            with get_stream_opener(path)(tmp_path, "wb") as stream:
+                start_time = time()
+                dump_time = 0
+                recording = True
+                chunk = []
+                for item in function(*args, **kwargs):
+                    if recording:
+                        chunk.append(item)
+                        if len(chunk) >= self.generator_chunk_size:
+                            dump_start_time = time()
+                            recording = self._write_chunk(stream, chunk, path)
+                            dump_time += time() - dump_start_time
+                            chunk = []
+                    yield item
+
+                end_time = time()
+                if recording and chunk:
+                    dump_start_time = time()
+                    recording = self._write_chunk(stream, chunk, path)
+                    dump_time += time() - dump_start_time
+
+            if self.min_compute_time is not None and end_time - start_time < self.min_compute_time:
+                self._log_bypass("min_compute_time", path)
+            elif recording:
+                self._commit(args, kwargs, path, tmp_path, {}, start_time, end_time, dump_time)
+        finally:
+            # If the caller stopped early, or the generator raised, nothing is saved
+            remove_temporary_path(tmp_path)
+
+    def _write_chunk(self, stream, chunk: list, path: str) -> bool:
+        """Append the chunk to the stream, returning if it succeeded. If the items
+        cannot be pickled the generator is still consumed but not cached."""
+        try:
+            write_chunk(stream, chunk)
+            return True
+        except Exception:
+            self.logger.exception("Could not save the items of the generator at %s, it will not be cached", path)
+            return False
+
+    async def _run_io(self, function: Callable, *args):
+        """Run the blocking function in the io executor, off the event loop."""
+        # Only the coroutines need asyncio, which is slow to import
+        import asyncio
+        executor = self.io_executor or get_shared_executor("io")
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    def _decorate_coroutine(self, function: Callable) -> Callable:
+        if self.range_args is not None:
+            raise ValueError("The argument `range_args` is not supported for coroutine functions.")
+        if self.elementwise is not None:
+            raise ValueError("The elementwise mode is not supported for coroutine functions.")
+        # wraps to support pickling
+        @wraps(function)
+        async def wrapped(*args, **kwargs):
+            cache_enabled, args, kwargs = self._is_cache_enabled(args, kwargs)
+
+            # if the cache is not enabled just forward the call
+            if not cache_enabled:
+                self.logger.info("The cache is disabled")
+                result = await function(*args, **self._add_checkpoint(args, kwargs))
+                self._check_return_type_compatability(result, self.cache_path)
+                return result
+
+            # Get the path, this might need to hash big arguments
+            path = await self._run_io(self._get_formatted_path, args, kwargs)
+            kwargs = self._add_checkpoint(args, kwargs, path)
+
+            bypass_reason = self._get_bypass_reason(path)
+            if bypass_reason is not None:
+                self._log_bypass(bypass_reason, path)
+                return await function(*args, **kwargs)
+
+            # Try to load the cache
+            result = await self._run_io(self._lookup, path)
+            # if we got a result, reutrn it
+            if result is not MISSING:
+                self._record_dependency(path)
+                return result
+
+            # otherwise compute the result, if other tasks are already
+            # computing the same path we wait for their result
+            return await global_async_single_flight.do(
+                get_path_key(path),
+                lambda: self._async_locked_load_or_compute(function, args, kwargs, path)
+            )
+
+        # add a reference to the cached function so we can unpack
+        # The caching if needed
+        setattr(wrapped, "__cached_function", function)
+        setattr(wrapped, "__cacher_instance", self)
+        wrapped.bypass_counts = self._bypass_policy.counts
+        return wrapped
+
+    async def _async_locked_load_or_compute(self, function: Callable, args, kwargs, path):
+        """Same as `_locked_load_or_compute` but awaiting the coroutine function
+        and without blocking the event loop."""
+        import asyncio
+        lock = None
+        if self.use_file_locks:
+            lock = FileLock(
+                self._get_lock_path(path),
+                mode=self.file_lock_mode,
+                lease_duration=self.file_lock_lease_duration,
+            )
+            start_time = time()
+            while not await self._run_io(lock.try_acquire):
+                # Someone else is computing it, check if they finished
+                result = await self._run_io(self._load, path)
+                if result is not MISSING:
+                    return result
+
+                self._check_file_lock_timeout(lock, start_time)
+                await asyncio.sleep(0.1)
+
+        try:
+            # The cache might have been written while we were waiting
+            self._forget_missing(path)
+            result = await self._run_io(self._lookup, path)
+            if result is not MISSING:
+                if lock is not None:
+                    await self._run_io(lock.release)
+                self._record_dependency(path)
+                return result
+
+            queue_time, slot = await self._run_io(self._wait_miss_slot, args, kwargs)
+        except BaseException:
+            if lock is not None:
+                await self._run_io(lock.release)
+            raise
+
+        try:
+            self.logger.info("Computing the result for %s %s", args, kwargs)
+            start_time = time()
+            try:
+                with record_dependencies() as dependencies:
+                    result = await function(*args, **kwargs)
+            finally:
+                # Released right away, since the io threads may all be waiting for a slot
+                self._miss_limiter.release(slot)
+            end_time = time()
+        except BaseException as e:
+            if isinstance(e, self.cache_exceptions):
+                await self._run_io(self._dump_exception, path, e)
+            if lock is not None:
+                await self._run_io(lock.release)
+            raise
+
+        await self._run_io(
+            self._store, args, kwargs, result, path, start_time, end_time, lock, dependencies, queue_time
+        )
+        self._record_dependency(path, start_time, end_time)
+        return result
+
     def _decorate_method(self, function: Callable) -> Callable:
         # wraps to support pickling
         @wraps(function)
@@ -655,7 +2697,7 @@ class Cache:
             # Try to load the cache
             result = self._load(path)
             # if we got a result, reutrn it
-            if result is not None:
+            if result is not MISSING:
                 return result
             
             self.logger.info("Computing the result for %s %s", args, kwargs)
@@ -681,94 +2723,66 @@ class Cache:
         setattr(wrapped, "__cacher_instance", self)
         return wrapped
 
-    def _get_formatted_path(self, args, kwargs, formatter=None, function_info=None, extra_kwargs=None, inner_self=None) -> str:
-        """Compute the path adding and computing the needed arguments."""        
-        formatter = formatter or self.cache_path
-
-        if isinstance(formatter, list):
-            return [
-                self._get_formatted_path(args, kwargs, f)
-                for f in formatter
-            ]
-
-        if isinstance(formatter, tuple):
-            return tuple([
-                self._get_formatted_path(args, kwargs, f)
-                for f in formatter
-            ])
+    def _get_compiled_path(self, formatter) -> CompiledPath:
+        """Get the compiled version of the given path formatter, compiling it
+        only the first time it's used."""
+        if formatter is self.cache_path:
+            return self._compiled_cache_path
+
+        key = repr(formatter)
+        compiled = self._compiled_paths.get(key)
+        if compiled is None:
+            compiled = compile_path(formatter)
+            self._compiled_paths[key] = compiled
+        return compiled
+
+    def _get_call_context(self, args, kwargs, inner_self=None, function_info=None) -> CallContext:
+        """Get the context of a call, to share the parameters and their hash
+        between everything that needs them."""
+        if function_info is None:
+            function_info, binder, _ = self._get_function_details()
+        else:
+            binder = ParamsBinder(function_info)
+        return CallContext(
+            binder, function_info, args, kwargs,
+            inner_self=inner_self,
+            use_approximation=self.use_approximated_hash,
+        )
 
-        elif isinstance(formatter, dict):
-            return {
-                key:self._get_formatted_path(args, kwargs, v)
-                for key, v in formatter.items()
-            }
+    def _get_formatted_path(self, args, kwargs, formatter=None, function_info=None, extra_kwargs=None, inner_self=None, context=None) -> str:
+        """Compute the path adding and computing the needed arguments.
+        The parameters are taken from the context of the call, if given."""        
+        formatter = formatter or self.cache_path
+        compiled = self._get_compiled_path(formatter)
+        templates = list(iter_templates(compiled))
 
         extra_kwargs = extra_kwargs or {}
 
-        function_info = function_info or self.function_info
-        params = get_params(function_info, args, kwargs)
-        groups = get_format_groups(formatter)
-        groups_set = {match.str_match for match in groups}
+        if context is None:
+            context = self._get_call_context(args, kwargs, inner_self, function_info)
+        function_info = context.function_info
+        params = dict(context.params)
 
-        if "_hash" in groups_set:
-            data = {"params": params, "function_info": function_info}
-
-            if inner_self is not None: 
-                data["self"] = inner_self
-
-            params["_hash"] = sha256(data, use_approximation=self.use_approximated_hash)
+        if any(t.needs_hash for t in templates) or (
+            self._compiled_cache_dir.needs_hash and any(t.needs_cache_dir for t in templates)
+        ):
+            params["_hash"] = context.hash
 
         self.logger.debug("Got parameters %s", params)
 
-        cache_dir = self.cache_dir
-        if formatter != self.cache_dir:
-            cache_dir = self._get_formatted_path(args, kwargs, self.cache_dir, function_info, extra_kwargs, inner_self)
-            
         format_args = {
             **params,
             **function_info,
             **extra_kwargs,
-            "cache_dir":cache_dir,
+            "cache_dir":self.cache_dir,
         }
 
-        new_formatter = ""
-        old_formatter = formatter
-        # Handle the composite paths
-        while len(old_formatter) != 0:
-            new_match, formatter_remainder = get_next_format_group(old_formatter)
+        # The cache_dir is formatted only once and with itself as `cache_dir`
+        # so that it's not recursive
+        if formatter != self.cache_dir and any(t.needs_cache_dir for t in templates):
+            format_args["cache_dir"] = self._compiled_cache_dir.format(format_args)
 
-            # there are no more matches just append the remainder
-            if new_match is None:
-                new_formatter += formatter_remainder
-                break
-            
-            # check if we should call the value or not
-            if new_match.str_match.endswith("()"):
-                new_match.str_match  = new_match.str_match[:-2]
-                # Get the name of the base element and the attributes chain
-                root, *attrs = new_match.str_match.split(".")
-                # Get the params to use for the attributes chain
-                root = format_args[root]
-
-                # Follow the attributes chain
-                for attr in attrs:                    
-                    root = getattr(root, attr)
-
-                # Check if we have to call the function or not
-                if inspect.isfunction(root) or inspect.ismethod(root) or inspect.isbuiltin(root):
-                    root = root()
-
-                sub = str(root)
-            else:
-                sub = "{" + new_match.str_match + "}"
-
-            new_formatter += old_formatter[:new_match.start]
-            new_formatter += sub
-            old_formatter = formatter_remainder
-
-        path = new_formatter.format(
-            **format_args,
-        )
+        path = format_compiled_path(compiled, format_args)
         self.logger.debug("Calculated path %s", path)
         return path
 
@@ -780,11 +2794,27 @@ class Cache:
         return wrapped
 
     def decorate(self, function: Callable) -> Callable:
-        self.function_info = self._compute_function_info(function)
+        # Getting and hashing the source is slow, so it's done on the first call
+        self._function_details = None
+        # The results of the other cached functions record which version of
+        # this function computed the results they used
+        self._function_key = "{}.{}".format(function.__module__, getattr(function, "__qualname__", get_function_name(function)))
+        declare_function_version(self._function_key, lambda: self._function_version)
+        # Parse the paths only once so that each call just has to fill the slots
+        self._compiled_cache_path = compile_path(self.cache_path)
+        self._compiled_cache_dir = PathTemplate(self.cache_dir)
+        self._compiled_paths = {}
+        # Resolve the backends once for the constant extensions of the paths
+        for template in iter_templates(self._compiled_cache_path):
+            self._backend.add_suffix(template.suffix)
         self.decorated_function = function
 
         if inspect.ismethod(function):
             wrapped = self._decorate_method(function)
+        elif inspect.iscoroutinefunction(function):
+            wrapped = self._decorate_coroutine(function)
+        elif inspect.isgeneratorfunction(function):
+            wrapped = self._decorate_generator(function)
         else:
             wrapped = self._decorate_function(function)
 
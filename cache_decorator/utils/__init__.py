@@ -1,7 +1,43 @@
 from .parse_time import parse_time
-from .get_params import get_params
+from .get_params import get_params, ParamsBinder
+from .call_context import CallContext, is_small_json
 from .random_string import random_string
 from .get_format_groups import get_format_groups, get_next_format_group
+from .memory_cache import MemoryCache, global_memory_cache
+from .file_lock import FileLock
+from .atomic_write import (
+    FSYNC_POLICIES, get_temporary_path, remove_temporary_path, is_temporary_file, fsync_file,
+    fsync_directory, sweep_temporary_files, sweep_temporary_files_once,
+)
+from .single_flight import (
+    SingleFlight, global_single_flight, AsyncSingleFlight,
+    global_async_single_flight, get_path_key,
+)
+from .executors import get_shared_executor
+from .write_behind import WriteBehind, global_write_behind
+from .elementwise import (
+    KEYS_SUFFIX, get_element_keys, take, assemble, ElementIndex, global_element_index,
+)
+from .stream import STREAM_OPENERS, get_stream_opener, write_chunk, iter_stream
+from .lazy import LazyValue, LazyMapping, LazySequence
+from .missing import MISSING
+from .cached_exception import CachedException, dump_exception, load_exception
+from .bypass import BypassPolicy
+from .refresher import BackgroundRefresher, global_refresher
+from .checkpoint import Checkpoint
+from .ranges import RANGE_SUFFIX, dump_range, load_ranges, plan_range, concatenate
+from .delta import get_chunks, get_shared_size, encode_delta, apply_delta, get_digest
+from .dependencies import (
+    function_versions, declare_function_version, set_function_version, get_function_version,
+    get_entry_hash, record_dependencies, is_recording, record_dependency,
+)
+from .miss_limiter import MissLimiter
+from .lookup_cache import (
+    HIT_METADATA_FIELDS, MetadataCache, global_metadata_cache, NegativeLookups, global_negative_lookups,
+)
+from .path_template import (
+    PathTemplate, CompiledPath, compile_path, iter_templates, format_compiled_path
+)
 
 def get_function_name(function) -> str:
     if "__name__" in dir(function):
@@ -14,8 +50,80 @@ def get_function_name(function) -> str:
 __all__ = [
     "parse_time",
     "get_params",
+    "ParamsBinder",
+    "CallContext",
+    "is_small_json",
     "random_string",
     "get_format_groups",
     "get_next_format_group",
     "get_function_name",
+    "MemoryCache",
+    "global_memory_cache",
+    "FileLock",
+    "FSYNC_POLICIES",
+    "get_temporary_path",
+    "remove_temporary_path",
+    "is_temporary_file",
+    "fsync_file",
+    "fsync_directory",
+    "sweep_temporary_files",
+    "sweep_temporary_files_once",
+    "SingleFlight",
+    "global_single_flight",
+    "AsyncSingleFlight",
+    "global_async_single_flight",
+    "get_path_key",
+    "get_shared_executor",
+    "WriteBehind",
+    "global_write_behind",
+    "PathTemplate",
+    "CompiledPath",
+    "compile_path",
+    "iter_templates",
+    "format_compiled_path",
+    "KEYS_SUFFIX",
+    "get_element_keys",
+    "take",
+    "assemble",
+    "ElementIndex",
+    "global_element_index",
+    "STREAM_OPENERS",
+    "get_stream_opener",
+    "write_chunk",
+    "iter_stream",
+    "LazyValue",
+    "LazyMapping",
+    "LazySequence",
+    "MISSING",
+    "CachedException",
+    "dump_exception",
+    "load_exception",
+    "BypassPolicy",
+    "BackgroundRefresher",
+    "global_refresher",
+    "Checkpoint",
+    "RANGE_SUFFIX",
+    "dump_range",
+    "load_ranges",
+    "plan_range",
+    "concatenate",
+    "get_chunks",
+    "get_shared_size",
+    "encode_delta",
+    "apply_delta",
+    "get_digest",
+    "function_versions",
+    "declare_function_version",
+    "set_function_version",
+    "get_function_version",
+    "get_entry_hash",
+    "record_dependencies",
+    "is_recording",
+    "record_dependency",
+    "MissLimiter",
+    "HIT_METADATA_FIELDS",
+    "MetadataCache",
+    "global_metadata_cache",
+    "NegativeLookups",
+    "global_negative_lookups",
 ]
\ No newline at end of file
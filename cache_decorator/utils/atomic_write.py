@@ -0,0 +1,86 @@
+import os
+import shutil
+import threading
+from time import time
+from .random_string import random_string
+
+# The temporary files are written in hidden directories next to the final
+# file, with the same name, since some backends (e.g. zip archives) store it.
+TEMPORARY_PREFIX = ".tmp-"
+
+FSYNC_POLICIES = ("none", "entry", "directory")
+
+_swept_directories = set()
+_swept_directories_lock = threading.Lock()
+
+def get_temporary_path(path: str) -> str:
+    """Get a unique path on the same filesystem of the given path, so that it
+    can be atomically moved on it with `os.replace`."""
+    dirname, basename = os.path.split(path)
+    temporary_dirname = os.path.join(
+        dirname,
+        "{}{}".format(TEMPORARY_PREFIX, random_string(8))
+    )
+    os.makedirs(temporary_dirname)
+    return os.path.join(temporary_dirname, basename)
+
+def remove_temporary_path(temporary_path: str):
+    """Remove the temporary file, if it was not moved, and its directory."""
+    shutil.rmtree(os.path.dirname(temporary_path), ignore_errors=True)
+
+def is_temporary_file(basename: str) -> bool:
+    return basename.startswith(TEMPORARY_PREFIX)
+
+def fsync_file(path: str):
+    """Flush the content of the file to the disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def fsync_directory(dirname: str):
+    """Flush the directory entries to the disk, so that the renames survive a crash.
+    Not all the platforms (e.g. Windows) support it, so it's best effort."""
+    try:
+        fd = os.open(dirname or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def sweep_temporary_files(dirname: str, max_age: float) -> int:
+    """Remove the temporary files older than `max_age` seconds left in the
+    directory by writers that crashed. Returns how many files were removed."""
+    removed = 0
+    now = time()
+    try:
+        entries = list(os.scandir(dirname or "."))
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        if not is_temporary_file(entry.name):
+            continue
+        try:
+            if now - entry.stat().st_mtime > max_age:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def sweep_temporary_files_once(dirname: str, max_age: float) -> int:
+    """Sweep the directory only the first time it's used by this process."""
+    with _swept_directories_lock:
+        if dirname in _swept_directories:
+            return 0
+        _swept_directories.add(dirname)
+    return sweep_temporary_files(dirname, max_age)
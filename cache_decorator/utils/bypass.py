@@ -0,0 +1,40 @@
+import threading
+from collections import Counter
+from typing import Hashable, Optional
+
+class BypassPolicy:
+    """Track the load times of the hits against the time it took to compute
+    them, to find the keys, or the whole function, for which loading the cache
+    is slower than recomputing the result. It also counts the bypasses by reason.
+    """
+
+    def __init__(self, min_samples: int = 10):
+        self.min_samples = min_samples
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._slow_keys = set()
+        self._samples = 0
+        self._slow_samples = 0
+
+    def record_load(self, key: Hashable, load_time: float, compute_time: Optional[float]) -> bool:
+        """Record the load time of a hit, returning if it was slower than computing it."""
+        if compute_time is None:
+            return False
+        with self._lock:
+            self._samples += 1
+            if load_time <= compute_time:
+                return False
+            self._slow_samples += 1
+            self._slow_keys.add(key)
+            return True
+
+    def is_key_slow(self, key: Hashable) -> bool:
+        return key in self._slow_keys
+
+    def is_function_slow(self) -> bool:
+        """If most of the hits of the function were slower than computing them."""
+        return self._samples >= self.min_samples and 2 * self._slow_samples > self._samples
+
+    def count(self, reason: str):
+        with self._lock:
+            self.counts[reason] += 1
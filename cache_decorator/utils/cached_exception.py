@@ -0,0 +1,74 @@
+import os
+import pickle
+import traceback
+from time import time
+from typing import Optional
+from .atomic_write import get_temporary_path, remove_temporary_path
+
+class CachedException(Exception):
+    """Raised for a cached exception that could not be pickled, with its type and message."""
+
+    def __init__(self, exception_type: str, message: str):
+        self.exception_type = exception_type
+        self.message = message
+        super(CachedException, self).__init__("{}: {}".format(exception_type, message))
+
+
+def dump_exception(path: str, exception: BaseException):
+    """Atomically save the type, message, traceback and, if possible, the
+    pickled exception at the given path."""
+    try:
+        pickled = pickle.dumps(exception)
+        # Some exceptions pickle but cannot be unpickled
+        pickle.loads(pickled)
+    except Exception:
+        pickled = None
+
+    record = {
+        "creation_time": time(),
+        "type": "{}.{}".format(type(exception).__module__, type(exception).__qualname__),
+        "message": str(exception),
+        "traceback": "".join(traceback.format_exception(type(exception), exception, exception.__traceback__)),
+        "exception": pickled,
+    }
+
+    dirname = os.path.dirname(path)
+    if dirname != "":
+        os.makedirs(dirname, exist_ok=True)
+    tmp_path = get_temporary_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(record, f)
+        os.replace(tmp_path, path)
+    finally:
+        remove_temporary_path(tmp_path)
+
+
+def load_exception(path: str, validity_duration: Optional[float]) -> Optional[BaseException]:
+    """Load the exception saved at the given path, or return None if there is
+    none or it's expired, in which case it's removed."""
+    try:
+        with open(path, "rb") as f:
+            record = pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+    if validity_duration is not None and time() - record["creation_time"] > validity_duration:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+
+    exception = None
+    if record["exception"] is not None:
+        exception = pickle.loads(record["exception"])
+    if exception is None:
+        exception = CachedException(record["type"], record["message"])
+
+    # Show where it was originally raised
+    if hasattr(exception, "add_note"):
+        exception.add_note("This exception was loaded from the cache at '{}', the original traceback was:\n{}".format(
+            path, record["traceback"]
+        ))
+    return exception
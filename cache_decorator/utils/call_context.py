@@ -0,0 +1,85 @@
+from typing import List, Optional
+from dict_hash import sha256
+from .get_params import ParamsBinder
+
+# The parameters saved in the metadata are bounded, so that the big values
+# are skipped without serializing them
+MAX_PARAMETER_ITEMS = 64
+MAX_PARAMETER_LENGTH = 1024
+
+def is_small_json(value: object, budget: Optional[List[int]] = None) -> bool:
+    """If the value can be saved as json and it's small, i.e. its strings are
+    shorter than MAX_PARAMETER_LENGTH and it has at most MAX_PARAMETER_ITEMS
+    items overall. The containers are checked only until the budget is spent."""
+    if budget is None:
+        budget = [MAX_PARAMETER_ITEMS]
+    if value is None or isinstance(value, (bool, int, float)):
+        return True
+    if isinstance(value, str):
+        return len(value) <= MAX_PARAMETER_LENGTH
+    if isinstance(value, (list, tuple, dict)):
+        budget[0] -= len(value)
+        if budget[0] < 0:
+            return False
+        if isinstance(value, dict):
+            return all(
+                (key is None or isinstance(key, (str, bool, int, float))) and is_small_json(item, budget)
+                for key, item in value.items()
+            )
+        return all(is_small_json(item, budget) for item in value)
+    return False
+
+class CallContext:
+    """The arguments of a call, bound once, with the values derived from them
+    computed at most once: the hash of the parameters, which is shared by all
+    the paths of the call, and the parameters saved in the metadata.
+
+    The arguments are bound lazily, so the caller can still modify the kwargs
+    until the parameters are first needed.
+    """
+
+    def __init__(
+        self,
+        binder: ParamsBinder,
+        function_info: dict,
+        args: tuple,
+        kwargs: dict,
+        inner_self: Optional[object] = None,
+        use_approximation: bool = False,
+    ):
+        self.binder = binder
+        self.function_info = function_info
+        self.args = args
+        self.kwargs = kwargs
+        self.inner_self = inner_self
+        self.use_approximation = use_approximation
+        self._params = None
+        self._hash = None
+        self._serializable_params = None
+
+    @property
+    def params(self) -> dict:
+        """The parameters of the call, which must not be modified."""
+        if self._params is None:
+            self._params = self.binder.bind(self.args, self.kwargs)
+        return self._params
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            data = {"params": self.params, "function_info": self.function_info}
+            if self.inner_self is not None:
+                data["self"] = self.inner_self
+            self._hash = sha256(data, use_approximation=self.use_approximation)
+        return self._hash
+
+    @property
+    def serializable_params(self) -> dict:
+        """The parameters which are small enough to be saved as json in the metadata."""
+        if self._serializable_params is None:
+            self._serializable_params = {
+                key:value
+                for key, value in self.params.items()
+                if is_small_json(value)
+            }
+        return self._serializable_params
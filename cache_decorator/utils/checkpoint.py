@@ -0,0 +1,41 @@
+from typing import Callable, Optional
+from .missing import MISSING
+
+class Checkpoint:
+    """Handle given to a cached function to save its intermediate state, so
+    that if it crashes the next call can resume from the last saved state.
+
+    Example:
+    ```
+    @Cache(checkpoint_arg_name="checkpoint")
+    def train(epochs, checkpoint=None):
+        state = checkpoint.load() or {"epoch": 0}
+        for epoch in range(state["epoch"], epochs):
+            ...
+            checkpoint.save({"epoch": epoch + 1, ...})
+        return model
+    ```
+    """
+
+    def __init__(
+        self,
+        load: Optional[Callable[[], object]] = None,
+        save: Optional[Callable[[object], None]] = None,
+    ):
+        self._load = load
+        self._save = save
+        self._state = MISSING
+
+    def load(self, default: object = None) -> object:
+        """Return the last saved state, or the default if there is none."""
+        if self._state is MISSING and self._load is not None:
+            self._state = self._load()
+        if self._state is MISSING:
+            return default
+        return self._state
+
+    def save(self, state: object):
+        """Atomically save the state, replacing the previous one."""
+        if self._save is not None:
+            self._save(state)
+        self._state = state
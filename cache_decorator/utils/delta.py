@@ -0,0 +1,123 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+# Content defined chunking: a chunk ends where the rolling hash of the last
+# WINDOW bytes has the MASK bits set, so an insertion only changes the chunks
+# around it, and the other ones can be found in the previous versions
+WINDOW = 32
+MASK = (1 << 13) - 1
+MIN_CHUNK_SIZE = 2 * 1024
+MAX_CHUNK_SIZE = 64 * 1024
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# The gear table must be the same everywhere, so it's derived from a fixed seed
+_GEAR = [
+    int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "little")
+    for i in range(256)
+]
+
+Chunk = Tuple[str, int, int]
+Operation = Tuple[str, object]
+
+def _get_candidates(data: bytes) -> List[int]:
+    """Return the positions where the rolling hash allows a chunk to end."""
+    try:
+        import numpy as np
+    except ImportError:
+        candidates = []
+        rolling_hash = 0
+        for i, byte in enumerate(data):
+            rolling_hash += _GEAR[byte]
+            if i >= WINDOW:
+                rolling_hash -= _GEAR[data[i - WINDOW]]
+            if rolling_hash & MASK == MASK:
+                candidates.append(i + 1)
+        return candidates
+
+    gear = np.array(_GEAR, dtype=np.uint64)
+    candidates = []
+    # Process it in blocks to bound the memory, each with the previous window
+    for start in range(0, len(data), BLOCK_SIZE):
+        low = max(0, start - WINDOW)
+        values = gear[np.frombuffer(data, dtype=np.uint8, count=min(len(data), start + BLOCK_SIZE) - low, offset=low)]
+        cumulative = np.cumsum(values, dtype=np.uint64)
+        rolling_hash = cumulative.copy()
+        rolling_hash[WINDOW:] -= cumulative[:-WINDOW]
+        rolling_hash = rolling_hash[start - low:]
+        candidates.extend((np.flatnonzero(rolling_hash & np.uint64(MASK) == np.uint64(MASK)) + start + 1).tolist())
+    return candidates
+
+def get_chunks(data: bytes) -> List[Chunk]:
+    """Split the data in content defined chunks, returning their hash, offset and length."""
+    boundaries = []
+    last = 0
+    for candidate in _get_candidates(data):
+        while candidate - last > MAX_CHUNK_SIZE:
+            last += MAX_CHUNK_SIZE
+            boundaries.append(last)
+        if candidate - last >= MIN_CHUNK_SIZE:
+            boundaries.append(candidate)
+            last = candidate
+    while len(data) - last > MAX_CHUNK_SIZE:
+        last += MAX_CHUNK_SIZE
+        boundaries.append(last)
+    if last < len(data):
+        boundaries.append(len(data))
+
+    chunks = []
+    start = 0
+    for end in boundaries:
+        chunks.append((
+            hashlib.blake2b(data[start:end], digest_size=16).hexdigest(),
+            start,
+            end - start
+        ))
+        start = end
+    return chunks
+
+def get_shared_size(chunks: List[Chunk], base_hashes: Dict[str, int]) -> int:
+    """Return how many bytes of the chunks are also in the base."""
+    return sum(
+        length
+        for chunk_hash, _, length in chunks
+        if chunk_hash in base_hashes
+    )
+
+def encode_delta(data: bytes, chunks: List[Chunk], base_chunks: List[Chunk]) -> List[Operation]:
+    """Encode the data as the operations to rebuild it from the base: copies
+    of ranges of the base and insertions of new bytes."""
+    base_offsets = {
+        chunk_hash:offset
+        for chunk_hash, offset, _ in base_chunks
+    }
+
+    # The ranges are first merged and only then sliced from the data
+    ranges = []
+    for chunk_hash, offset, length in chunks:
+        base_offset = base_offsets.get(chunk_hash)
+        operation, start = ("insert", offset) if base_offset is None else ("copy", base_offset)
+        if ranges and ranges[-1][0] == operation and ranges[-1][1] + ranges[-1][2] == start:
+            ranges[-1][2] += length
+        else:
+            ranges.append([operation, start, length])
+
+    return [
+        ("insert", data[start:start + length])
+        if operation == "insert" else
+        ("copy", (start, length))
+        for operation, start, length in ranges
+    ]
+
+def apply_delta(base: bytes, operations: List[Operation]) -> bytes:
+    """Rebuild the data from the base and the operations."""
+    parts = []
+    for operation, value in operations:
+        if operation == "insert":
+            parts.append(value)
+        else:
+            offset, length = value
+            parts.append(base[offset:offset + length])
+    return b"".join(parts)
+
+def get_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -0,0 +1,54 @@
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+# The dependencies of the cached function being computed in this context
+_dependencies: ContextVar[Optional[List[dict]]] = ContextVar("cache_decorator_dependencies", default=None)
+
+# The current version of the source of each decorated function, so the results
+# which used the results of an older version can be found
+function_versions: Dict[str, Optional[str]] = {}
+
+# How to compute the versions which were not needed yet, as getting the source
+# of a function is deferred to its first call
+_version_getters: Dict[str, Callable[[], Optional[str]]] = {}
+
+def declare_function_version(function_key: str, get_version: Callable[[], Optional[str]]):
+    """Register how to compute the version of a function when it's first needed."""
+    function_versions.pop(function_key, None)
+    _version_getters[function_key] = get_version
+
+def set_function_version(function_key: str, version: Optional[str]):
+    _version_getters.pop(function_key, None)
+    function_versions[function_key] = version
+
+def get_function_version(function_key: str) -> Optional[str]:
+    """Return the current version of the function, or None if it's unknown."""
+    get_version = _version_getters.get(function_key)
+    if get_version is not None:
+        set_function_version(function_key, get_version())
+    return function_versions.get(function_key)
+
+def get_entry_hash(path: str, creation_time: float) -> str:
+    """Return the hash identifying the version of the cache saved at the path."""
+    return hashlib.blake2b("{}:{!r}".format(path, creation_time).encode(), digest_size=16).hexdigest()
+
+@contextmanager
+def record_dependencies():
+    """Collect the cached results used in the block. The results used by the
+    nested cached functions are collected by them and not by the block."""
+    dependencies = []
+    token = _dependencies.set(dependencies)
+    try:
+        yield dependencies
+    finally:
+        _dependencies.reset(token)
+
+def is_recording() -> bool:
+    return _dependencies.get() is not None
+
+def record_dependency(dependency: dict):
+    dependencies = _dependencies.get()
+    if dependencies is not None and dependency not in dependencies:
+        dependencies.append(dependency)
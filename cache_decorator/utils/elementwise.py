@@ -0,0 +1,136 @@
+import os
+import json
+import hashlib
+import threading
+from typing import List, Optional, Sequence, Tuple
+from dict_hash import sha256
+
+KEYS_SUFFIX = ".keys.json"
+
+def _is_pandas(batch: object) -> bool:
+    return type(batch).__module__.startswith("pandas") and hasattr(batch, "iloc")
+
+def _is_numpy(batch: object) -> bool:
+    return type(batch).__module__ == "numpy" and hasattr(batch, "tobytes")
+
+def get_element_keys(batch: object, use_approximation: bool = False) -> List[str]:
+    """Get the hash of each element of a batch, which can be a numpy array
+    (its rows), a pandas DataFrame or Series (its rows, including the index),
+    a list, or a tuple."""
+    if _is_pandas(batch):
+        import pandas as pd
+        return [
+            "{:016x}".format(value)
+            for value in pd.util.hash_pandas_object(batch, index=True).values
+        ]
+
+    if _is_numpy(batch):
+        import numpy as np
+        batch = np.ascontiguousarray(batch)
+        dtype = batch.dtype.str.encode()
+        return [
+            hashlib.blake2b(dtype + row.tobytes(), digest_size=16).hexdigest()
+            for row in batch
+        ]
+
+    if isinstance(batch, (list, tuple)):
+        return [
+            sha256({"element":element}, use_approximation=use_approximation)
+            for element in batch
+        ]
+
+    raise ValueError(
+        "The elementwise argument must be a numpy array, a pandas object, a list or a tuple, got {}".format(
+            type(batch)
+        )
+    )
+
+def take(batch: object, indices: Sequence[int]) -> object:
+    """Get the elements at the given positions, keeping the type of the batch."""
+    if _is_pandas(batch):
+        return batch.iloc[list(indices)]
+    if _is_numpy(batch):
+        return batch[list(indices)]
+    if isinstance(batch, tuple):
+        return tuple(batch[i] for i in indices)
+    return [batch[i] for i in indices]
+
+def assemble(pieces: List[Tuple[List[int], object]], length: int) -> object:
+    """Merge the pieces, each with the positions of its elements, into a single
+    batch of the given length, in the order of the positions."""
+    first = pieces[0][1]
+
+    if _is_numpy(first):
+        import numpy as np
+        result = np.empty(
+            (length, *first.shape[1:]),
+            dtype=np.result_type(*[values for _, values in pieces])
+        )
+        for positions, values in pieces:
+            result[positions] = values
+        return result
+
+    if _is_pandas(first):
+        import numpy as np
+        import pandas as pd
+        positions = np.concatenate([positions for positions, _ in pieces])
+        result = pd.concat([values for _, values in pieces])
+        return result.iloc[np.argsort(positions, kind="stable")]
+
+    result = [None] * length
+    for positions, values in pieces:
+        for position, value in zip(positions, values):
+            result[position] = value
+    if isinstance(first, tuple):
+        return tuple(result)
+    return result
+
+
+class ElementIndex:
+    """Keep in memory which segment of an elementwise store holds each element.
+
+    Every segment is written once and never modified, and it's visible only
+    after the file with its keys is renamed in place. So the index has to read
+    only the keys of the segments that were added since the last lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stores = {}
+
+    def lookup(self, directory: str, keys: List[str]) -> List[Optional[Tuple[str, int]]]:
+        """Return, for each key, its segment and its position in it, or None
+        if the element is not in the store."""
+        try:
+            names = {
+                name[:-len(KEYS_SUFFIX)]
+                for name in os.listdir(directory)
+                if name.endswith(KEYS_SUFFIX)
+            }
+        except FileNotFoundError:
+            names = set()
+
+        with self._lock:
+            segments, elements = self._stores.setdefault(directory, (set(), {}))
+
+            # The removed segments must be forgotten
+            removed = segments - names
+            if removed:
+                segments -= removed
+                for key in [key for key, (segment, _) in elements.items() if segment in removed]:
+                    del elements[key]
+
+            for segment in sorted(names - segments):
+                try:
+                    with open(os.path.join(directory, segment + KEYS_SUFFIX), "r") as f:
+                        segment_keys = json.load(f)
+                except FileNotFoundError:
+                    continue
+                segments.add(segment)
+                for position, key in enumerate(segment_keys):
+                    elements[key] = (segment, position)
+
+            return [elements.get(key) for key in keys]
+
+
+global_element_index = ElementIndex()
@@ -0,0 +1,22 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared thread pools, created only when they are first needed
+_executors = {}
+_executors_lock = threading.Lock()
+
+DEFAULT_IO_WORKERS = 8
+
+def get_shared_executor(name: str, max_workers: int = DEFAULT_IO_WORKERS) -> ThreadPoolExecutor:
+    """Get the shared bounded thread pool with the given name, creating it on first use."""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix="cache_decorator_{}".format(name),
+                )
+                _executors[name] = executor
+    return executor
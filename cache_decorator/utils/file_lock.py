@@ -0,0 +1,177 @@
+import os
+import json
+import socket
+import logging
+import threading
+from time import time
+from .random_string import random_string
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class FileLock:
+    """Lock shared between processes, and hosts sharing the same filesystem,
+    through a lock file next to the cache.
+
+    Two protocols are supported:
+    `fcntl` uses `flock` on the lock file, the kernel releases it if the
+        holder dies.
+    `lease` atomically creates the lock file and keeps it alive with an
+        heartbeat thread that touches it. If the lock file is not touched for
+        more than `lease_duration` seconds its holder is considered dead and
+        the lock is taken over. This works also on filesystems without locks.
+    `auto` uses `fcntl` where available and `lease` otherwise.
+    """
+
+    def __init__(self, path: str, mode: str = "auto", lease_duration: float = 30):
+        if mode not in ("auto", "fcntl", "lease"):
+            raise ValueError(
+                "The lock mode {} is not supported, the available ones are auto, fcntl, and lease.".format(mode)
+            )
+        if mode == "auto":
+            mode = "lease" if fcntl is None else "fcntl"
+        if mode == "fcntl" and fcntl is None:
+            raise ValueError("The fcntl lock mode is not available on this platform.")
+
+        self.path = path
+        self.mode = mode
+        self.lease_duration = lease_duration
+        self._fd = None
+        self._token = None
+        self._heartbeat = None
+        self._stop_heartbeat = threading.Event()
+        # The last modification time seen on the lock file of someone else and
+        # when we first saw it, so that the staleness doesn't depend on the
+        # clocks of the other hosts.
+        self._observed_mtime = None
+        self._observed_since = None
+
+    def try_acquire(self) -> bool:
+        """Try to acquire the lock without blocking."""
+        dirname = os.path.dirname(self.path)
+        if dirname != "":
+            os.makedirs(dirname, exist_ok=True)
+
+        if self.mode == "fcntl":
+            return self._try_acquire_fcntl()
+        return self._try_acquire_lease()
+
+    def release(self):
+        if self.mode == "fcntl":
+            self._release_fcntl()
+        else:
+            self._release_lease()
+
+    def _try_acquire_fcntl(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # The previous holder might have removed the file between our open and
+        # our lock, in that case we hold the lock of a file nobody else sees.
+        try:
+            is_same_file = os.stat(self.path).st_ino == os.fstat(fd).st_ino
+        except FileNotFoundError:
+            is_same_file = False
+
+        if not is_same_file:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        return True
+
+    def _release_fcntl(self):
+        if self._fd is None:
+            return
+        # Remove the file while still holding the lock so that who is waiting
+        # on the old file notices it
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def _try_acquire_lease(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            self._take_over_if_stale()
+            return False
+
+        self._token = random_string(16)
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "host":socket.gethostname(),
+                "pid":os.getpid(),
+                "token":self._token,
+            }, f)
+
+        self._stop_heartbeat.clear()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _take_over_if_stale(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+
+        now = time()
+        if mtime != self._observed_mtime:
+            self._observed_mtime = mtime
+            self._observed_since = now
+            return
+
+        if now - self._observed_since <= self.lease_duration:
+            return
+
+        # Renaming is atomic so only one of the waiters removes the stale lease
+        stale_path = "{}.stale.{}".format(self.path, random_string(8))
+        try:
+            os.rename(self.path, stale_path)
+            os.remove(stale_path)
+            logger.warning("Took over the stale lock at %s", self.path)
+        except FileNotFoundError:
+            pass
+        self._observed_mtime = None
+
+    def _heartbeat_loop(self):
+        while not self._stop_heartbeat.wait(self.lease_duration / 3):
+            if not self._is_lease_ours():
+                logger.warning("The lease of the lock at %s was taken over by someone else", self.path)
+                return
+            try:
+                os.utime(self.path, None)
+            except FileNotFoundError:
+                return
+
+    def _is_lease_ours(self) -> bool:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("token") == self._token
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def _release_lease(self):
+        if self._heartbeat is None:
+            return
+        self._stop_heartbeat.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+        if self._is_lease_ours():
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self._token = None
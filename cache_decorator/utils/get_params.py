@@ -1,31 +1,44 @@
+class ParamsBinder:
+    """Normalize the args and kwargs of the calls of a function into a single
+    dict of parameters. Everything that depends only on the signature is
+    computed once, so that each call just has to fill the values."""
+
+    def __init__(self, function_info):
+        self.args = tuple(function_info["args"])
+        self.defaults = {
+            arg:default
+            for arg, default in zip(reversed(function_info["args"]), reversed(function_info["defaults"]))
+        }
+        self.kwonlydefaults = dict(function_info["kwonlydefaults"])
+        self.number_of_defaults = len(function_info["defaults"])
+        self.args_to_ignore = tuple(function_info["args_to_ignore"])
+
+    def bind(self, args, kwargs) -> dict:
+        params = kwargs.copy()
+
+        # add args and kwonly defaults
+        params.update(self.defaults)
+        params.update(self.kwonlydefaults)
+
+        # Collect args and kwargs as one kwargs
+        params.update(zip(self.args, args))
+        params.update(kwargs)
+
+        # This might cause collisions but FFS
+        if len(args) > len(self.args):
+            params.update({
+                "__positional_arg_{}".format(i):arg
+                for i, arg in enumerate(args[
+                    len(self.args):len(args)-self.number_of_defaults
+                ])
+            })
+
+        # Remove the arguments to ignore if present
+        for arg in self.args_to_ignore:
+            params.pop(arg, None)
+
+        return params
+
+
 def get_params(function_info, args, kwargs):
-    params = kwargs.copy()
-
-    # add args default
-    if function_info["defaults"]:
-        for arg, default in zip(reversed(function_info["args"]), reversed(function_info["defaults"])):
-            params[arg] = default
-
-    # Add kwonly defaults
-    params.update(function_info["kwonlydefaults"])
-
-    # Collect args and kwargs as one kwargs
-    args_and_kwargs = {
-        **dict(zip(function_info["args"], args)),
-        **kwargs
-    }
-    params.update(args_and_kwargs)
-
-    # This might cause collisions but FFS
-    params.update({
-        "__positional_arg_{}".format(i):arg
-        for i, arg in enumerate(args[
-            len(function_info["args"]):len(args)-len(function_info["defaults"])
-        ])
-    })
-
-    # Remove the arguments to ignore if present
-    for arg in function_info["args_to_ignore"]:
-        params.pop(arg, None)
-
-    return params
\ No newline at end of file
+    return ParamsBinder(function_info).bind(args, kwargs)
@@ -0,0 +1,70 @@
+import threading
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, List, Union
+
+class LazyValue:
+    """A value that is loaded by the given function when first needed."""
+
+    def __init__(self, load: Callable[[], object]):
+        self.load = load
+
+
+def _resolve(lock: threading.Lock, members: Union[Dict, List], key) -> object:
+    value = members[key]
+    if not isinstance(value, LazyValue):
+        return value
+    with lock:
+        # Another thread might have loaded it while we waited
+        value = members[key]
+        if isinstance(value, LazyValue):
+            value = value.load()
+            members[key] = value
+    return value
+
+
+class LazyMapping(Mapping):
+    """A read-only dict whose values are loaded on first access and then kept."""
+
+    def __init__(self, members: Dict[str, object]):
+        self._members = dict(members)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> object:
+        return _resolve(self._lock, self._members, key)
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def is_loaded(self, key: str) -> bool:
+        return not isinstance(self._members[key], LazyValue)
+
+    def __repr__(self) -> str:
+        return "LazyMapping({})".format(list(self._members.keys()))
+
+
+class LazySequence(Sequence):
+    """A read-only list whose values are loaded on first access and then kept."""
+
+    def __init__(self, members: List[object]):
+        self._members = list(members)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, index: Union[int, slice]) -> object:
+        if isinstance(index, slice):
+            return [
+                self[i]
+                for i in range(*index.indices(len(self)))
+            ]
+        return _resolve(self._lock, self._members, index)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def is_loaded(self, index: int) -> bool:
+        return not isinstance(self._members[index], LazyValue)
+
+    def __repr__(self) -> str:
+        return "LazySequence(length={})".format(len(self._members))
@@ -0,0 +1,101 @@
+import os
+import json
+import threading
+from time import time
+from collections import OrderedDict
+
+# The fields of the metadata needed to load a cache, the others (like the
+# source of the function) are not kept in memory
+HIT_METADATA_FIELDS = (
+    "creation_time", "time_delta", "backend_metadata", "delta", "dependencies", "entry_hash",
+)
+
+class MetadataCache:
+    """Keep in memory the parsed metadata files, with only the fields needed
+    to load the caches.
+
+    An entry is used only while the file has the same modification time, size
+    and inode, so the metadata written by other processes is always seen, at
+    the cost of a `stat` instead of opening and parsing the file.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> dict:
+        """Return the metadata at the path, which must not be modified.
+        Raises `FileNotFoundError` if the file doesn't exist."""
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        with open(path, "r") as f:
+            metadata = json.load(f)
+        metadata = {
+            key:metadata[key]
+            for key in HIT_METADATA_FIELDS
+            if key in metadata
+        }
+
+        with self._lock:
+            self._entries[path] = (version, metadata)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return metadata
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class NegativeLookups:
+    """Remember the paths recently found missing, so that looking them up
+    again in a short time doesn't touch the filesystem."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, path: str):
+        with self._lock:
+            self._entries[path] = time()
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, path: str, ttl: float) -> bool:
+        """If the path was found missing less than `ttl` seconds ago."""
+        with self._lock:
+            missing_since = self._entries.get(path)
+            if missing_since is None:
+                return False
+            if time() - missing_since > ttl:
+                del self._entries[path]
+                return False
+            return True
+
+    def discard(self, path: str):
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+global_metadata_cache = MetadataCache()
+global_negative_lookups = NegativeLookups()
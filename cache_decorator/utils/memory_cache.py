@@ -0,0 +1,198 @@
+import sys
+import pickle
+import threading
+from time import time
+from itertools import islice
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+class MemoryCache:
+    """In-process LRU cache used as a tier in front of the disk caches.
+
+    The cache is bounded both by the number of entries and by the estimated
+    number of bytes of the stored values. A single instance is shared by all
+    the decorated functions so that they all respect the same memory budget.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024**2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def set_limits(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Change the limits of the cache, evicting the entries that do not fit anymore."""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def get(self, key: str, validity_duration: Optional[float] = None) -> Tuple[bool, object]:
+        """Return if the key was found and its value.
+        Entries older than `validity_duration` seconds are evicted and reported as missing."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            value, creation_time, size, _ = entry
+            if validity_duration is not None and time() - creation_time > validity_duration:
+                del self._entries[key]
+                self._total_bytes -= size
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def get_entry(self, key: str) -> Tuple[bool, object, Optional[float], Optional[List[dict]]]:
+        """Return if the key was found, its value, its creation time and the
+        dependencies it was computed from, leaving to the caller to check if
+        it's still valid."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None, None, None
+            self._entries.move_to_end(key)
+            value, creation_time, _, dependencies = entry
+            return True, value, creation_time, dependencies
+
+    def put(self, key: str, value: object, creation_time: Optional[float] = None, dependencies: Optional[List[dict]] = None):
+        """Store the value, numpy arrays are made read-only so that they can be
+        shared between the callers without defensive copies. The dependencies
+        are kept with the value, so they are evicted together."""
+        size = estimate_size(value)
+        # Values that would flush the whole cache are not worth keeping
+        if size > self.max_bytes:
+            self.pop(key)
+            return
+
+        make_read_only(value)
+
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._total_bytes -= old_entry[2]
+
+            self._entries[key] = (value, creation_time or time(), size, dependencies or None)
+            self._total_bytes += size
+            self._evict()
+
+    def pop(self, key: str):
+        """Remove the key if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry[2]
+
+    def clear(self):
+        """Remove all the entries."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _evict(self):
+        """Drop the least recently used entries until we are within the limits.
+        The lock must be held by the caller."""
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._total_bytes > self.max_bytes
+        ):
+            _, (_, _, size, _) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+
+# How many items of each container, and how deep, are measured when
+# estimating the size of a value without serializing it
+SIZE_SAMPLES = 32
+MAX_SIZE_DEPTH = 8
+
+def estimate_size(value: object, use_pickle: bool = True) -> int:
+    """Estimate how many bytes the value uses. We use `nbytes` for numpy
+    arrays, `memory_usage` for pandas objects and the length of the pickle
+    for everything else. If `use_pickle` is False, to avoid serializing the
+    value, the size of the other objects is estimated by `estimate_deep_size`."""
+    if is_array_like(value):
+        if hasattr(value, "memory_usage"):
+            usage = value.memory_usage(index=True, deep=False)
+            return int(getattr(usage, "sum", lambda: usage)())
+        return int(value.nbytes)
+
+    # Containers of arrays (e.g. the results of .npz caches) are summed up
+    values = value.values() if isinstance(value, dict) else value
+    if isinstance(value, (list, tuple, dict)) and value and all(is_array_like(v) for v in values):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in values)
+
+    if not use_pickle:
+        return estimate_deep_size(value)
+
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def estimate_deep_size(value: object, depth: int = 0) -> int:
+    """Estimate the size of the value and of the objects it contains. Only
+    a sample of the items of each container is measured and scaled to its
+    length, so the time is bounded but the result is approximate."""
+    if is_array_like(value):
+        return estimate_size(value)
+
+    size = sys.getsizeof(value)
+    if depth >= MAX_SIZE_DEPTH or isinstance(value, (str, bytes, bytearray)):
+        return size
+
+    if isinstance(value, dict):
+        items = [item for key_value in islice(value.items(), SIZE_SAMPLES) for item in key_value]
+        length = 2 * len(value)
+    elif isinstance(value, (list, tuple)):
+        step = max(1, len(value) // SIZE_SAMPLES)
+        items = value[::step][:SIZE_SAMPLES]
+        length = len(value)
+    elif isinstance(value, (set, frozenset)):
+        items = list(islice(value, SIZE_SAMPLES))
+        length = len(value)
+    elif hasattr(value, "__dict__"):
+        return size + estimate_deep_size(vars(value), depth + 1)
+    else:
+        return size
+
+    if not items:
+        return size
+    sampled = sum(estimate_deep_size(item, depth + 1) for item in items)
+    return size + sampled * length // len(items)
+
+
+def is_array_like(value: object) -> bool:
+    """Check if the value is a numpy or pandas object, without importing them."""
+    return type(value).__module__.split(".")[0] in ("numpy", "pandas") and (
+        hasattr(value, "nbytes") or hasattr(value, "memory_usage")
+    )
+
+
+def make_read_only(value: object):
+    """Set the numpy arrays (also inside lists, tuples and dicts) as read-only."""
+    if isinstance(value, (list, tuple)):
+        for v in value:
+            make_read_only(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            make_read_only(v)
+    else:
+        flags = getattr(value, "flags", None)
+        if type(value).__module__ == "numpy" and hasattr(flags, "writeable"):
+            flags.writeable = False
+
+
+# The tier is shared by all the decorated functions
+global_memory_cache = MemoryCache()
@@ -0,0 +1,73 @@
+import threading
+from time import time, sleep
+from typing import List, Optional
+from .file_lock import FileLock
+
+class MissLimiter:
+    """Limit how many misses of a function are computed at the same time.
+
+    In the process the misses wait on a semaphore, and across the processes,
+    also on different hosts, sharing the slots directory they wait to acquire
+    one of the `max_shared_misses` lock files used as slots. The lock files
+    are released by the kernel, or expire, if their holder dies.
+    """
+
+    def __init__(
+        self,
+        max_misses: Optional[int] = None,
+        max_shared_misses: Optional[int] = None,
+        lock_mode: str = "auto",
+        lease_duration: float = 30,
+    ):
+        self.max_misses = max_misses
+        self.max_shared_misses = max_shared_misses
+        self.lock_mode = lock_mode
+        self.lease_duration = lease_duration
+        self._semaphore = None if max_misses is None else threading.BoundedSemaphore(max_misses)
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.max_misses is not None or self.max_shared_misses is not None
+
+    def acquire(self, slots_path: str, timeout: Optional[float] = None) -> Optional[List]:
+        """Wait for a slot, with the given prefix for the paths of the lock files.
+        Returns what has to be passed to `release`, or None if the timeout expired."""
+        start_time = time()
+        acquired = []
+        if self._semaphore is not None:
+            if not self._semaphore.acquire(timeout=timeout):
+                return None
+            acquired.append(self._semaphore)
+
+        if self.max_shared_misses is not None:
+            remaining = None if timeout is None else max(0, timeout - (time() - start_time))
+            slot = self._acquire_slot(slots_path, remaining)
+            if slot is None:
+                self.release(acquired)
+                return None
+            acquired.append(slot)
+
+        return acquired
+
+    def _acquire_slot(self, slots_path: str, timeout: Optional[float]) -> Optional[FileLock]:
+        locks = [
+            FileLock(
+                "{}.{}.slot".format(slots_path, i),
+                mode=self.lock_mode,
+                lease_duration=self.lease_duration
+            )
+            for i in range(self.max_shared_misses)
+        ]
+        start_time = time()
+        while True:
+            for lock in locks:
+                if lock.try_acquire():
+                    return lock
+            if timeout is not None and time() - start_time > timeout:
+                return None
+            sleep(0.1)
+
+    @staticmethod
+    def release(acquired: List):
+        for item in reversed(acquired):
+            item.release()
@@ -0,0 +1,16 @@
+class _Missing:
+    """The result of a lookup that found no valid cache. It's used instead of
+    None so that None can be a cached result."""
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __reduce__(self):
+        # Keep it a singleton also through pickling
+        return "MISSING"
+
+
+MISSING = _Missing()
@@ -0,0 +1,108 @@
+import inspect
+from string import Formatter
+from _string import formatter_field_name_split
+from typing import Dict, List, Tuple, Union
+
+class PathTemplate:
+    """A path format string parsed once so that formatting it only has to
+    fill in the slots.
+
+    Each slot is either a plain field lookup like `{x}`, an attribute or
+    item chain like `{a.name}` or `{x[0]}`, or a call segment like
+    `{self.get_name()}` whose result is called if it's a function or a method.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.segments = []
+        self.fields = set()
+
+        # The format specs (e.g. `{x:03d}`) have always been ignored, so we keep
+        # ignoring them to not change the paths of the already existing caches.
+        for literal, field, _spec, conversion in Formatter().parse(template):
+            if field is None:
+                self.segments.append((literal, None, None, False, None))
+                continue
+
+            # Check if we should call the value or not
+            call = field.endswith("()")
+            if call:
+                field = field[:-2]
+
+            root, chain = formatter_field_name_split(field)
+            self.fields.add(root)
+            self.segments.append((literal, root, list(chain), call, conversion))
+
+        # Compute the _hash only when needed so that it's possible to cache
+        # functions which take non-hashable arguments.
+        self.needs_hash = "_hash" in self.fields
+        # The constant part after the last field, which usually holds the extension
+        self.suffix = self.segments[-1][0] if self.segments and self.segments[-1][1] is None else ""
+        self.needs_cache_dir = "cache_dir" in self.fields
+
+    def format(self, format_args: Dict[str, object]) -> str:
+        """Substitute the values of the format args in the template."""
+        path = ""
+        for literal, root, chain, call, conversion in self.segments:
+            path += literal
+            if root is None:
+                continue
+
+            value = format_args[root]
+
+            # Follow the attributes chain
+            for is_attribute, key in chain:
+                if is_attribute:
+                    value = getattr(value, key)
+                else:
+                    value = value[key]
+
+            if call and (inspect.isfunction(value) or inspect.ismethod(value) or inspect.isbuiltin(value)):
+                value = value()
+
+            if conversion == "r":
+                path += repr(value)
+            elif conversion == "a":
+                path += ascii(value)
+            elif conversion == "s" or call:
+                path += str(value)
+            else:
+                path += format(value, "")
+        return path
+
+    def __repr__(self) -> str:
+        return "PathTemplate({!r})".format(self.template)
+
+
+CompiledPath = Union[PathTemplate, List[PathTemplate], Tuple[PathTemplate], Dict[str, PathTemplate]]
+
+def compile_path(path: Union[str, Tuple[str], List[str], Dict[str, str]]) -> CompiledPath:
+    """Compile a path, or each path of a structured path, to a PathTemplate."""
+    if isinstance(path, list):
+        return [compile_path(p) for p in path]
+    if isinstance(path, tuple):
+        return tuple([compile_path(p) for p in path])
+    if isinstance(path, dict):
+        return {key:compile_path(p) for key, p in path.items()}
+    return PathTemplate(path)
+
+def iter_templates(compiled: CompiledPath):
+    """Iterate over all the PathTemplates of a (possibly structured) compiled path."""
+    if isinstance(compiled, (list, tuple)):
+        for c in compiled:
+            yield from iter_templates(c)
+    elif isinstance(compiled, dict):
+        for c in compiled.values():
+            yield from iter_templates(c)
+    else:
+        yield compiled
+
+def format_compiled_path(compiled: CompiledPath, format_args: Dict[str, object]):
+    """Format each PathTemplate of a (possibly structured) compiled path."""
+    if isinstance(compiled, list):
+        return [format_compiled_path(c, format_args) for c in compiled]
+    if isinstance(compiled, tuple):
+        return tuple([format_compiled_path(c, format_args) for c in compiled])
+    if isinstance(compiled, dict):
+        return {key:format_compiled_path(c, format_args) for key, c in compiled.items()}
+    return compiled.format(format_args)
@@ -0,0 +1,92 @@
+import os
+import pickle
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+from .atomic_write import get_temporary_path, remove_temporary_path
+from .elementwise import _is_numpy, _is_pandas
+
+RANGE_SUFFIX = ".range.pkl"
+
+def dump_range(path: str, start: object, end: object):
+    """Atomically save the range of a segment, which makes the segment visible."""
+    tmp_path = get_temporary_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((start, end), f)
+        os.replace(tmp_path, path)
+    finally:
+        remove_temporary_path(tmp_path)
+
+def load_ranges(directory: str) -> Dict[str, Tuple[object, object]]:
+    """Return the range of each segment in the directory."""
+    try:
+        names = [
+            name[:-len(RANGE_SUFFIX)]
+            for name in os.listdir(directory)
+            if name.endswith(RANGE_SUFFIX)
+        ]
+    except FileNotFoundError:
+        return {}
+
+    ranges = {}
+    for name in names:
+        try:
+            with open(os.path.join(directory, name + RANGE_SUFFIX), "rb") as f:
+                ranges[name] = pickle.load(f)
+        except FileNotFoundError:
+            # It was just compacted
+            continue
+    return ranges
+
+def plan_range(
+    start: object,
+    end: object,
+    ranges: Dict[str, Tuple[object, object]],
+) -> List[Tuple[object, object, Optional[str]]]:
+    """Split the half-open interval [start, end) in consecutive pieces, each
+    either covered by a segment fully inside the interval, or a gap to compute,
+    whose segment is None. The longest segments are preferred."""
+    contained = [
+        (segment_start, segment_end, segment)
+        for segment, (segment_start, segment_end) in ranges.items()
+        if start <= segment_start < segment_end <= end
+    ]
+
+    plan = []
+    current = start
+    while current < end:
+        best = None
+        next_start = end
+        for segment_start, segment_end, segment in contained:
+            if segment_start == current:
+                if best is None or segment_end > best[1]:
+                    best = (segment_start, segment_end, segment)
+            elif current < segment_start < next_start:
+                next_start = segment_start
+
+        if best is not None:
+            plan.append(best)
+            current = best[1]
+        else:
+            plan.append((current, next_start, None))
+            current = next_start
+    return plan
+
+def concatenate(parts: List[object]) -> object:
+    """Concatenate the results of consecutive ranges."""
+    first = parts[0]
+    if _is_pandas(first):
+        import pandas as pd
+        return pd.concat(parts)
+    if _is_numpy(first):
+        import numpy as np
+        return np.concatenate(parts)
+    if isinstance(first, tuple):
+        return tuple(chain.from_iterable(parts))
+    if isinstance(first, list):
+        return list(chain.from_iterable(parts))
+    raise ValueError(
+        "The results of the ranges must be pandas objects, numpy arrays, lists or tuples, got {}".format(
+            type(first)
+        )
+    )
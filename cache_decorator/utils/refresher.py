@@ -0,0 +1,71 @@
+import logging
+import threading
+from typing import Callable, Hashable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class BackgroundRefresher:
+    """Recompute the stale caches in background threads.
+
+    A key is refreshed by at most one thread at a time, and when there are
+    already `max_concurrent` refreshes running the new ones are dropped, since
+    the next access of a stale key will ask again.
+    """
+
+    def __init__(self, max_concurrent: int = 4):
+        self.max_concurrent = max_concurrent
+        self._running = set()
+        self._condition = threading.Condition()
+        self._executor = None
+        self._executor_workers = 0
+
+    def set_limit(self, max_concurrent: int):
+        """Change how many refreshes can run at the same time."""
+        with self._condition:
+            self.max_concurrent = max_concurrent
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the pool of the refreshes, rebuilding it if the limit changed.
+        The refreshes already submitted to the old pool still run."""
+        if self._executor is None or self._executor_workers != self.max_concurrent:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent,
+                thread_name_prefix="cache_decorator_refresh",
+            )
+            self._executor_workers = self.max_concurrent
+        return self._executor
+
+    def submit(self, key: Hashable, refresh: Callable[[], None]) -> bool:
+        """Schedule the refresh of the key, returning if it was scheduled."""
+        with self._condition:
+            if key in self._running or len(self._running) >= self.max_concurrent:
+                return False
+            self._running.add(key)
+            executor = self._get_executor()
+
+        executor.submit(self._refresh, key, refresh)
+        return True
+
+    def _refresh(self, key: Hashable, refresh: Callable[[], None]):
+        try:
+            refresh()
+        except Exception:
+            logger.exception("The background refresh of %s failed", key)
+        finally:
+            with self._condition:
+                self._running.discard(key)
+                self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the running refreshes to finish. Returns False if the timeout expired."""
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self._running) == 0, timeout)
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+
+global_refresher = BackgroundRefresher()
@@ -0,0 +1,106 @@
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple, Union
+
+class SingleFlight:
+    """Deduplicate the concurrent calls with the same key.
+
+    The first caller of a key runs the function, while the others wait for
+    it to finish and receive the same result (or exception). The state of a
+    key is removed as soon as its call is done, so it doesn't grow with the
+    number of keys ever seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, function: Callable[[], object]) -> object:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = (Future(), threading.get_ident())
+                self._calls[key] = call
+                is_leader = True
+            else:
+                is_leader = False
+
+        future, leader_thread = call
+
+        if not is_leader:
+            # A re-entrant call of the leader would wait for itself forever
+            if leader_thread == threading.get_ident():
+                return function()
+            return future.result()
+
+        try:
+            result = function()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+def get_path_key(path: Union[str, List[str], Tuple[str], Dict[str, str]]) -> Hashable:
+    """Convert a (possibly structured) path to a hashable key."""
+    if isinstance(path, (list, tuple)):
+        return tuple(get_path_key(p) for p in path)
+    if isinstance(path, dict):
+        return tuple(sorted(
+            (key, get_path_key(p))
+            for key, p in path.items()
+        ))
+    return path
+
+
+# The calls are deduplicated between all the decorated functions since the
+# same path is the same file
+global_single_flight = SingleFlight()
+
+
+class AsyncSingleFlight:
+    """Deduplicate the concurrent awaits with the same key on the same event loop."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key: Hashable, coroutine_function: Callable[[], Awaitable]) -> object:
+        # Only the coroutines need asyncio, which is slow to import
+        import asyncio
+        loop = asyncio.get_running_loop()
+        # The futures can only be awaited on the loop that created them
+        loop_key = (id(loop), key)
+        future = self._calls.get(loop_key)
+        if future is not None:
+            # Shield it so that a cancelled waiter doesn't cancel the others
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._calls[loop_key] = future
+        try:
+            result = await coroutine_function()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Avoid the "exception never retrieved" warning if nobody waited
+            future.exception()
+            raise
+        finally:
+            del self._calls[loop_key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+global_async_single_flight = AsyncSingleFlight()
@@ -0,0 +1,39 @@
+import bz2
+import gzip
+import lzma
+import pickle
+from typing import Callable, IO, Iterator, List
+
+# The generators are saved as a sequence of pickled chunks of items, so the
+# formats must be able to append and read them incrementally
+STREAM_OPENERS = {
+    ".pkl": open,
+    ".pkl.gz": gzip.open,
+    ".pkl.bz": bz2.open,
+    ".pkl.lzma": lzma.open,
+}
+
+def get_stream_opener(path: str) -> Callable[..., IO]:
+    """Get the function to open the stream at the given path."""
+    for extension, opener in sorted(STREAM_OPENERS.items(), key=lambda item: -len(item[0])):
+        if path.endswith(extension):
+            return opener
+    raise ValueError(
+        "The path '{}' is not supported for generators, the supported extensions are {}".format(
+            path, list(STREAM_OPENERS.keys())
+        )
+    )
+
+def write_chunk(stream: IO, chunk: List[object]):
+    """Append a chunk of items to the stream."""
+    pickle.dump(chunk, stream, protocol=pickle.HIGHEST_PROTOCOL)
+
+def iter_stream(path: str) -> Iterator[object]:
+    """Lazily yield the items of the stream at the given path, one chunk at a time."""
+    with get_stream_opener(path)(path, "rb") as stream:
+        while True:
+            try:
+                chunk = pickle.load(stream)
+            except EOFError:
+                return
+            yield from chunk
@@ -0,0 +1,91 @@
+import atexit
+import logging
+import threading
+from typing import Callable, Hashable, Optional, Tuple
+from .executors import get_shared_executor
+from .memory_cache import estimate_size
+
+logger = logging.getLogger(__name__)
+
+class WriteBehind:
+    """Save the results in background threads so that the callers don't
+    have to wait for the serialization.
+
+    The results being written are kept in memory, so that the lookups of the
+    same process can find them, and when they exceed `max_pending_bytes`
+    the new writes block until enough of the pending ones are done.
+    """
+
+    def __init__(self, max_pending_bytes: int = 512 * 1024**2, max_workers: int = 4):
+        self.max_pending_bytes = max_pending_bytes
+        self.max_workers = max_workers
+        self._pending = {}
+        self._pending_bytes = 0
+        self._pending_writes = 0
+        self._condition = threading.Condition()
+        self._atexit_registered = False
+
+    def submit(self, key: Hashable, value: object, write: Callable[[], None]):
+        """Schedule the write of the value, which can be found with `get`
+        until the write is finished."""
+        # Pickling the value to measure it would defeat the purpose, so the
+        # size is a sampled estimate and the limit is approximate
+        size = estimate_size(value, use_pickle=False)
+        token = object()
+        with self._condition:
+            # A single write bigger than the limit is allowed, otherwise we
+            # would wait forever
+            while self._pending_writes > 0 and self._pending_bytes + size > self.max_pending_bytes:
+                self._condition.wait()
+
+            self._pending[key] = (value, token)
+            self._pending_bytes += size
+            self._pending_writes += 1
+
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+
+        get_shared_executor("writer", self.max_workers).submit(self._write, key, token, size, write)
+
+    def _write(self, key: Hashable, token: object, size: int, write: Callable[[], None]):
+        try:
+            write()
+        except Exception:
+            logger.exception("The background write of %s failed", key)
+        finally:
+            with self._condition:
+                # Only remove the value if it was not overwritten by a newer write
+                if self._pending.get(key, (None, None))[1] is token:
+                    del self._pending[key]
+                self._pending_bytes -= size
+                self._pending_writes -= 1
+                self._condition.notify_all()
+
+    def get(self, key: Hashable) -> Tuple[bool, object]:
+        """Return if the key is being written and its value."""
+        entry = self._pending.get(key)
+        if entry is None:
+            return False, None
+        return True, entry[0]
+
+    def wait(self, key: Hashable, timeout: Optional[float] = None) -> bool:
+        """Wait for the pending write of the key, if any. Returns False if the timeout expired."""
+        with self._condition:
+            return self._condition.wait_for(lambda: key not in self._pending, timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the pending writes to finish. Returns False if the timeout expired."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending_writes == 0, timeout)
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._pending_bytes
+
+    def __len__(self) -> int:
+        return self._pending_writes
+
+
+# All the decorated functions share the same pending bytes budget
+global_write_behind = WriteBehind()
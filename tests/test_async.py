@@ -0,0 +1,67 @@
+import os
+import asyncio
+import inspect
+from shutil import rmtree
+from time import perf_counter
+from cache_decorator import Cache
+from cache_decorator.utils import global_async_single_flight
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+async def cached_coroutine(a):
+    calls.append(a)
+    await asyncio.sleep(1)
+    return {"a":a}
+
+async def run():
+    # Concurrent awaits of the same key are computed once
+    results = await asyncio.gather(*[cached_coroutine(1) for _ in range(5)], cached_coroutine(2))
+    assert results == [{"a":1}] * 5 + [{"a":2}]
+    assert sorted(calls) == [1, 2]
+    assert len(global_async_single_flight) == 0
+
+    # The hit is loaded from the disk
+    start = perf_counter()
+    assert await cached_coroutine(1) == {"a":1}
+    assert perf_counter() - start < 0.5
+    assert sorted(calls) == [1, 2]
+
+def test_async():
+    assert inspect.iscoroutinefunction(cached_coroutine)
+    calls.clear()
+    asyncio.run(run())
+    if os.path.exists("./test_cache"):
+        rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/locked_{_hash}.json",
+    cache_dir="./test_cache",
+    use_file_locks=True,
+    file_lock_mode="lease",
+    file_lock_lease_duration=1,
+    backup=False,
+)
+async def locked_coroutine(a):
+    calls.append(a)
+    return {"a":a}
+
+def test_async_contended_lock():
+    calls.clear()
+    os.makedirs("./test_cache", exist_ok=True)
+    # Simulate a process that died while holding the lock
+    lock_path = Cache.compute_path(locked_coroutine, 1) + ".lock"
+    with open(lock_path, "w") as f:
+        f.write("{}")
+
+    start = perf_counter()
+    assert asyncio.run(locked_coroutine(1)) == {"a":1}
+    # We polled the lock until the lease expired
+    assert perf_counter() - start > 1
+    assert calls == [1]
+
+    rmtree("./test_cache")
@@ -0,0 +1,62 @@
+import os
+import pytest
+from time import time
+from shutil import rmtree
+from cache_decorator import Cache, SerializationException
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl.gz",
+    cache_dir="./test_cache",
+    fsync_policy="directory",
+    backup=False,
+)
+def cached_function(a):
+    return list(range(a))
+
+@Cache(
+    cache_path="{cache_dir}/{a}.csv",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def not_a_csv(a):
+    return {"this is":"not a csv"}
+
+def test_atomic_writes():
+    assert cached_function(10) == list(range(10))
+    path = Cache.compute_path(cached_function, 10)
+    # Only the cache and its metadata are left, and the source of the function
+    assert sorted(os.listdir("./test_cache")) == sorted([
+        ".sources",
+        os.path.basename(path),
+        os.path.basename(path) + ".metadata",
+    ])
+    assert cached_function(10) == list(range(10))
+
+    # A failed serialization doesn't leave partial files
+    with pytest.raises(SerializationException) as e:
+        not_a_csv(1)
+    assert e.value.path == "./test_cache/1.csv"
+    assert len(os.listdir("./test_cache")) == 3
+
+    rmtree("./test_cache")
+
+def test_sweep_temporary_files():
+    os.makedirs("./test_cache", exist_ok=True)
+    old = "./test_cache/.tmp-0123456789abcdef"
+    new = "./test_cache/.tmp-fedcba9876543210"
+    for path in (old, new):
+        os.makedirs(path)
+        with open(os.path.join(path, "value.pkl"), "w") as f:
+            f.write("partial")
+    os.utime(old, (time() - 2 * 60 * 60, time() - 2 * 60 * 60))
+
+    assert Cache.sweep_temporary_files("./test_cache") == 1
+    assert not os.path.exists(old)
+    # Someone might still be writing it
+    assert os.path.exists(new)
+
+    rmtree("./test_cache")
+
+def test_invalid_fsync_policy():
+    with pytest.raises(ValueError):
+        Cache(fsync_policy="always")
@@ -0,0 +1,87 @@
+import os
+import pytest
+from shutil import rmtree
+from cache_decorator import Cache, BackendTemplate, register_backend, declare_backend
+from cache_decorator.backends.registry import get_backend_classes, is_suffix_resolved, is_path_supported
+from cache_decorator.backends.pickle_backend import PickleBackend
+from cache_decorator.backends.compress_pickle_backend import CompressPickleBackend
+from cache_decorator.backends.compress_json_backend import CompressJsonBackend
+
+@register_backend
+class UpperTxtBackend(BackendTemplate):
+    SUPPORTED_EXTENSIONS = [".upper.txt"]
+    instances = 0
+
+    def __init__(self, load_kwargs, dump_kwargs):
+        super(UpperTxtBackend, self).__init__(load_kwargs, dump_kwargs)
+        UpperTxtBackend.instances += 1
+
+    @staticmethod
+    def can_serialize(obj_to_serialize: object, path: str) -> bool:
+        return isinstance(obj_to_serialize, str)
+
+    @staticmethod
+    def can_deserialize(metadata: dict, path: str) -> bool:
+        return True
+
+    def dump(self, obj_to_serialize: object, path: str) -> dict:
+        with open(path, "w") as f:
+            f.write(obj_to_serialize.upper())
+
+    def load(self, metadata: dict, path: str) -> object:
+        with open(path, "r") as f:
+            return f.read()
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.upper.txt",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def cached_function(a):
+    return "value {}".format(a)
+
+def test_third_party_backend():
+    assert cached_function(1) == "value 1"
+    assert cached_function(1) == "VALUE 1"
+    assert cached_function(2) == "value 2"
+    assert cached_function(2) == "VALUE 2"
+    # The backend is created once for the whole life of the cache
+    assert UpperTxtBackend.instances == 1
+
+    if os.path.exists("./test_cache"):
+        rmtree("./test_cache")
+
+def test_backend_resolution():
+    assert get_backend_classes("a/b.pkl") == (PickleBackend, CompressPickleBackend)
+    assert get_backend_classes("a/b.pkl.gz") == (CompressPickleBackend,)
+    assert get_backend_classes("a/b.json.gz") == (CompressJsonBackend,)
+    assert get_backend_classes("a/b.unknown") == ()
+
+    assert is_suffix_resolved("/value.pkl")
+    assert is_suffix_resolved(".pkl")
+    # the extension might be .pkl.gz or .json.gz
+    assert not is_suffix_resolved(".gz")
+
+def test_default_path_suffix():
+    cached = Cache(cache_dir="./test_cache", backup=False)(lambda a: a)
+    backend = getattr(cached, "__cacher_instance")._backend
+    # The backends of the default path are resolved once, on first use
+    assert backend._suffixes == {".pkl":None}
+    assert cached(1) == 1
+    assert backend._suffixes == {".pkl":(PickleBackend, CompressPickleBackend)}
+
+    if os.path.exists("./test_cache"):
+        rmtree("./test_cache")
+
+def test_declared_backend():
+    declare_backend(
+        "cache_decorator.backends.missing_backend", "MissingBackend", [".missing"],
+        requires=["a_package_that_is_not_installed"]
+    )
+    # The sanity checks don't import it
+    assert not is_path_supported("a/b.missing")
+    with pytest.raises(ValueError):
+        Cache(cache_path="{cache_dir}/{_hash}.missing")
+
+    # As it could not be imported it's dropped
+    assert get_backend_classes("a/b.missing") == ()
@@ -0,0 +1,63 @@
+import os
+from time import sleep
+from shutil import rmtree
+from cache_decorator import Cache
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    min_compute_time=0.2,
+    max_dump_size=100,
+    backup=False,
+)
+def admitted(a, size=1, wait=0.3):
+    calls.append(a)
+    sleep(wait)
+    return {"a":"x" * size}
+
+class SlowToLoad:
+    def __init__(self, value):
+        self.value = value
+
+    def __setstate__(self, state):
+        sleep(0.1)
+        self.value = state["value"]
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    adaptive_bypass=True,
+    backup=False,
+)
+def fast_to_compute(a):
+    calls.append(a)
+    return SlowToLoad(a)
+
+def test_admission():
+    calls.clear()
+    admitted(1)
+    admitted(1)
+    assert calls == [1]
+
+    # Too fast to compute
+    admitted(2, wait=0)
+    assert not os.path.exists(Cache.compute_path(admitted, 2, wait=0))
+    # Too big
+    admitted(3, size=1000)
+    assert not os.path.exists(Cache.compute_path(admitted, 3, size=1000))
+    assert admitted.bypass_counts == {"min_compute_time":1, "max_dump_size":1}
+    rmtree("./test_cache")
+
+def test_adaptive_bypass():
+    calls.clear()
+    fast_to_compute(1)
+    # The hit is slower than computing it
+    assert fast_to_compute(1).value == 1
+    assert calls == [1]
+    assert fast_to_compute(1).value == 1
+    assert fast_to_compute(1).value == 1
+    assert calls == [1, 1, 1]
+    assert fast_to_compute.bypass_counts["slow_load_key"] == 2
+    rmtree("./test_cache")
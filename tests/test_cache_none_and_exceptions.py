@@ -0,0 +1,76 @@
+from time import sleep
+from shutil import rmtree
+from cache_decorator import Cache, CachedException
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def returns_none(a):
+    calls.append(a)
+    return None
+
+class NoData(Exception):
+    pass
+
+class Unpicklable(Exception):
+    def __init__(self, message, callback):
+        super().__init__(message)
+        self.callback = callback
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    cache_exceptions=(NoData, Unpicklable),
+    exception_validity_duration=1,
+    backup=False,
+)
+def fails(a):
+    calls.append(a)
+    if a == 1:
+        raise NoData("no data for {}".format(a))
+    if a == 2:
+        raise Unpicklable("cannot pickle", lambda: None)
+    raise ValueError("not cached")
+
+def test_cache_none():
+    calls.clear()
+    assert returns_none(1) is None
+    assert returns_none(1) is None
+    assert calls == [1]
+    rmtree("./test_cache")
+
+def check_raises(exception_type, a, message):
+    try:
+        fails(a)
+        assert False
+    except exception_type as e:
+        assert message in str(e)
+        return e
+
+def test_cache_exceptions():
+    calls.clear()
+    check_raises(NoData, 1, "no data for 1")
+    e = check_raises(NoData, 1, "no data for 1")
+    assert calls == [1]
+    # The original traceback is kept
+    assert "raise NoData" in e.__notes__[0]
+
+    check_raises(Unpicklable, 2, "cannot pickle")
+    e = check_raises(CachedException, 2, "cannot pickle")
+    assert e.exception_type.endswith("Unpicklable")
+    assert calls == [1, 2]
+
+    # The other exceptions are not cached
+    check_raises(ValueError, 3, "not cached")
+    check_raises(ValueError, 3, "not cached")
+    assert calls == [1, 2, 3, 3]
+
+    # The cached exceptions expire
+    sleep(1.1)
+    check_raises(NoData, 1, "no data for 1")
+    assert calls == [1, 2, 3, 3, 1]
+    rmtree("./test_cache")
@@ -0,0 +1,37 @@
+from shutil import rmtree
+from cache_decorator import Cache
+import cache_decorator.utils.call_context as call_context
+
+hashes = []
+
+def counting_sha256(data, **kwargs):
+    hashes.append(data)
+    return original_sha256(data, **kwargs)
+
+original_sha256 = call_context.sha256
+
+@Cache(
+    cache_path={
+        "a":"{cache_dir}/a_{_hash}.json",
+        "b":"{cache_dir}/b_{_hash}.json",
+        "c":"{cache_dir}/{_hash}/c.json",
+        "d":"{cache_dir}/{_hash}/d.json",
+    },
+    cache_dir="./test_cache/{x}",
+    backup=False,
+)
+def cached_function(x, y=2):
+    return {key:{"value":x * y} for key in "abcd"}
+
+def test_hash_computed_once_per_call():
+    call_context.sha256 = counting_sha256
+    try:
+        hashes.clear()
+        result = cached_function(3, y=4)
+        # The miss hashes the parameters once for all the paths and the metadata
+        assert len(hashes) == 1
+        assert cached_function(3, y=4) == result
+        assert len(hashes) == 2
+    finally:
+        call_context.sha256 = original_sha256
+    rmtree("./test_cache")
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from shutil import rmtree
+from cache_decorator import Cache
+
+steps = []
+crash_at = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    checkpoint_arg_name="checkpoint",
+    enable_cache_arg_name="enable_cache",
+    backup=False,
+)
+def train(epochs, checkpoint=None):
+    state = checkpoint.load({"epoch":0, "total":0})
+    for epoch in range(state["epoch"], epochs):
+        if epoch in crash_at:
+            raise RuntimeError("crash")
+        steps.append(epoch)
+        state = {"epoch":epoch + 1, "total":state["total"] + epoch}
+        checkpoint.save(state)
+    return state
+
+def test_checkpoint():
+    steps.clear()
+    crash_at.append(3)
+    try:
+        train(5)
+        assert False
+    except RuntimeError:
+        pass
+    crash_at.clear()
+    assert steps == [0, 1, 2]
+    checkpoint_path = Cache.compute_path(train, 5) + ".checkpoint.pkl"
+    assert os.path.exists(checkpoint_path)
+
+    # The next call resumes from the last checkpoint
+    assert train(5) == {"epoch":5, "total":10}
+    assert steps == [0, 1, 2, 3, 4]
+    # The result replaced the checkpoint
+    assert not os.path.exists(checkpoint_path)
+    assert not os.path.exists(checkpoint_path + ".metadata")
+
+    assert train(5) == {"epoch":5, "total":10}
+    assert steps == [0, 1, 2, 3, 4]
+
+    # Without the cache the checkpoints are not saved
+    assert train(2, enable_cache=False) == {"epoch":2, "total":1}
+    assert not os.path.exists(Cache.compute_path(train, 2) + ".checkpoint.pkl")
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    checkpoint_arg_name="checkpoint",
+    use_memory_cache=True,
+    backup=False,
+)
+def train_weights(epochs, checkpoint=None):
+    epoch, weights = checkpoint.load((0, np.zeros(3)))
+    for epoch in range(epoch, epochs):
+        if epoch in crash_at:
+            raise RuntimeError("crash")
+        # The state is updated in place after being saved
+        weights += 1
+        checkpoint.save((epoch + 1, weights))
+    return weights
+
+def test_checkpoint_memory_cache():
+    crash_at.append(2)
+    try:
+        train_weights(4)
+        assert False
+    except RuntimeError:
+        pass
+    crash_at.clear()
+
+    # The resumed state can be updated in place too
+    assert train_weights(4).tolist() == [4, 4, 4]
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    checkpoint_arg_name="checkpoint",
+    max_dump_size=1024,
+    log_level="warning",
+    backup=False,
+)
+def big_checkpoint(size, checkpoint=None):
+    checkpoint.save(bytes(size))
+    assert not os.path.exists(Cache.compute_path(big_checkpoint, size) + ".checkpoint.pkl")
+    return size
+
+def test_checkpoint_too_big(caplog):
+    # The checkpoint is not saved, but it's not silent
+    assert big_checkpoint(4096) == 4096
+    assert any(
+        "was not saved" in record.message and record.levelname == "WARNING"
+        for record in caplog.records
+    )
+    if os.path.exists("./test_cache"):
+        rmtree("./test_cache")
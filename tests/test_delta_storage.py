@@ -0,0 +1,107 @@
+import os
+import json
+import random
+from time import sleep
+from shutil import rmtree
+from cache_decorator import Cache
+
+random.seed(42)
+BASE = bytes(random.getrandbits(8) for _ in range(1024**2))
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    delta_storage=True,
+    max_delta_chain=2,
+    backup=False,
+)
+def cached_function(version):
+    calls.append(version)
+    # Each version inserts a few bytes in the middle of the previous one
+    position = len(BASE) // 2
+    return BASE[:position] + b"version" * version + BASE[position:]
+
+def test_delta_storage():
+    calls.clear()
+    results = [cached_function(version) for version in range(4)]
+    sizes = [
+        os.path.getsize(Cache.compute_path(cached_function, version))
+        for version in range(4)
+    ]
+    assert sizes[0] > len(BASE)
+    # The successive versions only save what changed
+    assert all(size < len(BASE) / 10 for size in sizes[1:3])
+    # After the max chain the result is saved in full, or from an earlier base
+    for version, result in enumerate(results):
+        assert cached_function(version) == result
+    assert calls == [0, 1, 2, 3]
+
+    # If the base is removed the deltas are missing
+    os.remove(Cache.compute_path(cached_function, 0))
+    assert cached_function(1) == results[1]
+    assert calls == [0, 1, 2, 3, 1]
+
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    delta_storage=True,
+    validity_duration=2,
+    backup=False,
+)
+def expiring_function(version):
+    calls.append(version)
+    position = len(BASE) // 2
+    return BASE[:position] + b"version" * version + BASE[position:]
+
+def test_delta_base_expiry():
+    calls.clear()
+    expiring_function(0)
+    sleep(1.2)
+    result = expiring_function(1)
+    path = Cache.compute_path(expiring_function, 1)
+    base_path = Cache.compute_path(expiring_function, 0)
+    with open(path + ".metadata") as f:
+        assert json.load(f)["delta"]["base"] == os.path.basename(base_path)
+    # The base lists its deltas, so they are found without listing the directory
+    with open(base_path + ".dependents") as f:
+        assert f.read().split() == [os.path.basename(path)]
+
+    # The base expires and is removed, but first its delta is rewritten in full
+    sleep(1)
+    expiring_function(0)
+    with open(path + ".metadata") as f:
+        assert "delta" not in json.load(f)
+    assert not os.path.exists(base_path + ".dependents")
+    assert expiring_function(1) == result
+    assert calls == [0, 1, 0]
+
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    delta_storage=True,
+    checkpoint_arg_name="checkpoint",
+    backup=False,
+)
+def checkpointed_function(version, checkpoint=None):
+    calls.append(version)
+    checkpoint.save(BASE)
+    return BASE + b"version" * version
+
+def test_delta_checkpoint():
+    calls.clear()
+    result = checkpointed_function(1)
+    path = Cache.compute_path(checkpointed_function, 1)
+    # The result is not a delta of its checkpoint, which is removed
+    with open(path + ".metadata") as f:
+        assert "delta" not in json.load(f)
+    assert not any(name.endswith(".checkpoint.pkl.chunks") for name in os.listdir("./test_cache"))
+    assert checkpointed_function(1) == result
+    assert calls == [1]
+
+    rmtree("./test_cache")
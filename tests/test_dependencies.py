@@ -0,0 +1,143 @@
+import os
+import json
+from shutil import rmtree
+from cache_decorator import Cache
+from cache_decorator.utils import function_versions
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/upstream/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def upstream(a):
+    calls.append(("upstream", a))
+    return {"a":a}
+
+@Cache(
+    cache_path="{cache_dir}/downstream/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def downstream(a):
+    calls.append(("downstream", a))
+    return {"b":upstream(a)["a"] * 2}
+
+@Cache(
+    cache_path="{cache_dir}/report/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def report(a):
+    calls.append(("report", a))
+    return {"c":downstream(a)["b"] + 1}
+
+def test_dependencies():
+    calls.clear()
+    assert report(1) == {"c":3}
+    assert report(2) == {"c":5}
+    assert calls == [
+        ("report", 1), ("downstream", 1), ("upstream", 1),
+        ("report", 2), ("downstream", 2), ("upstream", 2),
+    ]
+
+    # The edges are recorded in the metadata
+    with open(Cache.compute_path(report, 1) + ".metadata") as f:
+        dependencies = json.load(f)["dependencies"]
+    assert [dependency["path"] for dependency in dependencies] == [Cache.compute_path(downstream, 1)]
+
+    calls.clear()
+    assert report(1) == {"c":3}
+    assert calls == []
+
+    # Recompute the first upstream, only its dependents are recomputed
+    os.remove(Cache.compute_path(upstream, 1))
+    assert upstream(1) == {"a":1}
+    assert report(1) == {"c":3}
+    assert report(2) == {"c":5}
+    assert calls == [("upstream", 1), ("report", 1), ("downstream", 1)]
+
+    # A new version of the upstream function invalidates its dependents
+    calls.clear()
+    key = upstream.__wrapped__.__module__ + "." + upstream.__wrapped__.__qualname__
+    version = function_versions[key]
+    function_versions[key] = "a new version"
+    try:
+        assert downstream(2) == {"b":4}
+    finally:
+        function_versions[key] = version
+    # The source didn't really change, so the upstream result is the same
+    assert calls == [("downstream", 2)]
+
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/rejected/{_hash}.json",
+    cache_dir="./test_cache",
+    max_dump_size=10,
+    backup=False,
+)
+def rejected_upstream(a):
+    calls.append(("rejected_upstream", a))
+    return list(range(100))
+
+@Cache(
+    cache_path="{cache_dir}/rejected_background/{_hash}.json",
+    cache_dir="./test_cache",
+    max_dump_size=10,
+    write_behind=True,
+    backup=False,
+)
+def rejected_background_upstream(a):
+    calls.append(("rejected_background_upstream", a))
+    return list(range(100))
+
+@Cache(
+    cache_path="{cache_dir}/rejected_downstream/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def rejected_downstream(a):
+    calls.append(("rejected_downstream", a))
+    return {"sum":sum(rejected_upstream(a)) + sum(rejected_background_upstream(a))}
+
+def test_unsaved_dependencies():
+    calls.clear()
+    for _ in range(3):
+        assert rejected_downstream(1) == {"sum":9900}
+    # The upstream results were not saved, so they are not dependencies
+    assert calls == [
+        ("rejected_downstream", 1), ("rejected_upstream", 1), ("rejected_background_upstream", 1),
+    ]
+    with open(Cache.compute_path(rejected_downstream, 1) + ".metadata") as f:
+        assert "dependencies" not in json.load(f)
+
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/background/{_hash}.json",
+    cache_dir="./test_cache",
+    write_behind=True,
+    backup=False,
+)
+def background_upstream(a):
+    return {"a":a}
+
+@Cache(
+    cache_path="{cache_dir}/background_downstream/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def background_downstream(a):
+    return {"b":background_upstream(a)["a"] * 2}
+
+def test_background_dependencies():
+    assert background_downstream(1) == {"b":2}
+    # The dependent waited for the result to be saved to record it
+    with open(Cache.compute_path(background_downstream, 1) + ".metadata") as f:
+        dependencies = json.load(f)["dependencies"]
+    assert [dependency["path"] for dependency in dependencies] == [Cache.compute_path(background_upstream, 1)]
+    assert all("pending" not in dependency for dependency in dependencies)
+
+    rmtree("./test_cache")
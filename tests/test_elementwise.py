@@ -0,0 +1,92 @@
+import pytest
+import os
+import numpy as np
+import pandas as pd
+from shutil import rmtree
+from cache_decorator import Cache
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.npy",
+    cache_dir="./test_cache",
+    elementwise="ids",
+    backup=False,
+)
+def embed(ids, scale):
+    calls.append(list(ids))
+    return np.stack([ids * scale, ids + scale], axis=1)
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    elementwise="words",
+    backup=False,
+)
+def lengths(words):
+    calls.append(list(words))
+    return [len(word) for word in words]
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    elementwise="df",
+    backup=False,
+)
+def features(df):
+    calls.append(list(df.index))
+    return pd.DataFrame({"total":df.a + df.b}, index=df.index)
+
+def test_elementwise_numpy():
+    calls.clear()
+    assert (embed(np.array([1, 2, 3]), 2) == [[2, 3], [4, 4], [6, 5]]).all()
+    result = embed(np.array([4, 2, 1, 4]), scale=2)
+    assert (result == [[8, 6], [4, 4], [2, 3], [8, 6]]).all()
+    # Only the new element was computed, once
+    assert calls == [[1, 2, 3], [4]]
+
+    # The other arguments select another store
+    embed(np.array([1]), 3)
+    assert calls == [[1, 2, 3], [4], [1]]
+    rmtree("./test_cache")
+
+def test_elementwise_list():
+    calls.clear()
+    assert lengths(["a", "bb"]) == [1, 2]
+    assert lengths(["ccc", "a", "bb"]) == [3, 1, 2]
+    assert lengths(("bb", "a")) == [2, 1]
+    assert calls == [["a", "bb"], ["ccc"]]
+
+    # A removed segment is computed again
+    directory = Cache.compute_path(lengths, [])[:-len(".pkl")]
+    for file in os.listdir(directory):
+        if not file.endswith(".keys.json"):
+            os.remove(os.path.join(directory, file))
+    assert lengths(["ccc", "a"]) == [3, 1]
+    assert calls == [["a", "bb"], ["ccc"], ["ccc", "a"]]
+    rmtree("./test_cache")
+
+def test_elementwise_dataframe():
+    calls.clear()
+    df = pd.DataFrame({"a":[1, 2, 3], "b":[10, 20, 30]}, index=["x", "y", "z"])
+    assert list(features(df.iloc[:2]).total) == [11, 22]
+    result = features(df)
+    assert list(result.index) == ["x", "y", "z"]
+    assert list(result.total) == [11, 22, 33]
+    assert calls == [["x", "y"], ["z"]]
+    rmtree("./test_cache")
+
+def test_elementwise_unsupported_functions():
+    cache = Cache(cache_path="{cache_dir}/{_hash}.pkl", cache_dir="./test_cache", elementwise="batch")
+
+    async def coroutine(batch):
+        return batch
+
+    def generator(batch):
+        yield from batch
+
+    # The batch would be ignored by the hash and all of them share the same cache
+    with pytest.raises(ValueError):
+        cache(coroutine)
+    with pytest.raises(ValueError):
+        cache(generator)
@@ -0,0 +1,103 @@
+import os
+import pytest
+import multiprocessing as mp
+from time import sleep, time
+from shutil import rmtree
+from cache_decorator import Cache
+
+def cached_function_body(a):
+    # Count the executions through a file so that it works across processes
+    with open("./test_cache/executions.txt", "a") as f:
+        f.write("{}\n".format(os.getpid()))
+    sleep(2)
+    return [a, 2, 3]
+
+fcntl_function = Cache(
+    cache_path="{cache_dir}/fcntl_{_hash}.pkl",
+    cache_dir="./test_cache",
+    use_file_locks=True,
+    file_lock_mode="fcntl",
+    backup=False,
+)(cached_function_body)
+
+lease_function = Cache(
+    cache_path="{cache_dir}/lease_{_hash}.pkl",
+    cache_dir="./test_cache",
+    use_file_locks=True,
+    file_lock_mode="lease",
+    file_lock_lease_duration=1,
+    backup=False,
+)(cached_function_body)
+
+def call(mode):
+    function = fcntl_function if mode == "fcntl" else lease_function
+    assert function(1) == [1, 2, 3]
+
+def count_executions():
+    with open("./test_cache/executions.txt", "r") as f:
+        return len(f.readlines())
+
+@pytest.mark.parametrize("mode", ["fcntl", "lease"])
+def test_file_locks(mode):
+    if os.path.exists("./test_cache"):
+        rmtree("./test_cache")
+    os.makedirs("./test_cache")
+
+    processes = [mp.Process(target=call, args=(mode,)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in processes)
+    # The function body ran exactly once
+    assert count_executions() == 1
+    # and the lock was released
+    assert not any(file.endswith(".lock") for file in os.listdir("./test_cache"))
+
+    rmtree("./test_cache")
+
+def test_stale_lease_takeover():
+    os.makedirs("./test_cache", exist_ok=True)
+    # Simulate a process that died while holding the lock
+    lock_path = Cache.compute_path(lease_function, 2) + ".lock"
+    with open(lock_path, "w") as f:
+        f.write("{}")
+
+    start = time()
+    assert lease_function(2) == [2, 2, 3]
+    # We waited for the lease to expire
+    assert time() - start > 1
+
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/timeout_{_hash}.pkl",
+    cache_dir="./test_cache",
+    use_file_locks=True,
+    file_lock_timeout=1,
+    backup=False,
+)
+def timeout_function(a):
+    return a
+
+def test_file_lock_timeout():
+    os.makedirs("./test_cache", exist_ok=True)
+    lock_path = Cache.compute_path(timeout_function, 1) + ".lock"
+
+    holder = mp.Process(target=hold_lock, args=(lock_path,))
+    holder.start()
+    sleep(0.5)
+    try:
+        with pytest.raises(TimeoutError):
+            timeout_function(1)
+    finally:
+        holder.join()
+        rmtree("./test_cache")
+
+def hold_lock(lock_path):
+    from cache_decorator.utils import FileLock
+    lock = FileLock(lock_path)
+    assert lock.try_acquire()
+    sleep(3)
+    lock.release()
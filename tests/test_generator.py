@@ -0,0 +1,59 @@
+import os
+import inspect
+from shutil import rmtree
+from cache_decorator import Cache
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl.gz",
+    cache_dir="./test_cache",
+    generator_chunk_size=3,
+    backup=False,
+)
+def cached_generator(n):
+    calls.append(n)
+    for i in range(n):
+        yield {"i":i}
+
+def test_generator():
+    assert inspect.isgeneratorfunction(cached_generator)
+    calls.clear()
+
+    # Stopping early doesn't save anything
+    for item in cached_generator(10):
+        if item["i"] == 5:
+            break
+    assert not os.path.exists(Cache.compute_path(cached_generator, 10))
+
+    assert list(cached_generator(10)) == [{"i":i} for i in range(10)]
+    assert os.path.exists(Cache.compute_path(cached_generator, 10))
+    assert calls == [10, 10]
+
+    # The hit is replayed lazily
+    generator = cached_generator(10)
+    assert next(generator) == {"i":0}
+    assert list(generator) == [{"i":i} for i in range(1, 10)]
+    assert list(cached_generator(0)) == []
+    assert list(cached_generator(0)) == []
+    assert calls == [10, 10, 0]
+
+    rmtree("./test_cache")
+
+def test_generator_unsupported_path():
+    try:
+        @Cache(cache_path="{cache_dir}/{_hash}.json")
+        def generator():
+            yield 1
+        assert False
+    except ValueError:
+        pass
+
+def test_generator_cache_exceptions():
+    try:
+        @Cache(cache_path="{cache_dir}/{_hash}.pkl", cache_exceptions=(ValueError,))
+        def generator():
+            yield 1
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,73 @@
+import os
+import builtins
+from shutil import rmtree
+from cache_decorator import Cache
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def cached_function(a):
+    return {"a":a}
+
+@Cache(
+    cache_path={
+        "a":"{cache_dir}/a_{_hash}.json",
+        "b":"{cache_dir}/b_{_hash}.json",
+    },
+    optional_path_keys=["b"],
+    negative_lookup_ttl=60,
+    cache_dir="./test_cache",
+    backup=False,
+)
+def optional_function(a):
+    return {"a":{"a":a}}
+
+def count_filesystem_calls(monkeypatch, function, *args):
+    calls = []
+    original_stat, original_open = os.stat, builtins.open
+
+    def stat(path, *a, **k):
+        calls.append(("stat", str(path)))
+        return original_stat(path, *a, **k)
+
+    def open_(path, *a, **k):
+        calls.append(("open", str(path)))
+        return original_open(path, *a, **k)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "stat", stat)
+        patch.setattr(builtins, "open", open_)
+        result = function(*args)
+    return result, calls
+
+def test_hit_path(monkeypatch):
+    assert cached_function(1) == {"a":1}
+    path = Cache.compute_path(cached_function, 1)
+
+    # The first hit parses the metadata
+    _, calls = count_filesystem_calls(monkeypatch, cached_function, 1)
+    assert ("open", path + ".metadata") in calls
+
+    # The next ones only check that it didn't change, and open the cache
+    result, calls = count_filesystem_calls(monkeypatch, cached_function, 1)
+    assert result == {"a":1}
+    assert calls == [("stat", path + ".metadata"), ("open", path)]
+
+    # A missing cache is a miss
+    os.remove(path)
+    assert cached_function(1) == {"a":1}
+
+    rmtree("./test_cache")
+
+def test_negative_lookups(monkeypatch):
+    assert optional_function(1) == {"a":{"a":1}}
+    assert optional_function(1) == {"a":{"a":1}}
+
+    # The missing optional file is not checked again
+    result, calls = count_filesystem_calls(monkeypatch, optional_function, 1)
+    assert result == {"a":{"a":1}}
+    assert not any("b_" in path for _, path in calls)
+
+    rmtree("./test_cache")
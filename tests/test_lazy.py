@@ -0,0 +1,81 @@
+import os
+import pandas as pd
+from shutil import rmtree
+from collections.abc import Mapping, Sequence
+from cache_decorator import Cache
+
+calls = []
+
+@Cache(
+    cache_path={
+        "info":"{cache_dir}/{_hash}/info.json",
+        "data":"{cache_dir}/{_hash}/data.csv",
+        "extra":"{cache_dir}/{_hash}/extra.json",
+    },
+    cache_dir="./test_cache",
+    optional_path_keys=["extra"],
+    lazy=True,
+    backup=False,
+)
+def cached_function(a):
+    calls.append(a)
+    return {
+        "info":{"a":a},
+        "data":pd.DataFrame({"x":[a]}),
+    }
+
+@Cache(
+    cache_path=["{cache_dir}/{_hash}/a.json", "{cache_dir}/{_hash}/b.json"],
+    cache_dir="./test_cache",
+    lazy=True,
+    backup=False,
+)
+def cached_list(a):
+    calls.append(a)
+    return [{"a":a}, {"b":a}]
+
+def test_lazy():
+    calls.clear()
+    cached_function(1)
+    result = cached_function(1)
+    assert calls == [1]
+    assert isinstance(result, Mapping)
+    assert list(result.keys()) == ["info", "data"]
+    assert not result.is_loaded("data")
+
+    assert result["info"] == {"a":1}
+    assert not result.is_loaded("data")
+    assert result["data"].x[0] == 1
+    assert result.is_loaded("data")
+
+    # A value can be loaded directly
+    assert cached_function.load_key("info", 1) == {"a":1}
+    assert cached_function.load_key("info", 2) == {"a":2}
+    assert calls == [1, 2]
+
+    # The missing files are detected up front
+    os.remove(Cache.compute_path(cached_function, 1)["data"])
+    result = cached_function(1)
+    assert isinstance(result, dict)
+    assert calls == [1, 2, 1]
+
+    rmtree("./test_cache")
+
+def test_lazy_list():
+    calls.clear()
+    cached_list(1)
+    result = cached_list(1)
+    assert isinstance(result, Sequence)
+    assert not result.is_loaded(0)
+    assert result[1] == {"b":1}
+    assert list(result) == [{"a":1}, {"b":1}]
+    assert cached_list.load_key(0, 1) == {"a":1}
+    assert calls == [1]
+    rmtree("./test_cache")
+
+def test_lazy_string_path():
+    try:
+        Cache(cache_path="{_hash}.json", lazy=True)
+        assert False
+    except ValueError:
+        pass
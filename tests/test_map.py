@@ -0,0 +1,128 @@
+import os
+import json
+import threading
+from time import sleep, perf_counter
+from shutil import rmtree
+from concurrent.futures import ProcessPoolExecutor
+from dict_hash import Hashable
+from cache_decorator import Cache
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def cached_function(a, b=0):
+    calls.append(a)
+    sleep(0.5)
+    return {"a":a, "b":b}
+
+def test_map():
+    calls.clear()
+    cached_function(1)
+    assert calls == [1]
+
+    start = perf_counter()
+    results = cached_function.map([1, 2, (3, 1), {"a":4, "b":2}])
+    # The misses are computed in parallel
+    assert perf_counter() - start < 1
+    assert results == [
+        {"a":1, "b":0},
+        {"a":2, "b":0},
+        {"a":3, "b":1},
+        {"a":4, "b":2},
+    ]
+    assert sorted(calls) == [1, 2, 3, 4]
+
+    # Everything is cached now
+    assert cached_function.map([1, 2, (3, 1), {"a":4, "b":2}]) == results
+    assert sorted(calls) == [1, 2, 3, 4]
+
+    # A cache removed after the listing is recomputed
+    iterator = cached_function.imap([1, 2], prefetch=0)
+    assert next(iterator) == {"a":1, "b":0}
+    os.remove(Cache.compute_path(cached_function, 2))
+    assert next(iterator) == {"a":2, "b":0}
+    assert sorted(calls) == [1, 2, 2, 3, 4]
+
+    rmtree("./test_cache")
+
+def test_map_process_pool():
+    with ProcessPoolExecutor(2) as executor:
+        assert cached_function.map([5, 6], executor=executor) == [
+            {"a":5, "b":0},
+            {"a":6, "b":0},
+        ]
+    # The workers saved the results
+    assert os.path.exists(Cache.compute_path(cached_function, 5))
+    assert os.path.exists(Cache.compute_path(cached_function, 6))
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/inner/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def inner_function(a):
+    return a * 2
+
+@Cache(
+    cache_path="{cache_dir}/outer/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def outer_function(a):
+    return sum(inner_function.map(range(a, a + 4)))
+
+def test_nested_map():
+    results = []
+    # More calls than workers, run in a thread so that a deadlock fails the test
+    thread = threading.Thread(target=lambda: results.append(outer_function.map(range(16))))
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+    assert results == [[8 * a + 12 for a in range(16)]]
+    rmtree("./test_cache")
+
+hashes = []
+
+class Key(Hashable):
+    def __init__(self, value):
+        self.value = value
+
+    def consistent_hash(self, use_approximation: bool = False) -> str:
+        hashes.append(self.value)
+        return str(self.value)
+
+@Cache(
+    cache_path="{cache_dir}/keys/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def keyed_function(key):
+    return {"key":key.value}
+
+@Cache(
+    cache_path="{cache_dir}/total/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def total_function(a):
+    return sum(inner["key"] for inner in keyed_function.map([Key(b) for b in range(a)]))
+
+def test_map_bookkeeping():
+    hashes.clear()
+    assert keyed_function.map([Key(1), Key(2)]) == [{"key":1}, {"key":2}]
+    # The arguments of the misses are hashed once
+    assert sorted(hashes) == [1, 2]
+
+    # The hits of a map are dependencies of the cached call running it
+    assert total_function(3) == 3
+    with open(Cache.compute_path(total_function, 3) + ".metadata") as f:
+        dependencies = json.load(f)["dependencies"]
+    assert sorted(dependency["path"] for dependency in dependencies) == sorted(
+        Cache.compute_path(keyed_function, Key(b)) for b in range(3)
+    )
+    rmtree("./test_cache")
@@ -0,0 +1,120 @@
+import os
+import numpy as np
+from time import sleep
+from shutil import rmtree
+from cache_decorator import Cache
+from .utils import standard_test_array
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.npy",
+    cache_dir="./test_cache",
+    use_memory_cache=True,
+    backup=False,
+)
+def cached_function(a):
+    sleep(2)
+    return np.arange(10) * a
+
+def test_memory_cache():
+    Cache.clear_memory_cache()
+    standard_test_array(cached_function)
+
+    # The hit must not touch the disk anymore
+    rmtree("./test_cache")
+    result = cached_function(1)
+    assert (result == np.arange(10)).all()
+    assert not result.flags.writeable
+
+    Cache.clear_memory_cache()
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    validity_duration=1,
+    use_memory_cache=True,
+    backup=False,
+)
+def cached_function_validity(a):
+    return [a, sleep(0.5)]
+
+def test_memory_cache_validity():
+    Cache.clear_memory_cache()
+    cached_function_validity(1)
+    rmtree("./test_cache")
+    # Still valid, so we can get it from memory
+    cached_function_validity(1)
+    assert not os.path.exists("./test_cache")
+
+    sleep(1)
+    # Expired, so we must recompute it
+    cached_function_validity(1)
+    assert os.path.exists("./test_cache")
+
+    rmtree("./test_cache")
+    Cache.clear_memory_cache()
+
+def test_memory_cache_limits():
+    Cache.clear_memory_cache()
+    Cache.set_memory_cache_limits(max_entries=2)
+    try:
+        for i in range(3):
+            cached_function_validity(i)
+        rmtree("./test_cache")
+
+        # The oldest entry was evicted
+        cached_function_validity(0)
+        assert os.path.exists("./test_cache")
+        rmtree("./test_cache")
+
+        # Only the array fits the bytes budget
+        Cache.set_memory_cache_limits(max_entries=1024, max_bytes=100)
+        cached_function(2)
+        rmtree("./test_cache")
+        assert (cached_function(2) == np.arange(10) * 2).all()
+        assert not os.path.exists("./test_cache")
+    finally:
+        Cache.set_memory_cache_limits(max_entries=1024, max_bytes=256 * 1024**2)
+        Cache.clear_memory_cache()
+        if os.path.exists("./test_cache"):
+            rmtree("./test_cache")
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/upstream/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def upstream(a):
+    calls.append(("upstream", a))
+    return {"a":a}
+
+@Cache(
+    cache_path="{cache_dir}/downstream/{_hash}.json",
+    cache_dir="./test_cache",
+    use_memory_cache=True,
+    backup=False,
+)
+def downstream(a):
+    calls.append(("downstream", a))
+    return {"b":upstream(a)["a"] * 2}
+
+def test_memory_cache_dependencies():
+    Cache.clear_memory_cache()
+    calls.clear()
+    assert downstream(1) == {"b":2}
+    assert downstream(1) == {"b":2}
+    assert calls == [("downstream", 1), ("upstream", 1)]
+
+    # The dependencies are kept with the value in memory, and are checked
+    os.remove(Cache.compute_path(upstream, 1))
+    assert upstream(1) == {"a":1}
+    assert downstream(1) == {"b":2}
+    assert calls == [("downstream", 1), ("upstream", 1), ("upstream", 1), ("downstream", 1)]
+
+    # Evicting the value also drops its dependencies
+    Cache.clear_memory_cache()
+    assert downstream(1) == {"b":2}
+    assert len(calls) == 4
+
+    rmtree("./test_cache")
@@ -0,0 +1,102 @@
+import os
+import json
+from shutil import rmtree
+import pytest
+from cache_decorator import Cache
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/full/{_hash}.json",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def full(a, values):
+    calls.append(a)
+    return {"a":a}
+
+@Cache(
+    cache_path="{cache_dir}/minimal/{_hash}.json",
+    cache_dir="./test_cache",
+    metadata_level="minimal",
+    backup=False,
+)
+def minimal(a):
+    calls.append(a)
+    return {"a":a}
+
+@Cache(
+    cache_path="{cache_dir}/none/{_hash}.json",
+    cache_dir="./test_cache",
+    metadata_level="none",
+    backup=False,
+)
+def no_metadata(a):
+    calls.append(a)
+    return {"a":a}
+
+def load_metadata(path):
+    with open(path + ".metadata") as f:
+        text = f.read()
+    # The metadata is minified
+    assert "\n" not in text
+    return json.loads(text)
+
+def test_full_metadata():
+    full(1, list(range(1000)))
+    full(2, list(range(3)))
+    metadata = load_metadata(Cache.compute_path(full, 1, list(range(1000))))
+
+    # The big parameters are skipped
+    assert metadata["parameters"] == {"a":1}
+    assert load_metadata(Cache.compute_path(full, 2, list(range(3))))["parameters"] == {"a":2, "values":[0, 1, 2]}
+
+    # The source is saved once for all the caches in the cache dir
+    assert "source" not in metadata
+    assert os.listdir("./test_cache/.sources") == [os.path.basename(metadata["source_path"])]
+    with open(metadata["source_path"]) as f:
+        assert "def full(a, values):" in f.read()
+
+    rmtree("./test_cache")
+
+def test_minimal_metadata():
+    calls.clear()
+    assert minimal(1) == {"a":1}
+    assert minimal(1) == {"a":1}
+    assert calls == [1]
+    assert set(load_metadata(Cache.compute_path(minimal, 1))) == {
+        "creation_time", "time_delta", "backend_metadata", "entry_hash",
+    }
+    rmtree("./test_cache")
+
+def test_no_metadata():
+    calls.clear()
+    assert no_metadata(1) == {"a":1}
+    assert no_metadata(1) == {"a":1}
+    assert calls == [1]
+    assert not os.path.exists(Cache.compute_path(no_metadata, 1) + ".metadata")
+    rmtree("./test_cache")
+
+    with pytest.raises(ValueError):
+        Cache(metadata_level="none", validity_duration="1d")
+    with pytest.raises(ValueError):
+        Cache(metadata_level="verbose")
+
+@Cache(
+    cache_path="./test_cache/outside/{_hash}.json",
+    cache_dir="./test_cache/inside",
+    backup=False,
+)
+def outside(a):
+    return {"a":a}
+
+def test_source_outside_cache_dir():
+    outside(1)
+    metadata = load_metadata(Cache.compute_path(outside, 1))
+    # The source is only saved in the cache dir, otherwise it's in the metadata
+    assert "source_version" in metadata
+    assert "source_path" not in metadata
+    assert "def outside" in metadata["source"]
+    assert os.listdir("./test_cache") == ["outside"]
+    assert ".sources" not in os.listdir("./test_cache/outside")
+    rmtree("./test_cache")
@@ -0,0 +1,152 @@
+import os
+import json
+import threading
+from time import sleep
+from shutil import rmtree
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from cache_decorator import Cache
+
+running = []
+peaks = []
+running_lock = threading.Lock()
+
+def compute(a, duration):
+    with running_lock:
+        running.append(a)
+        peaks.append(len(running))
+    sleep(duration)
+    with running_lock:
+        running.remove(a)
+    return {"a":a}
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    max_concurrent_misses=2,
+    backup=False,
+)
+def limited(a):
+    return compute(a, 0.5)
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    max_shared_concurrent_misses=1,
+    backup=False,
+)
+def shared_limited(a):
+    return compute(a, 0.2)
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    max_concurrent_misses=1,
+    miss_queue_timeout=1,
+    backup=False,
+)
+def strict(a):
+    return compute(a, 2)
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    max_concurrent_misses=1,
+    miss_queue_timeout=1,
+    miss_queue_fallback="compute",
+    backup=False,
+)
+def lenient(a):
+    return compute(a, 2)
+
+def test_process_limit():
+    peaks.clear()
+    with ThreadPoolExecutor(6) as executor:
+        assert list(executor.map(limited, range(6))) == [{"a":a} for a in range(6)]
+    assert max(peaks) == 2
+
+    # The time waiting in the queue is not part of the computation time
+    queue_times = []
+    for a in range(6):
+        with open(Cache.compute_path(limited, a) + ".metadata") as f:
+            metadata = json.load(f)
+        assert metadata["time_delta"] < 1
+        queue_times.append(metadata["queue_time"])
+    assert max(queue_times) > 0.8
+
+    rmtree("./test_cache")
+
+def test_shared_limit():
+    peaks.clear()
+    with ThreadPoolExecutor(3) as executor:
+        assert list(executor.map(shared_limited, range(3))) == [{"a":a} for a in range(3)]
+    assert max(peaks) == 1
+    # The slots are released
+    assert os.listdir("./test_cache/.slots") == []
+    rmtree("./test_cache")
+
+def test_queue_timeout():
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(strict, 1)
+        sleep(0.1)
+        second = executor.submit(strict, 2)
+        with pytest.raises(TimeoutError):
+            second.result()
+        assert first.result() == {"a":1}
+
+    peaks.clear()
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(lenient, [1, 2])) == [{"a":1}, {"a":2}]
+    assert max(peaks) == 2
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    max_concurrent_misses=1,
+    miss_queue_timeout=1,
+    cache_exceptions=(TimeoutError,),
+    backup=False,
+)
+def strict_with_exceptions(a):
+    return compute(a, 2)
+
+def test_queue_timeout_not_cached():
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(strict_with_exceptions, 1)
+        sleep(0.1)
+        second = executor.submit(strict_with_exceptions, 2)
+        with pytest.raises(TimeoutError):
+            second.result()
+        assert first.result() == {"a":1}
+
+    # The timeout in the queue was not saved as the result of the call
+    assert strict_with_exceptions(2) == {"a":2}
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    max_concurrent_misses=1,
+    backup=False,
+)
+async def limited_coroutine(a):
+    import asyncio
+    with running_lock:
+        running.append(a)
+        peaks.append(len(running))
+    await asyncio.sleep(0.2)
+    with running_lock:
+        running.remove(a)
+    return {"a":a}
+
+def test_coroutine_limit():
+    import asyncio
+
+    async def main():
+        return await asyncio.gather(*[limited_coroutine(a) for a in range(3)])
+
+    peaks.clear()
+    assert asyncio.run(main()) == [{"a":a} for a in range(3)]
+    assert max(peaks) == 1
+    rmtree("./test_cache")
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+from time import sleep, perf_counter
+from shutil import rmtree
+from cache_decorator import Cache
+
+class SlowToSerialize:
+    def __init__(self, value):
+        self.value = value
+
+    def __getstate__(self):
+        sleep(0.5)
+        return {"value":self.value}
+
+    def __setstate__(self, state):
+        sleep(0.5)
+        self.value = state["value"]
+
+calls = []
+
+@Cache(
+    cache_path={
+        "a":"{cache_dir}/{_hash}/a.pkl",
+        "b":"{cache_dir}/{_hash}/b.pkl",
+        "c":"{cache_dir}/{_hash}/c.pkl",
+        "d":"{cache_dir}/{_hash}/d.pkl",
+        "e":"{cache_dir}/{_hash}/e.npy",
+    },
+    cache_dir="./test_cache",
+    optional_path_keys=["e"],
+    backup=False,
+)
+def cached_function(x):
+    calls.append(x)
+    return {
+        key:SlowToSerialize(x)
+        for key in "abcd"
+    }
+
+@Cache(
+    cache_path=["{cache_dir}/{_hash}/a.json", "{cache_dir}/{_hash}/b.npy"],
+    cache_dir="./test_cache",
+    backup=False,
+)
+def cached_list(x):
+    calls.append(x)
+    return ({"x":x}, np.arange(x))
+
+def test_parallel_structured_paths():
+    calls.clear()
+    start = perf_counter()
+    cached_function(1)
+    # The four elements are dumped in parallel
+    assert perf_counter() - start < 1.5
+
+    start = perf_counter()
+    result = cached_function(1)
+    assert perf_counter() - start < 1.5
+    assert calls == [1]
+    # The missing optional key is fine and the order is kept
+    assert list(result.keys()) == ["a", "b", "c", "d"]
+    assert all(value.value == 1 for value in result.values())
+
+    # A missing required element makes the whole cache invalid
+    os.remove(Cache.compute_path(cached_function, 1)["c"])
+    cached_function(1)
+    assert calls == [1, 1]
+
+    rmtree("./test_cache")
+
+def test_parallel_structured_list():
+    calls.clear()
+    a, b = cached_list(5)
+    a, b = cached_list(5)
+    assert calls == [5]
+    assert a == {"x":5}
+    assert (b == np.arange(5)).all()
+    rmtree("./test_cache")
@@ -0,0 +1,43 @@
+import pytest
+from cache_decorator.utils import PathTemplate, compile_path, format_compiled_path
+
+class Obj:
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name.upper()
+
+def test_path_template():
+    format_args = {"cache_dir":"./cache", "x":3, "y":[1, 2], "obj":Obj("a"), "_hash":"abc"}
+
+    for template in [
+        "{cache_dir}/{x}.pkl",
+        "{cache_dir}/{x}_{y[1]}.pkl",
+        "{cache_dir}/{obj.name}/{_hash}.json",
+        "{cache_dir}/{{literal}}/{x!r}.pkl",
+        "no_fields.pkl",
+    ]:
+        assert PathTemplate(template).format(format_args) == template.format(**format_args)
+
+    # The format specs are ignored to keep the paths of the existing caches
+    assert PathTemplate("{x:03d}.pkl").format(format_args) == "3.pkl"
+
+    template = PathTemplate("{cache_dir}/{obj.get_name()}_{_hash}.pkl")
+    assert template.format(format_args) == "./cache/A_abc.pkl"
+    assert template.needs_hash
+    assert template.needs_cache_dir
+    assert not PathTemplate("{cache_dir}/{x}.pkl").needs_hash
+
+    with pytest.raises(KeyError):
+        PathTemplate("{z}.pkl").format(format_args)
+
+def test_compile_structured_path():
+    compiled = compile_path({
+        "a":"{cache_dir}/a_{x}.pkl",
+        "b":["{cache_dir}/b_{x}.pkl", ("{cache_dir}/c_{x}.pkl",)],
+    })
+    assert format_compiled_path(compiled, {"cache_dir":"d", "x":1}) == {
+        "a":"d/a_1.pkl",
+        "b":["d/b_1.pkl", ("d/c_1.pkl",)],
+    }
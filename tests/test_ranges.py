@@ -0,0 +1,109 @@
+import os
+import pytest
+from time import sleep
+import numpy as np
+import pandas as pd
+from shutil import rmtree
+from cache_decorator import Cache
+from cache_decorator.utils import get_shared_executor, load_ranges
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{source}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    range_args=("start", "end"),
+    backup=False,
+)
+def load_events(source, start, end):
+    calls.append((start, end))
+    return pd.DataFrame({"day":list(range(start, end)), "source":source})
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.npy",
+    cache_dir="./test_cache",
+    range_args=("start", "end"),
+    backup=False,
+)
+def squares(start, end):
+    calls.append((start, end))
+    return np.arange(start, end) ** 2
+
+def wait_compaction():
+    get_shared_executor("compaction", 1).submit(lambda: None).result()
+
+def test_ranges():
+    calls.clear()
+    assert list(load_events("a", 0, 5).day) == [0, 1, 2, 3, 4]
+    # Only the new days are computed
+    assert list(load_events("a", 0, 7).day) == list(range(7))
+    assert calls == [(0, 5), (5, 7)]
+
+    # The two segments are merged in background
+    wait_compaction()
+    directory = os.path.dirname(Cache.compute_path(load_events, "a", 0, 1))
+    assert len(load_ranges(os.path.join(directory, os.listdir(directory)[0]))) == 1
+    assert list(load_events("a", 0, 7).day) == list(range(7))
+    assert calls == [(0, 5), (5, 7)]
+
+    # The segments not fully inside the range are not used
+    assert list(load_events("a", 3, 10).day) == list(range(3, 10))
+    assert calls == [(0, 5), (5, 7), (3, 10)]
+    assert list(load_events("a", 0, 12).day) == list(range(12))
+    assert calls == [(0, 5), (5, 7), (3, 10), (7, 12)]
+    wait_compaction()
+
+    # The other arguments select another store
+    assert list(load_events("b", 0, 2).source) == ["b", "b"]
+    assert calls[-1] == (0, 2)
+    rmtree("./test_cache")
+
+def test_ranges_numpy():
+    calls.clear()
+    squares(0, 3)
+    squares(6, 9)
+    assert list(squares(0, 9)) == [i ** 2 for i in range(9)]
+    assert calls == [(0, 3), (6, 9), (3, 6)]
+    wait_compaction()
+    rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    range_args=("start", "end"),
+    validity_duration=2,
+    backup=False,
+)
+def expiring(start, end):
+    calls.append((start, end))
+    return list(range(start, end))
+
+def test_ranges_compaction_validity():
+    calls.clear()
+    expiring(0, 5)
+    sleep(1.2)
+    expiring(5, 10)
+    assert expiring(0, 10) == list(range(10))
+    wait_compaction()
+    assert calls == [(0, 5), (5, 10)]
+
+    # The merged segment expires with the data of [0, 5)
+    sleep(1)
+    assert expiring(0, 10) == list(range(10))
+    assert calls == [(0, 5), (5, 10), (0, 10)]
+    rmtree("./test_cache")
+
+def test_ranges_unsupported_functions():
+    cache = Cache(cache_path="{cache_dir}/{_hash}.pkl", cache_dir="./test_cache", range_args=("start", "end"))
+
+    async def coroutine(start, end):
+        return list(range(start, end))
+
+    def generator(start, end):
+        yield from range(start, end)
+
+    # The ranges would be ignored by the hash and all share the same cache
+    with pytest.raises(ValueError):
+        cache(coroutine)
+    with pytest.raises(ValueError):
+        cache(generator)
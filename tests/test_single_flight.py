@@ -0,0 +1,67 @@
+import os
+from time import sleep
+from shutil import rmtree
+from concurrent.futures import ThreadPoolExecutor
+from cache_decorator import Cache
+from cache_decorator.utils import global_single_flight
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def cached_function(a):
+    calls.append(a)
+    sleep(1)
+    return [a, 2, 3]
+
+@Cache(
+    cache_path={
+        "a":"{cache_dir}/a_{_hash}.pkl",
+        "b":"{cache_dir}/b_{_hash}.json",
+    },
+    cache_dir="./test_cache",
+    backup=False,
+)
+def cached_function_dict(a):
+    calls.append(a)
+    sleep(1)
+    return {"a":a, "b":[1, 2]}
+
+def test_single_flight():
+    for function in [cached_function, cached_function_dict]:
+        calls.clear()
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(function, [1] * 8 + [2] * 8))
+
+        # Each key was computed only once
+        assert sorted(calls) == [1, 2]
+        assert all(r == results[0] for r in results[:8])
+        assert all(r == results[-1] for r in results[8:])
+        # and the per-key state was cleaned up
+        assert len(global_single_flight) == 0
+
+        if os.path.exists("./test_cache"):
+            rmtree("./test_cache")
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    backup=False,
+)
+def failing_function(a):
+    calls.append(a)
+    sleep(1)
+    raise ValueError("no data for {}".format(a))
+
+def test_single_flight_exception():
+    calls.clear()
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(failing_function, 1) for _ in range(4)]
+
+    for future in futures:
+        assert isinstance(future.exception(), ValueError)
+    assert calls == [1]
+    assert len(global_single_flight) == 0
@@ -0,0 +1,121 @@
+import os
+from time import sleep, perf_counter
+from shutil import rmtree
+from cache_decorator import Cache
+from cache_decorator.utils import global_refresher
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    validity_duration=1,
+    stale_while_revalidate=True,
+    backup=False,
+)
+def stale(a):
+    calls.append(a)
+    sleep(0.5)
+    return {"a":a, "n":len(calls)}
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    validity_duration=2,
+    refresh_ahead=0.5,
+    validity_jitter=0.1,
+    backup=False,
+)
+def ahead(a):
+    calls.append(a)
+    return {"a":a, "n":len(calls)}
+
+def test_stale_while_revalidate():
+    calls.clear()
+    assert stale(1) == {"a":1, "n":1}
+    sleep(1.1)
+    # The stale value is returned while it's recomputed
+    assert stale(1) == {"a":1, "n":1}
+    assert Cache.wait_for_refreshes(5)
+    assert calls == [1, 1]
+    assert stale(1) == {"a":1, "n":2}
+    rmtree("./test_cache")
+
+def test_refresh_ahead():
+    calls.clear()
+    assert ahead(1) == {"a":1, "n":1}
+    assert ahead(1) == {"a":1, "n":1}
+    assert calls == [1]
+    sleep(1.1)
+    # In the last half of its lifetime the cache is refreshed in background
+    assert ahead(1) == {"a":1, "n":1}
+    assert Cache.wait_for_refreshes(5)
+    assert ahead(1) == {"a":1, "n":2}
+    assert calls == [1, 1]
+    rmtree("./test_cache")
+
+def test_refresh_limit():
+    calls.clear()
+    Cache.set_background_refresh_limit(1)
+    try:
+        stale(2)
+        stale(3)
+        sleep(1.1)
+        stale(2)
+        stale(3)
+        assert Cache.wait_for_refreshes(5)
+        # Only one refresh could run at a time
+        assert calls == [2, 3, 2]
+    finally:
+        Cache.set_background_refresh_limit(4)
+        rmtree("./test_cache")
+
+def test_refresh_limit_increase():
+    Cache.set_background_refresh_limit(8)
+    try:
+        start = perf_counter()
+        for i in range(8):
+            assert global_refresher.submit(("limit", i), lambda: sleep(1))
+        assert Cache.wait_for_refreshes(5)
+        # All of them ran at the same time
+        assert perf_counter() - start < 1.8
+    finally:
+        Cache.set_background_refresh_limit(4)
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    validity_duration=1,
+    stale_while_revalidate=True,
+    use_memory_cache=True,
+    backup=False,
+)
+def stale_in_memory(a):
+    calls.append(a)
+    return {"a":a, "n":len(calls)}
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.json",
+    cache_dir="./test_cache",
+    validity_duration=2,
+    refresh_ahead=0.5,
+    use_memory_cache=True,
+    backup=False,
+)
+def ahead_in_memory(a):
+    calls.append(a)
+    return {"a":a, "n":len(calls)}
+
+def test_memory_cache_refresh():
+    calls.clear()
+    assert stale_in_memory(1) == {"a":1, "n":1}
+    assert ahead_in_memory(2) == {"a":2, "n":2}
+    sleep(1.1)
+    # The hits in memory are refreshed like the ones on disk
+    assert stale_in_memory(1) == {"a":1, "n":1}
+    assert ahead_in_memory(2) == {"a":2, "n":2}
+    assert Cache.wait_for_refreshes(5)
+    assert sorted(calls) == [1, 1, 2, 2]
+    assert stale_in_memory(1)["n"] > 2
+    assert ahead_in_memory(2)["n"] > 2
+    rmtree("./test_cache")
@@ -0,0 +1,96 @@
+import sys
+import json
+import subprocess
+from cache_decorator import Cache
+
+# Budgets in seconds, generous so that slow machines don't fail
+IMPORT_BUDGET = 0.5
+DECORATION_BUDGET = 0.1
+
+STARTUP_SCRIPT = """
+import sys
+import json
+from time import perf_counter
+
+start = perf_counter()
+from cache_decorator import Cache
+import_time = perf_counter() - start
+
+start = perf_counter()
+for i in range(100):
+    def function(a, b=1):
+        return a + b
+    Cache(cache_path="{cache_dir}/{_hash}.pkl", cache_dir="./test_cache")(function)
+decoration_time = perf_counter() - start
+
+print(json.dumps({
+    "import_time":import_time,
+    "decoration_time":decoration_time,
+    "modules":sorted(sys.modules),
+}))
+"""
+
+def test_startup_time():
+    # A new interpreter so that nothing is already imported
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    report = json.loads(output)
+
+    assert report["import_time"] < IMPORT_BUDGET
+    assert report["decoration_time"] < DECORATION_BUDGET
+
+    # The backends and their dependencies are imported only on first use
+    for module in ["pandas", "numpy", "compress_pickle", "cache_decorator.backends.pickle_backend"]:
+        assert module not in report["modules"]
+
+def test_lazy_source():
+    def function(a):
+        return a
+
+    cached_function = Cache(
+        cache_path="{cache_dir}/{_hash}.pkl",
+        cache_dir="./test_cache",
+        backup=False,
+    )(function)
+    cacher = getattr(cached_function, "__cacher_instance")
+    # The source is read and hashed on the first call
+    assert cacher._function_details is None
+    assert "source" in cacher.function_info
+    assert cacher._function_version is not None
+
+FIRST_MISS_SCRIPT = """
+import sys
+import json
+from shutil import rmtree
+from cache_decorator import Cache
+
+def function(a):
+    return a
+
+cached_function = Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache/first_miss",
+    # The source of a script run with -c is not available
+    use_source_code=False,
+    backup=False,
+)(function)
+cached_function(1)
+assert cached_function(1) == 1
+rmtree("./test_cache/first_miss")
+
+print(json.dumps({"modules":sorted(sys.modules)}))
+"""
+
+def test_first_miss_imports():
+    output = subprocess.run(
+        [sys.executable, "-c", FIRST_MISS_SCRIPT],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    report = json.loads(output)
+
+    # The fallback backends of the pickles are not needed to save and load them
+    assert "cache_decorator.backends.pickle_backend" in report["modules"]
+    for module in ["compress_pickle", "cache_decorator.backends.compress_pickle_backend"]:
+        assert module not in report["modules"]
@@ -0,0 +1,65 @@
+import os
+from time import sleep, perf_counter
+from shutil import rmtree
+from cache_decorator import Cache
+from cache_decorator.utils.memory_cache import estimate_size
+
+class SlowToSerialize:
+    def __init__(self, value):
+        self.value = value
+
+    def __getstate__(self):
+        sleep(1)
+        return {"value":self.value}
+
+calls = []
+
+@Cache(
+    cache_path="{cache_dir}/{_hash}.pkl",
+    cache_dir="./test_cache",
+    write_behind=True,
+    backup=False,
+)
+def cached_function(a):
+    calls.append(a)
+    return SlowToSerialize(a)
+
+def test_write_behind():
+    calls.clear()
+    start = perf_counter()
+    assert cached_function(1).value == 1
+    # We didn't wait for the serialization
+    assert perf_counter() - start < 0.5
+
+    # The pending write is visible to the lookups
+    assert cached_function(1).value == 1
+    assert calls == [1]
+
+    assert Cache.flush_writes()
+    assert os.path.exists(Cache.compute_path(cached_function, 1))
+    assert cached_function(1).value == 1
+    assert calls == [1]
+
+    rmtree("./test_cache")
+
+def test_write_behind_backpressure():
+    Cache.set_write_behind_limits(max_pending_bytes=1)
+    try:
+        cached_function(2)
+        start = perf_counter()
+        cached_function(3)
+        # We had to wait for the previous write to finish
+        assert perf_counter() - start > 0.5
+        assert Cache.flush_writes()
+    finally:
+        Cache.set_write_behind_limits(max_pending_bytes=512 * 1024**2)
+        if os.path.exists("./test_cache"):
+            rmtree("./test_cache")
+
+def test_write_behind_size_estimate():
+    records = [
+        {"id":i, "name":"record {}".format(i), "values":[float(j) for j in range(20)]}
+        for i in range(100000)
+    ]
+    # The records are measured too, not only the list holding them
+    assert estimate_size(records, use_pickle=False) > 100 * len(records)